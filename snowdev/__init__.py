@@ -1,7 +1,34 @@
-from .functions.connect import SnowflakeConnection
-from .functions.register import SnowflakeRegister
-from .functions.package_zip import SnowPackageZip
-from .functions.helper import SnowHelper
-from .functions.streamlit import StreamlitAppDeployer
-from .functions.bot import SnowBot
-from .functions.task import TaskDeployer
+import importlib
+
+# Public classes are imported on first access so that `snowdev --help` and
+# light commands do not pay for Snowpark, langchain or chromadb.
+_LAZY_IMPORTS = {
+    "SnowflakeConnection": ".functions.connect",
+    "SnowflakeRegister": ".functions.register",
+    "SnowPackageZip": ".functions.package_zip",
+    "SnowHelper": ".functions.helper",
+    "StreamlitAppDeployer": ".functions.streamlit",
+    "SnowBot": ".functions.bot",
+    "TaskDeployer": ".functions.task",
+    "DeployManifest": ".functions.manifest",
+    "StageUploader": ".functions.uploader",
+    "StageSync": ".functions.stage_sync",
+    "LayerStore": ".functions.layers",
+    "StageManager": ".functions.stage_manager",
+    "TaskGraph": ".functions.task_graph",
+    "TaskGraphDeployer": ".functions.task_graph",
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+
+def __getattr__(name):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,8 +1,8 @@
 import click
 from termcolor import colored
 
-from snowdev import SnowBot, SnowHelper
-from snowdev.deployment import DeploymentArguments, DeploymentManager
+# Subsystems are imported inside the commands that need them so that the CLI
+# starts without loading Snowpark or the AI stack.
 
 
 @click.group()
@@ -15,6 +15,8 @@ def cli(ctx):
 @cli.command()
 def init():
     """Initialize the project structure."""
+    from snowdev.deployment import DeploymentManager
+
     DeploymentManager.create_directory_structure()
 
 
@@ -25,6 +27,8 @@ def init():
 @click.option("--task", type=str, help="The name of the task.")
 def new(udf, sproc, streamlit, task):
     """Create a new component."""
+    from snowdev import SnowHelper
+
     args_dict = {"udf": udf, "sproc": sproc, "streamlit": streamlit, "task": task}
     SnowHelper.create_new_component(args_dict)
 
@@ -34,31 +38,81 @@ def new(udf, sproc, streamlit, task):
 @click.option("--sproc", type=str, help="The name of the stored procedure.")
 def test(udf, sproc):
     """Test the deployment."""
+    from snowdev.deployment import DeploymentArguments, DeploymentManager
+
     deployment_args = DeploymentArguments(udf=udf, sproc=sproc)
     manager = DeploymentManager(deployment_args)
     manager.test_locally()
 
 
 @cli.command()
-def upload():
+@click.option(
+    "--workers",
+    type=int,
+    default=None,
+    help="Maximum number of concurrent uploads.",
+)
+@click.option(
+    "--delete",
+    is_flag=True,
+    help="Remove stage files that no longer exist locally.",
+)
+@click.option(
+    "--dry-run", is_flag=True, help="Show what would be uploaded and removed."
+)
+def upload(workers, delete, dry_run):
     """Upload static content."""
+    from snowdev.deployment import DeploymentManager
+
     manager = DeploymentManager()
-    manager.upload_static()
+    if not manager.upload_static(max_workers=workers, delete=delete, dry_run=dry_run):
+        raise SystemExit(1)
 
 
 @cli.command()
 @click.option("--package", type=str, help="Name of the package to zip and upload.")
-def add(package):
+@click.option(
+    "--python-version",
+    type=str,
+    default=None,
+    help="Python version of the Snowflake runtime to build for (default 3.10).",
+)
+@click.option(
+    "--platform",
+    type=str,
+    default=None,
+    help="Wheel platform tag(s) to build for (default manylinux2014_x86_64).",
+)
+@click.option(
+    "--layers",
+    is_flag=True,
+    help="Store each vendored package as a shared, content-addressed layer.",
+)
+def add(package, python_version, platform, layers):
     """Add a package and optionally upload."""
+    from snowdev.deployment import DeploymentManager
+
     manager = DeploymentManager()
     user_response = input(
         colored("🤔 Do you want to upload the zip to stage? (yes/no): ", "cyan")
     )
 
-    if user_response.lower() in ["yes", "y"]:
-        manager.deploy_package(package, upload=True)
-    else:
-        manager.deploy_package(package, upload=False)
+    manager.deploy_package(
+        package,
+        upload=user_response.lower() in ["yes", "y"],
+        python_version=python_version,
+        platform=platform,
+        layers=layers,
+    )
+
+
+@cli.command()
+@click.option("--dry-run", is_flag=True, help="Show which layers would be removed.")
+def gc(dry_run):
+    """Remove package layers that no imports.txt references."""
+    from snowdev.deployment import DeploymentManager
+
+    DeploymentManager().gc_layers(dry_run=dry_run)
 
 
 @cli.command()
@@ -67,12 +121,22 @@ def add(package):
 @click.option("--streamlit", type=str, help="The name of the streamlit app.")
 @click.option("--embed", is_flag=True, help="Run the embeddings.")
 @click.option("--task", type=str, help="The name of the task.")
-def ai(udf, sproc, streamlit, embed, task):
+@click.option(
+    "--backend",
+    type=click.Choice(["openai", "hashing", "minilm"]),
+    default="openai",
+    envvar="SNOWDEV_EMBEDDING_BACKEND",
+    show_default=True,
+    show_envvar=True,
+    help="The embedding backend: openai needs OPENAI_API_KEY, hashing and minilm run locally.",
+)
+def ai(udf, sproc, streamlit, embed, task, backend):
     """AI commands."""
+    from snowdev import SnowBot
 
     if embed:
         print(colored("Initializing AI...\n", "cyan"))
-        SnowBot.ai_embed()
+        SnowBot.ai_embed(backend=backend)
         return
 
     component_type, prompt = None, None
@@ -112,7 +176,7 @@ def ai(udf, sproc, streamlit, embed, task):
         return
 
     SnowBot.create_new_ai_component(
-        component_name, prompt, template_type=component_type
+        component_name, prompt, template_type=component_type, backend=backend
     )
 
 
@@ -121,12 +185,104 @@ def ai(udf, sproc, streamlit, embed, task):
 @click.option("--udf", type=str, help="The name of the udf.")
 @click.option("--streamlit", type=str, help="The name of the streamlit app.")
 @click.option("--task", type=str, help="The name of the task.")
-def deploy(sproc, udf, streamlit, task):
+@click.option(
+    "--all", "deploy_all", is_flag=True, help="Deploy every component under src/."
+)
+@click.option(
+    "--task-graph",
+    is_flag=True,
+    help="Deploy every task under src/task/ in dependency order.",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="With --task-graph, resume every task tree after deploying.",
+)
+@click.option(
+    "--batch",
+    is_flag=True,
+    help="Send each task's SQL statements as a single request.",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    help="Print the SQL statement plan of tasks without running it.",
+)
+@click.option(
+    "--workers",
+    type=int,
+    help="Number of parallel deployments with --all or --task-graph.",
+)
+@click.option(
+    "--force", is_flag=True, help="Redeploy even if nothing changed since last time."
+)
+@click.option(
+    "--temp-check",
+    is_flag=True,
+    help="Validate by registering a temporary entity instead of checking locally.",
+)
+def deploy(
+    sproc,
+    udf,
+    streamlit,
+    task,
+    deploy_all,
+    task_graph,
+    resume,
+    batch,
+    dry_run,
+    workers,
+    force,
+    temp_check,
+):
     """Deploy components."""
-    arguments = {"sproc": sproc, "udf": udf, "streamlit": streamlit, "task": task}
+    from snowdev.deployment import DeploymentArguments, DeploymentManager
+
+    arguments = {
+        "sproc": sproc,
+        "udf": udf,
+        "streamlit": streamlit,
+        "task": task,
+        "all": deploy_all,
+        "task_graph": task_graph,
+        "resume": resume,
+        "batch": batch,
+        "dry_run": dry_run,
+        "workers": workers,
+        "force": force,
+        "temp_check": temp_check,
+    }
     args = DeploymentArguments(**arguments)
     manager = DeploymentManager(args)
-    manager.main()
+    result = manager.main()
+    if (deploy_all or task_graph) and not result:
+        raise SystemExit(1)
+
+
+@cli.command()
+@click.option("--clear", is_flag=True, help="Clear the Snowflake channel cache.")
+@click.option("--package", type=str, help="Only clear the entry for this package.")
+@click.option(
+    "--builds", is_flag=True, help="Clear the package build cache (builds and wheels)."
+)
+def cache(clear, package, builds):
+    """Manage the Snowflake Anaconda channel cache."""
+    from snowdev import SnowHelper
+    from snowdev.functions.build_cache import BuildCache
+
+    channel_cache = SnowHelper.get_channel_cache()
+    if builds:
+        build_cache = BuildCache()
+        build_cache.clear()
+        print(colored(f"Cleared build cache {build_cache.root}.", "green"))
+        return
+    if clear:
+        SnowHelper.clear_channel_cache(package)
+        target = f"entry for {package}" if package else "cache"
+        print(colored(f"Cleared channel {target}.", "green"))
+        return
+    print(colored(f"Channel cache: {channel_cache.path}", "cyan"))
+    print(colored(f"TTL (seconds): {channel_cache.ttl}", "cyan"))
 
 
 @cli.command()
@@ -140,6 +296,8 @@ def deploy(sproc, udf, streamlit, task):
 @click.pass_context
 def task(ctx, name, action):
     """Commands for tasks. Actions: resume, suspend, execute."""
+    from snowdev.deployment import DeploymentManager
+
     ctx.ensure_object(dict)
     ctx.obj["task_name"] = name
     manager = DeploymentManager()
@@ -1,21 +1,14 @@
 import os
 import shutil
 import subprocess
-from typing import Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 
 import toml
 from pydantic import BaseModel, validator
 from termcolor import colored
 
-from snowdev import (
-    SnowflakeConnection,
-    SnowflakeRegister,
-    SnowHelper,
-    SnowPackageZip,
-    StreamlitAppDeployer,
-    TaskDeployer,
-)
-
 
 class DeploymentArguments(BaseModel):
     udf: Optional[str]
@@ -25,6 +18,14 @@ class DeploymentArguments(BaseModel):
     upload: Optional[str]
     package: Optional[str]
     task: Optional[str]
+    all: bool = False
+    workers: Optional[int]
+    force: bool = False
+    temp_check: bool = False
+    task_graph: bool = False
+    resume: bool = False
+    batch: bool = False
+    dry_run: bool = False
 
     @validator("udf", "sproc", "streamlit", "task", pre=True, always=True)
     def path_exists(cls, value, values, field, **kwargs):
@@ -54,25 +55,52 @@ class DeploymentManager:
     STREAMLIT_PATH = "src/streamlit/"
     TASK_PATH = "src/task/"
 
-    def __init__(self, args=None):
+    COMPONENT_FILES = {
+        "udf": "app.py",
+        "sproc": "app.py",
+        "streamlit": "streamlit_app.py",
+        "task": "app.sql",
+    }
+
+    def __init__(self, args=None, session=None, manifest=None):
+        from snowdev import DeployManifest, SnowflakeConnection
+
         self.args = args
         self.stage_name = "SNOWDEV"
-        self.session = SnowflakeConnection().get_session()
+        self.session = session or SnowflakeConnection().get_session()
         self.current_database = self.session.get_current_database().replace('"', "")
         self.current_schema = self.session.get_current_schema().replace('"', "")
+        self.manifest = manifest or DeployManifest(
+            self.session,
+            self.stage_name,
+            force=bool(getattr(args, "force", False)),
+        )
 
     def handle_deployment_error(self, e, deployment_type):
         error_msg = colored(f"Error deploying {deployment_type}: {e}", "red")
         raise Exception(error_msg)
 
     def main(self):
+        try:
+            return self._run()
+        finally:
+            self.manifest.flush()
+
+    def _run(self):
+        if self.args.all:
+            return self.deploy_all(max_workers=self.args.workers)
+
+        if self.args.task_graph:
+            return self.deploy_task_graph(
+                max_workers=self.args.workers, resume=self.args.resume
+            )
+
         if self.args.test:
             self.test_locally()
             return
 
         if self.args.upload == "static":
-            self.upload_static()
-            return
+            return self.upload_static(max_workers=self.args.workers)
 
         if self.args.package:
             self.deploy_package()
@@ -86,41 +114,249 @@ class DeploymentManager:
 
         for arg_key, path in deployment_path_map.items():
             arg_value = getattr(self.args, arg_key, None)
+            if arg_value and self.args.dry_run:
+                print(colored("--dry-run only applies to tasks.", "yellow"))
+                return True
             if arg_value:
                 # Adjust the filename based on the arg_key
-                filename = "streamlit_app.py" if arg_key == "streamlit" else "app.py"
-                self.deploy(arg_key, f"{path}{arg_value}/{filename}")
-                break
+                filename = self.COMPONENT_FILES[arg_key]
+                return self.deploy(arg_key, f"{path}{arg_value}/{filename}")
         else:
             if self.args.task:
-                self.deploy_task(self.args.task)
+                return self.deploy_task(self.args.task)
             elif self.args.pipe:
-                self.deploy_pipe(self.args.pipe)
+                return self.deploy_pipe(self.args.pipe)
 
     def deploy(self, deployment_type, filepath):
         if deployment_type in ["udf", "sproc"]:
             is_sproc = deployment_type == "sproc"
-            self.deploy_function(filepath, is_sproc)
+            return self.deploy_function(filepath, is_sproc)
         elif deployment_type == "streamlit":
-            self.deploy_streamlit(filepath)
+            return self.deploy_streamlit(filepath)
+
+    @classmethod
+    def discover_components(cls) -> List[Tuple[str, str]]:
+        """
+        Find every deployable component under src/, as (type, name) pairs.
+
+        A directory counts as a component when it holds the file `deploy`
+        expects for its type (app.py, streamlit_app.py or app.sql).
+        """
+        base_paths = {
+            "udf": cls.UDF_PATH,
+            "sproc": cls.SPROC_PATH,
+            "streamlit": cls.STREAMLIT_PATH,
+            "task": cls.TASK_PATH,
+        }
+        components = []
+        for component_type, base_path in base_paths.items():
+            if not os.path.isdir(base_path):
+                continue
+            for name in sorted(os.listdir(base_path)):
+                filepath = os.path.join(
+                    base_path, name, cls.COMPONENT_FILES[component_type]
+                )
+                if os.path.isfile(filepath):
+                    components.append((component_type, name))
+        return components
+
+    def deploy_component(self, component_type, name):
+        """Deploy one component and return True if it succeeded."""
+        if component_type == "task":
+            return self.deploy_task(name) is not False
+        base_path = {
+            "udf": self.UDF_PATH,
+            "sproc": self.SPROC_PATH,
+            "streamlit": self.STREAMLIT_PATH,
+        }[component_type]
+        filepath = os.path.join(base_path, name, self.COMPONENT_FILES[component_type])
+        return self.deploy(component_type, filepath) is not False
+
+    def _pooled_deployer(self):
+        """Return a function deploying one component on a pooled session."""
+        from snowdev import SnowflakeConnection
+
+        pool = SnowflakeConnection.session_pool()
+        connection_parameters = (
+            SnowflakeConnection._get_connection_parameters_from_env()
+        )
+
+        def deploy_one(component):
+            component_type, name = component
+            start = time.monotonic()
+            try:
+                with pool.session(connection_parameters) as session:
+                    manager = DeploymentManager(
+                        self.args, session=session, manifest=self.manifest
+                    )
+                    succeeded = manager.deploy_component(component_type, name)
+                error = None if succeeded else "deployment reported a failure"
+            except Exception as e:
+                succeeded, error = False, str(e)
+            return component, succeeded, error, time.monotonic() - start
+
+        return deploy_one
+
+    def _load_task_graph(self):
+        """
+        Return `(graph, None)`, or `(None, result)` when src/task/ has a
+        duplicate task name or a cycle, with the error as a failed task
+        step in the deploy summary format.
+        """
+        from snowdev import TaskGraph
+
+        try:
+            graph = TaskGraph.from_directory(self.TASK_PATH)
+            graph.levels()
+        except ValueError as e:
+            return None, (("task", "graph"), False, str(e), 0.0)
+        return graph, None
+
+    def _deploy_tasks(self, deploy_one, workers, resume=False):
+        """
+        Deploy src/task/ as a TaskGraph, each task through `deploy_one`, and
+        return the results in the deploy summary format.
+        """
+        from snowdev import TaskGraphDeployer
+
+        graph, error = self._load_task_graph()
+        if error:
+            return [error]
+
+        def deploy_node(node):
+            _, succeeded, error, _ = deploy_one(("task", node.directory))
+            if not succeeded:
+                raise RuntimeError(error)
+
+        results = TaskGraphDeployer(
+            self.session, graph, deploy_node, max_workers=workers
+        ).deploy(resume=resume, dry_run=bool(getattr(self.args, "dry_run", False)))
+        return [
+            (("task", node.directory), succeeded, error, elapsed)
+            for node, succeeded, error, elapsed in results
+        ]
+
+    def deploy_all(self, max_workers=None):
+        """
+        Deploy every component under src/ over a bounded pool of sessions.
+
+        UDFs, stored procedures and Streamlit apps are deployed concurrently,
+        each one on a session checked out from the process-wide SessionPool,
+        so warm sessions are reused across components. Tasks follow once
+        they are done, since they usually call those procedures, in the
+        order of their task graph. Returns True only if every component
+        deployed.
+        """
+        from snowdev import SnowHelper
+
+        components = self.discover_components()
+        if not components:
+            print(colored("No components found under src/.", "yellow"))
+            return True
+
+        workers = min(SnowHelper.get_max_workers(max_workers), len(components))
+        print(
+            colored(
+                f"Deploying {len(components)} components with {workers} workers...",
+                "cyan",
+            )
+        )
+
+        # Every component shares the schema's StageManager, so the stage is
+        # created here once instead of by each deployer.
+        if not self.args.dry_run:
+            self.create_stage(self.stage_name)
+
+        deploy_one = self._pooled_deployer()
+        functions = [c for c in components if c[0] != "task"]
+        if self.args.dry_run:
+            # Only task SQL has a plan to show.
+            functions = []
+        results = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results.extend(executor.map(deploy_one, functions))
+        if any(c[0] == "task" for c in components):
+            results.extend(self._deploy_tasks(deploy_one, workers))
+
+        return self._print_deploy_summary(results)
+
+    def deploy_task_graph(self, max_workers=None, resume=False):
+        """
+        Deploy every task under src/task/ as a dependency graph.
+
+        Procedures the tasks CALL that live under src/sproc/ are deployed
+        first, in parallel. Tasks follow level by level: independent
+        branches in parallel, each task after its AFTER predecessors.
+        Running task trees are suspended while they change and resumed
+        afterwards; with `resume=True` every tree is resumed.
+        """
+        from snowdev import SnowHelper
+
+        graph, error = self._load_task_graph()
+        if error:
+            return self._print_deploy_summary([error])
+        if not graph.nodes:
+            print(colored("No tasks found under src/task/.", "yellow"))
+            return True
+
+        workers = SnowHelper.get_max_workers(max_workers)
+        called = set(graph.procedures())
+        procedures = [
+            component
+            for component in self.discover_components()
+            if component[0] == "sproc" and component[1].upper() in called
+        ]
+        print(
+            colored(
+                f"Deploying {len(graph.nodes)} tasks in {len(graph.levels())} levels "
+                f"and {len(procedures)} procedures they call...",
+                "cyan",
+            )
+        )
+
+        if not self.args.dry_run:
+            self.create_stage(self.stage_name)
+        deploy_one = self._pooled_deployer()
+        results = []
+        if procedures and not self.args.dry_run:
+            with ThreadPoolExecutor(
+                max_workers=min(workers, len(procedures))
+            ) as executor:
+                results.extend(executor.map(deploy_one, procedures))
+        results.extend(self._deploy_tasks(deploy_one, workers, resume=resume))
+        return self._print_deploy_summary(results)
+
+    @staticmethod
+    def _print_deploy_summary(results):
+        print(colored("\n========== Deployment summary ==========", "cyan"))
+        failures = 0
+        for (component_type, name), succeeded, error, elapsed in results:
+            label = f"{component_type} {name} ({elapsed:.1f}s)"
+            if succeeded:
+                print(colored(f"✅ {label}", "green"))
+            else:
+                failures += 1
+                print(colored(f"❌ {label}: {error}", "red"))
+        summary = f"{len(results) - failures} succeeded, {failures} failed."
+        print(colored(summary, "red" if failures else "green"))
+        return failures == 0
 
     def deploy_function(self, filepath, is_sproc):
+        from snowdev import SnowflakeRegister, SnowHelper
+
         dir_path, filename = os.path.split(filepath)
         function_name = os.path.basename(dir_path)
         packages = self.get_packages_from_toml(dir_path)
         imports = self.get_imports(dir_path)
-        # Extract just the package names without versions
-        package_names = [pkg.split("==")[0] for pkg in packages]
-
+        # Check the declared constraints, not just the package names
         packages_to_check = [
             package
-            for package in package_names
-            if package != "snowflake-snowpark-python"
+            for package in packages
+            if SnowHelper.split_requirement(package)[0] != "snowflake-snowpark-python"
         ]
+        resolved_packages = SnowHelper.resolve_packages(packages_to_check)
         unavailable_packages = [
-            package
-            for package in packages_to_check
-            if not SnowHelper.is_package_available_in_snowflake_channel(package)
+            package for package, version in resolved_packages.items() if not version
         ]
 
         if unavailable_packages:
@@ -136,49 +372,83 @@ class DeploymentManager:
                     "yellow",
                 )
             )
-            return
+            return False
 
         # print("packages are----", packages)
         try:
-            self.snow_deploy = SnowflakeRegister(session=self.session)
-            self.snow_deploy.main(
+            self.create_stage(self.stage_name)
+            self.snow_deploy = SnowflakeRegister(
+                session=self.session, manifest=self.manifest
+            )
+            deployed = self.snow_deploy.main(
                 func=filepath,
                 function_name=function_name,
                 stage_location=self.stage_name,
                 packages=packages,
                 imports=imports,
                 is_sproc=is_sproc,
+                resolved_packages=resolved_packages,
+                validation=(
+                    "temp" if getattr(self.args, "temp_check", False) else "local"
+                ),
             )
-            success_msg = colored(
-                f"Deployed {'stored procedure' if is_sproc else 'UDF'} {function_name} successfully.",
-                "green",
-            )
-            print(success_msg)
+            if deployed:
+                success_msg = colored(
+                    f"Deployed {'stored procedure' if is_sproc else 'UDF'} {function_name} successfully.",
+                    "green",
+                )
+                print(success_msg)
+            return True
         except Exception as e:
             self.handle_deployment_error(e, "stored procedure" if is_sproc else "UDF")
 
     def deploy_streamlit(self, filepath):
+        from snowdev import StreamlitAppDeployer
+
         deployer = StreamlitAppDeployer(
-            session=self.session, stage_name=self.stage_name
+            session=self.session,
+            stage_name=self.stage_name,
+            manifest=self.manifest,
+            max_workers=getattr(self.args, "workers", None),
         )
         try:
-            deployer.handler_streamlit(filepath=filepath)
+            return deployer.handler_streamlit(filepath=filepath)
         except Exception as e:
             self.handle_deployment_error(e, "Streamlit app")
 
-    def deploy_package(self, package_name, upload):
+    def deploy_package(
+        self, package_name, upload, python_version=None, platform=None, layers=False
+    ):
+        from snowdev import SnowPackageZip
+
         try:
             SnowPackageZip(
                 self.session,
                 self.stage_name,
-            ).deploy_package(package_name, upload)
+                python_version=python_version,
+                platform=platform,
+            ).deploy_package(package_name, upload, layers=layers)
         except Exception as e:
             self.handle_deployment_error(e, "package")
 
+    def gc_layers(self, dry_run=False):
+        """Remove package layers that no component's imports.txt references."""
+        from snowdev import LayerStore
+
+        store = LayerStore(
+            self.session,
+            f"{self.current_database}.{self.current_schema}.{self.stage_name}",
+        )
+        return store.gc(LayerStore.referenced("src"), dry_run=dry_run)
+
     def get_packages_from_toml(self, dir_path):
+        from snowdev import SnowHelper
+
         return SnowHelper.get_packages_from_toml(dir_path)
 
     def get_imports(self, dir_path):
+        from snowdev import SnowHelper
+
         try:
             return SnowHelper.get_imports(dir_path)
         except Exception:
@@ -227,59 +497,73 @@ class DeploymentManager:
         for package, version in external_deps.items():
             subprocess.call(["poetry", "add", f"{package}=={version}"])
 
+    @property
+    def stages(self):
+        from snowdev import StageManager
+
+        return StageManager.for_session(self.session)
+
     def stage_exists(self, stage_name):
-        try:
-            query = f"DESC STAGE {stage_name};"
-            self.session.sql(query).collect()
-            return True
-        except:
-            return False
+        return self.stages.exists(self.session, stage_name)
 
     def create_stage(self, stage_name):
         try:
-            query = f"CREATE STAGE {stage_name};"
-            self.session.sql(query).collect()
-            success_msg = colored(f"Stage {stage_name} created successfully.", "green")
-            print(success_msg)
+            self.stages.ensure(self.session, stage_name)
         except Exception as e:
             error_msg = colored(f"Error creating stage {stage_name}: {e}", "red")
             raise Exception(error_msg)
 
-    def upload_static(self):
+    def upload_static(self, max_workers=None, delete=False, dry_run=False):
+        """
+        Sync static/ to @stage/static/, uploading only new or changed files.
+
+        Every file is placed directly under static/ on the stage, whatever
+        its local subdirectory. With `delete=True` stage files that no longer
+        exist locally are removed; with `dry_run=True` only the plan is shown.
+        """
+        from snowdev import StageSync
+
         static_folder = "static"
         stage_location = (
             f"{self.current_database}.{self.current_schema}.{self.stage_name}"
         )
 
-        if not self.stage_exists(stage_location):
-            warning = colored(
-                f"Stage {stage_location} does not exist. Creating it...", "yellow"
-            )
-            print(warning)
+        if dry_run:
+            if not self.stage_exists(stage_location):
+                print(colored(f"Stage {stage_location} does not exist.", "yellow"))
+                return True
+        else:
             self.create_stage(stage_location)
 
-        if os.path.isdir(static_folder) and len(os.listdir(static_folder)) > 0:
-            for root, dirs, files in os.walk(static_folder):
-                for file in files:
-                    info_msg = colored(
-                        f"Uploading file {file} to stage {stage_location}", "blue"
-                    )
-                    print(info_msg)
-                    file_path = os.path.join(root, file)
-                    remote_path = f"@{stage_location}/static/"
-                    self.session.file.put(
-                        file_path, remote_path, overwrite=True, auto_compress=False
-                    )
+        if not os.path.isdir(static_folder) or not os.listdir(static_folder):
+            return True
+
+        stage_sync = StageSync(
+            self.session, f"{stage_location}/static", max_workers=max_workers
+        )
+        files = StageSync.local_files(static_folder, flatten=True)
+        # Files are flattened into static/, so leave subdirectories such as
+        # static/packages/ (written by 'snowdev add') alone.
+        return stage_sync.sync(files, delete=delete, dry_run=dry_run, recursive=False)
 
     def deploy_task(self, taskname, option=None):
+        from snowdev import TaskDeployer
+
         deployer = TaskDeployer(self.session, self.stage_name)
-        deployer.deploy_task(taskname, option=option)
+        return deployer.deploy_task(
+            taskname,
+            option=option,
+            batch=bool(getattr(self.args, "batch", False)),
+            dry_run=bool(getattr(self.args, "dry_run", False)),
+        )
 
     def deploy_pipe(self, pipe_name):
         pass
 
     @staticmethod
     def create_directory_structure():
+        from snowdev import SnowHelper
+
         dirs_to_create = {
             "src": ["sproc", "streamlit", "udf", "task"],
             "static": ["packages"],
@@ -306,7 +590,7 @@ class DeploymentManager:
         if not os.path.exists(".gitignore"):
             structure_already_exists = False
             with open(".gitignore", "w") as f:
-                f.write("*.pyc\n__pycache__/\n.env\ncompiled/")
+                f.write("*.pyc\n__pycache__/\n.env\ncompiled/\n.snowdev/")
 
         if not os.path.exists("pyproject.toml"):
             structure_already_exists = False
@@ -1,2 +1,16 @@
-from .connect import SnowflakeConnection
-from .helper import SnowHelper
+import importlib
+
+_LAZY_IMPORTS = {
+    "SnowflakeConnection": ".connect",
+    "SnowHelper": ".helper",
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+
+def __getattr__(name):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
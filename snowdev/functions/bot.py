@@ -6,7 +6,6 @@ import pkg_resources
 import toml
 from langchain.chains import RetrievalQA
 from langchain.chat_models import ChatOpenAI
-from langchain.embeddings.openai import OpenAIEmbeddings
 from langchain.prompts.prompt import PromptTemplate
 from langchain.vectorstores import Chroma
 from termcolor import colored
@@ -20,6 +19,11 @@ from snowdev.functions.utils.templates.streamlit import (
 )
 from snowdev.functions.utils.templates.udf import TEMPLATE as UDF_TEMPLATE
 from snowdev.functions.utils.templates.task import TEMPLATE as TASK_TEMPLATE
+from snowdev.functions.utils.embedding import (
+    BatchedEmbeddings,
+    collection_name,
+    get_embeddings,
+)
 from snowdev.functions.utils.ingest import DocumentProcessor, Secrets, Config
 from snowdev.functions.utils.snowpark_methods import SnowparkMethods
 import re
@@ -49,12 +53,12 @@ class SnowBot:
     }
 
     @staticmethod
-    def ai_embed():
+    def ai_embed(backend=None):
         """
         Embed all the documents in the knowledge folder.
         """
-        secrets = Secrets(OPENAI_API_KEY=os.environ["OPENAI_API_KEY"])
-        config = Config()
+        secrets = Secrets(OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY"))
+        config = Config(embedding_backend=backend) if backend else Config()
         doc_processor = DocumentProcessor(secrets, config)
         try:
             SnowparkMethods.generate_documentation()
@@ -207,7 +211,7 @@ class SnowBot:
             env_file.write(content)
 
     @staticmethod
-    def create_new_ai_component(component_name, prompt, template_type):
+    def create_new_ai_component(component_name, prompt, template_type, backend=None):
         # Ensure that the template_type is valid
         if template_type not in SnowBot.TEMPLATES:
             print(
@@ -232,11 +236,16 @@ class SnowBot:
             )
             return
 
-        # Embedding and retrieving the content
-        embeddings = OpenAIEmbeddings(
-            openai_api_key=os.environ["OPENAI_API_KEY"], model="text-embedding-ada-002"
+        # Embedding and retrieving the content, with the backend used by --embed
+        backend = backend or Config().embedding_backend
+        embeddings = BatchedEmbeddings(
+            get_embeddings(backend, os.environ.get("OPENAI_API_KEY"))
+        )
+        vectordb = Chroma(
+            persist_directory="chroma_db",
+            embedding_function=embeddings,
+            collection_name=collection_name(backend),
         )
-        vectordb = Chroma(persist_directory="chroma_db", embedding_function=embeddings)
         chain = SnowBot.get_chain_gpt(vectordb)
         res = chain(prompt)
         response_content = res["result"]
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from termcolor import colored
+
+from .channel_cache import ChannelCache
+
+
+class BuildCache:
+    """
+    Persistent build cache for package zips.
+
+    Packages are built for the Snowflake runtime rather than the host: wheels
+    for the target Python version and platform are fetched with
+    `pip download --only-binary=:all:` into a local wheelhouse and installed
+    from it with `pip install --target`, so no venv is needed and native
+    wheels have the right ABI. Requirements without a matching binary wheel
+    are built into wheels with the host pip, which only works for pure-Python
+    packages.
+
+    Each set of requirements, Python version and platform gets its own build
+    directory holding the installed `site-packages/`, reused until it is
+    older than ``ttl`` seconds. After that the wheels are refreshed from the
+    network, falling back to the wheelhouse when offline.
+
+    The cache lives in ``<SNOWDEV_CACHE_DIR>/builds``; the TTL can be set
+    with ``SNOWDEV_BUILD_CACHE_TTL`` (a negative value never expires). The
+    target defaults to ``SNOWDEV_PYTHON_VERSION`` (3.10) and
+    ``SNOWDEV_PLATFORM`` (manylinux2014_x86_64; several platforms may be
+    given, separated by commas).
+    """
+
+    DEFAULT_TTL = 7 * 24 * 60 * 60
+    DEFAULT_PYTHON_VERSION = "3.10"
+    DEFAULT_PLATFORM = "manylinux2014_x86_64"
+    MARKER = ".snowdev-build.json"
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        ttl: Optional[int] = None,
+        python_version: Optional[str] = None,
+        platform: Optional[str] = None,
+    ):
+        self.root = root or os.path.join(ChannelCache.default_cache_dir(), "builds")
+        if ttl is None:
+            ttl = int(os.environ.get("SNOWDEV_BUILD_CACHE_TTL", self.DEFAULT_TTL))
+        self.ttl = ttl
+        self.python_version = python_version or os.environ.get(
+            "SNOWDEV_PYTHON_VERSION", self.DEFAULT_PYTHON_VERSION
+        )
+        platform = platform or os.environ.get("SNOWDEV_PLATFORM", self.DEFAULT_PLATFORM)
+        self.platforms = [p.strip() for p in platform.split(",") if p.strip()]
+        self.wheelhouse = os.path.join(self.root, "wheels")
+        self.pip_cache = os.path.join(self.root, "pip")
+
+    def target_options(self) -> List[str]:
+        """pip options selecting wheels for the target Python and platforms."""
+        options = ["--python-version", self.python_version, "--implementation", "cp"]
+        for platform in self.platforms:
+            options += ["--platform", platform]
+        return options + ["--only-binary=:all:"]
+
+    def pip(self, *args: str) -> List[str]:
+        """A pip command line that uses the cache's own pip cache."""
+        return [sys.executable, "-m", "pip", *args, "--cache-dir", self.pip_cache]
+
+    def marker_environment(self) -> Dict[str, str]:
+        """
+        The PEP 508 marker environment of the target runtime, for deciding
+        which `; python_version < "3.8"` style requirements apply to it.
+        """
+        platform = self.platforms[0] if self.platforms else self.DEFAULT_PLATFORM
+        machine = re.sub(r"^(?:many|musl)?linux[\d_]*?_(?=[a-z])", "", platform)
+        return {
+            "implementation_name": "cpython",
+            "implementation_version": f"{self.python_version}.0",
+            "os_name": "posix",
+            "platform_machine": machine,
+            "platform_python_implementation": "CPython",
+            "platform_release": "",
+            "platform_system": "Linux",
+            "platform_version": "",
+            "python_full_version": f"{self.python_version}.0",
+            "python_version": self.python_version,
+            "sys_platform": "linux",
+        }
+
+    def key(self, requirements: List[str], no_deps: bool = False) -> str:
+        payload = {
+            "requirements": sorted(requirements),
+            "python": self.python_version,
+            "platforms": self.platforms,
+        }
+        if no_deps:
+            payload["no_deps"] = True
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[
+            :16
+        ]
+
+    def build_dir(
+        self, name: str, requirements: List[str], no_deps: bool = False
+    ) -> str:
+        key = self.key(requirements, no_deps)
+        return os.path.join(self.root, "builds", f"{name}-{key}")
+
+    @staticmethod
+    def site_packages(build_dir: str) -> str:
+        return os.path.join(build_dir, "site-packages")
+
+    def _is_fresh(self, build_dir: str) -> bool:
+        marker = os.path.join(build_dir, self.MARKER)
+        if not os.path.exists(marker):
+            return False
+        return self.ttl < 0 or time.time() - os.path.getmtime(marker) <= self.ttl
+
+    def build_wheels(self, requirements: List[str], no_deps: bool = False) -> None:
+        """
+        Build wheels for `requirements` into the wheelhouse with the host pip,
+        for packages that have no binary wheel for the target. Only the
+        pure-Python (`py3-none-any`) wheels are usable on the target.
+        """
+        os.makedirs(self.wheelhouse, exist_ok=True)
+        subprocess.check_call(
+            self.pip("wheel", "--quiet", "--wheel-dir", self.wheelhouse)
+            + ["--find-links", self.wheelhouse]
+            + (["--no-deps"] if no_deps else [])
+            + requirements
+        )
+
+    def _download_wheels(self, requirements: List[str], no_deps: bool) -> None:
+        os.makedirs(self.wheelhouse, exist_ok=True)
+        deps = ["--no-deps"] if no_deps else []
+        try:
+            subprocess.check_call(
+                self.pip("download", "--quiet", "--dest", self.wheelhouse)
+                + deps
+                + self.target_options()
+                + requirements
+            )
+            return
+        except subprocess.CalledProcessError:
+            pass
+        try:
+            self.build_wheels(requirements, no_deps)
+        except subprocess.CalledProcessError:
+            print(
+                colored(
+                    "Could not refresh wheels from the network. Using cached wheels.",
+                    "yellow",
+                )
+            )
+
+    def environment(
+        self, name: str, requirements: List[str], no_deps: bool = False
+    ) -> Tuple[str, bool]:
+        """
+        Return the build directory for `requirements` and whether it was reused.
+
+        The installed packages are in `site_packages(build_dir)`. With
+        `no_deps` only the listed requirements are installed, which is how a
+        pinned, already resolved set of packages is built.
+        """
+        build_dir = self.build_dir(name, requirements, no_deps)
+        if self._is_fresh(build_dir):
+            print(colored(f"Reusing cached build {build_dir}", "blue"))
+            return build_dir, True
+
+        shutil.rmtree(build_dir, ignore_errors=True)
+        os.makedirs(build_dir)
+        print(
+            colored(
+                f"Building {' '.join(requirements)} for Python {self.python_version} "
+                f"on {', '.join(self.platforms)}",
+                "blue",
+            )
+        )
+        self._download_wheels(requirements, no_deps)
+        subprocess.check_call(
+            self.pip("install", "--quiet", "--no-compile", "--no-index")
+            + ["--find-links", self.wheelhouse]
+            + ["--target", self.site_packages(build_dir)]
+            + (["--no-deps"] if no_deps else [])
+            + self.target_options()
+            + requirements
+        )
+        with open(os.path.join(build_dir, self.MARKER), "w") as f:
+            json.dump(
+                {
+                    "requirements": requirements,
+                    "no_deps": no_deps,
+                    "python": self.python_version,
+                    "platforms": self.platforms,
+                },
+                f,
+                indent=2,
+            )
+        return build_dir, False
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
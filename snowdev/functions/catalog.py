@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+
+class EntitySignature(NamedTuple):
+    name: str
+    arg_types: List[str]
+    return_type: str
+
+    @property
+    def arguments(self) -> str:
+        """Argument types as used in `DROP FUNCTION name(<arguments>)`."""
+        return ", ".join(self.arg_types)
+
+
+def _split_top_level(text: str) -> List[str]:
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append("".join(current))
+    return parts
+
+
+def parse_signature(text: str) -> EntitySignature:
+    """
+    Parse the `arguments` column of SHOW FUNCTIONS / PROCEDURES.
+
+    `MY_FUNC(VARCHAR, NUMBER(38,0) [, FLOAT]) RETURN TABLE (A VARCHAR)` gives
+    name `MY_FUNC`, arg types `['VARCHAR', 'NUMBER(38,0)', 'FLOAT']` and
+    return type `TABLE (A VARCHAR)`. Optional arguments are included.
+    """
+    text = text.strip()
+    start = text.find("(")
+    if start < 0:
+        return EntitySignature(text, [], "")
+
+    depth = 0
+    end = len(text)
+    for index in range(start, len(text)):
+        if text[index] == "(":
+            depth += 1
+        elif text[index] == ")":
+            depth -= 1
+            if depth == 0:
+                end = index
+                break
+
+    arg_types = []
+    for part in _split_top_level(text[start + 1 : end]):
+        part = part.replace("[", "").replace("]", "").strip()
+        if part:
+            arg_types.append(part)
+
+    return_type = text[end + 1 :].strip()
+    if return_type.upper().startswith("RETURN "):
+        return_type = return_type[len("RETURN ") :].strip()
+    return EntitySignature(text[:start].strip(), arg_types, return_type)
+
+
+class SchemaCatalog:
+    """
+    Functions and procedures of one schema, loaded with one SHOW per kind.
+
+    Catalogs are shared by every session with the same account, role,
+    database and schema, so batch deploys list the schema once instead of
+    issuing several `SHOW ... LIKE` queries per component. The role is part
+    of the key because SHOW only lists what the role can see. A catalog
+    holds no session: each lookup runs on the session passed to it.
+    Registering or dropping an entity invalidates only that name, under
+    every role; the next lookup of it refreshes just that name.
+    """
+
+    SHOW_COMMANDS = {"FUNCTION": "USER FUNCTIONS", "PROCEDURE": "PROCEDURES"}
+
+    _catalogs: Dict[Tuple[str, str, str, str], "SchemaCatalog"] = {}
+    _catalogs_lock = threading.Lock()
+
+    def __init__(self, key: Tuple[str, str, str, str] = ("", "", "", "")):
+        self.key = key
+        self._entities: Dict[str, Optional[Dict[str, List[EntitySignature]]]] = {
+            kind: None for kind in self.SHOW_COMMANDS
+        }
+        self._stale: Dict[str, Set[str]] = {kind: set() for kind in self.SHOW_COMMANDS}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _schema_key(session) -> Tuple[str, str, str, str]:
+        return tuple(
+            str(value or "").replace('"', "").upper()
+            for value in (
+                session.get_current_account(),
+                session.get_current_role(),
+                session.get_current_database(),
+                session.get_current_schema(),
+            )
+        )
+
+    @classmethod
+    def for_session(cls, session) -> "SchemaCatalog":
+        """The catalog of the session's current role and schema."""
+        key = cls._schema_key(session)
+        with cls._catalogs_lock:
+            catalog = cls._catalogs.get(key)
+            if catalog is None:
+                catalog = cls._catalogs[key] = cls(key)
+        return catalog
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._catalogs_lock:
+            cls._catalogs.clear()
+
+    def _show(self, session, kind: str, name: Optional[str] = None) -> Dict:
+        sql = f"SHOW {self.SHOW_COMMANDS[kind]}"
+        if name is not None:
+            sql += f" LIKE '{name}'"
+        sql += " IN SCHEMA"
+        entities: Dict[str, List[EntitySignature]] = {}
+        for row in session.sql(sql).collect():
+            signature = parse_signature(row["arguments"])
+            entities.setdefault(row["name"].upper(), []).append(signature)
+        return entities
+
+    def _lookup(self, session, kind: str, name: str) -> List[EntitySignature]:
+        name = name.upper()
+        with self._lock:
+            entities = self._entities[kind]
+            if entities is None:
+                entities = self._entities[kind] = self._show(session, kind)
+                self._stale[kind].clear()
+            elif name in self._stale[kind]:
+                refreshed = self._show(session, kind, name).get(name)
+                if refreshed:
+                    entities[name] = refreshed
+                else:
+                    entities.pop(name, None)
+                self._stale[kind].discard(name)
+            return list(entities.get(name, []))
+
+    def exists(self, session, kind: str, name: str) -> bool:
+        return bool(self._lookup(session, kind, name))
+
+    def signatures(self, session, kind: str, name: str) -> List[EntitySignature]:
+        """Every overload of `name`, in SHOW order."""
+        return self._lookup(session, kind, name)
+
+    def invalidate(self, kind: Optional[str] = None, name: Optional[str] = None):
+        """
+        Forget one name, or everything of a kind, or the whole schema, in
+        the catalogs of every role on this schema.
+        """
+        with self._catalogs_lock:
+            peers = [
+                catalog
+                for key, catalog in self._catalogs.items()
+                if key[:1] + key[2:] == self.key[:1] + self.key[2:]
+            ]
+        if self not in peers:
+            peers.append(self)
+        for catalog in peers:
+            catalog._forget(kind, name)
+
+    def _forget(self, kind: Optional[str], name: Optional[str]):
+        with self._lock:
+            for each in [kind] if kind else list(self.SHOW_COMMANDS):
+                if name is None or self._entities[each] is None:
+                    self._entities[each] = None
+                    self._stale[each].clear()
+                else:
+                    self._stale[each].add(name.upper())
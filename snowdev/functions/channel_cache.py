@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from termcolor import colored
+
+
+class ChannelCache:
+    """
+    On-disk cache of Snowflake Anaconda channel lookups.
+
+    Every entry maps a package name to the list of versions the channel
+    returned for it (an empty list means the package was not found) and the
+    time it was fetched. Entries older than ``ttl`` seconds are ignored.
+
+    The location and TTL can be overridden with the ``SNOWDEV_CACHE_DIR`` and
+    ``SNOWDEV_CHANNEL_CACHE_TTL`` environment variables.
+    """
+
+    DEFAULT_TTL = 24 * 60 * 60
+    FILENAME = "channel.json"
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[int] = None):
+        self.path = path or os.path.join(self.default_cache_dir(), self.FILENAME)
+        if ttl is None:
+            ttl = int(os.environ.get("SNOWDEV_CHANNEL_CACHE_TTL", self.DEFAULT_TTL))
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict]] = None
+
+    @staticmethod
+    def default_cache_dir() -> str:
+        return os.environ.get(
+            "SNOWDEV_CACHE_DIR",
+            os.path.join(os.path.expanduser("~"), ".cache", "snowdev"),
+        )
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            try:
+                with open(self.path, "r") as f:
+                    self._entries = json.load(f)
+            except FileNotFoundError:
+                self._entries = {}
+            except (json.JSONDecodeError, OSError):
+                print(
+                    colored(
+                        f"Channel cache {self.path} is unreadable. Starting with an empty cache.",
+                        "yellow",
+                    )
+                )
+                self._entries = {}
+        return self._entries
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file first so concurrent readers never see a
+        # partially written cache.
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            print(colored(f"Failed to write channel cache {self.path}: {e}", "yellow"))
+
+    def get(self, package_name: str) -> Optional[List[str]]:
+        """Return the cached versions for a package, or None on a miss."""
+        with self._lock:
+            entry = self._load().get(package_name.lower())
+            if entry is None:
+                return None
+            if self.ttl >= 0 and time.time() - entry["fetched_at"] > self.ttl:
+                return None
+            return list(entry["versions"])
+
+    def set(self, package_name: str, versions: List[str]) -> None:
+        with self._lock:
+            self._load()[package_name.lower()] = {
+                "versions": list(versions),
+                "fetched_at": time.time(),
+            }
+            self._save()
+
+    def invalidate(self, package_name: Optional[str] = None) -> None:
+        """Drop one package from the cache, or the whole cache if no name is given."""
+        with self._lock:
+            entries = self._load()
+            if package_name is None:
+                entries.clear()
+            else:
+                entries.pop(package_name.lower(), None)
+            self._save()
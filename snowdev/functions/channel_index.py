@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import time
+import urllib.request
+from typing import Dict, Iterable, List, Optional
+
+from termcolor import colored
+
+from .channel_cache import ChannelCache
+
+
+class ChannelIndex:
+    """
+    In-memory name -> versions index built from a conda channel's repodata.
+
+    The index is built once from ``repodata.json`` of every subdir and then
+    answers availability and version questions without starting conda.
+
+    Attributes
+    ----------
+    packages : Dict[str, List[str]]
+        Every version published for each (lower-cased) package name.
+    """
+
+    SUBDIRS = ("linux-64", "noarch")
+    DEFAULT_TTL = 24 * 60 * 60
+    TIMEOUT = 60
+
+    def __init__(self, packages: Dict[str, List[str]]):
+        self.packages = packages
+
+    @classmethod
+    def from_repodata(cls, repodata_list: Iterable[Dict]) -> "ChannelIndex":
+        packages: Dict[str, List[str]] = {}
+        for repodata in repodata_list:
+            for section in ("packages", "packages.conda"):
+                for info in repodata.get(section, {}).values():
+                    versions = packages.setdefault(info["name"].lower(), [])
+                    if info["version"] not in versions:
+                        versions.append(info["version"])
+        return cls(packages)
+
+    @classmethod
+    def from_files(cls, paths: Iterable[str]) -> "ChannelIndex":
+        repodata_list = []
+        for path in paths:
+            with open(path, "r") as f:
+                repodata_list.append(json.load(f))
+        return cls.from_repodata(repodata_list)
+
+    @classmethod
+    def load(
+        cls,
+        channel_url: str,
+        cache_dir: Optional[str] = None,
+        ttl: Optional[int] = None,
+    ) -> "ChannelIndex":
+        """
+        Build the index for a channel URL.
+
+        Each subdir's repodata is downloaded at most once per ``ttl`` seconds
+        and kept in ``cache_dir``. If the download fails, the cached copy is
+        used regardless of its age, so the index keeps working offline.
+        """
+        cache_dir = cache_dir or ChannelCache.default_cache_dir()
+        if ttl is None:
+            ttl = int(os.environ.get("SNOWDEV_CHANNEL_CACHE_TTL", cls.DEFAULT_TTL))
+
+        paths = []
+        for subdir in cls.SUBDIRS:
+            path = os.path.join(cache_dir, f"repodata-{subdir}.json")
+            if not cls._is_fresh(path, ttl):
+                url = f"{channel_url.rstrip('/')}/{subdir}/repodata.json"
+                try:
+                    cls._download(url, path)
+                except (OSError, ValueError) as e:
+                    if not os.path.exists(path):
+                        raise
+                    print(
+                        colored(
+                            f"Could not download {url} ({e}). Using cached copy {path}.",
+                            "yellow",
+                        )
+                    )
+            paths.append(path)
+        return cls.from_files(paths)
+
+    @staticmethod
+    def _is_fresh(path: str, ttl: int) -> bool:
+        if not os.path.exists(path):
+            return False
+        return ttl < 0 or time.time() - os.path.getmtime(path) <= ttl
+
+    @classmethod
+    def _download(cls, url: str, path: str) -> None:
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        print(colored(f"Downloading channel index {url}", "blue"))
+        with urllib.request.urlopen(url, timeout=cls.TIMEOUT) as response:
+            content = response.read()
+        # Validate before replacing a good cached copy with a broken download.
+        json.loads(content)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def versions(self, package_name: str) -> List[str]:
+        return list(self.packages.get(package_name.lower(), []))
+
+    def __contains__(self, package_name: str) -> bool:
+        return package_name.lower() in self.packages
@@ -1,11 +1,265 @@
 from __future__ import annotations
 
+import atexit
+import hashlib
+import json
 import os
-from typing import Any, Dict
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
 from termcolor import colored
 
-from snowflake.snowpark.session import Session
-from snowflake.snowpark.version import VERSION
+BANNER = """
+                                       _            
+            ___ _ __   _____      ____| | _____   __
+            / __| '_ \\ / _ \\ \\ /\\ / / _` |/ _ \\ \\ / /
+            \\__ \\ | | | (_) \\ V  V / (_| |  __/\\ V / 
+            |___/_| |_|\\___/ \\_/\\_/ \\__,_|\\___| \\_/  
+                                                    
+            """
+
+
+class SessionPool:
+    """
+    Process-wide pool of Snowpark sessions keyed by connection parameters.
+
+    Sessions come in two flavours:
+
+    - a *shared* session per key, handed to every SnowflakeConnection in the
+      process so sequential callers do not log in again. It is meant for
+      one caller at a time: each time it is handed out, the imports,
+      packages, role, database and schema the previous caller set are
+      reset. Work running in parallel threads must use exclusive sessions.
+    - *exclusive* sessions, checked out by one thread at a time for parallel
+      work and returned with `checkin` (or the `session` context manager).
+
+    Idle sessions are health-checked before reuse, and at most `max_size`
+    exclusive sessions exist per key. Sessions idle for longer than
+    `idle_timeout` seconds are closed on every checkout and checkin, and the
+    process-wide pool closes all of its sessions at exit. Returned sessions
+    get their imports, packages, role, database and schema reset to what
+    they were at login.
+
+    Attributes
+    ----------
+    max_size : int
+        Exclusive sessions per key (`SNOWDEV_SESSION_POOL_SIZE`, default 8).
+    idle_timeout : float
+        Seconds before an idle session is closed
+        (`SNOWDEV_SESSION_IDLE_TIMEOUT`, default 600).
+    health_check_after : float
+        Seconds of idleness after which a session is pinged before reuse.
+    """
+
+    _banner_shown = False
+    _banner_lock = threading.Lock()
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        health_check_after: float = 60,
+    ):
+        self.max_size = max_size or int(os.environ.get("SNOWDEV_SESSION_POOL_SIZE", 8))
+        self.idle_timeout = (
+            idle_timeout
+            if idle_timeout is not None
+            else float(os.environ.get("SNOWDEV_SESSION_IDLE_TIMEOUT", 600))
+        )
+        self.health_check_after = health_check_after
+        self._condition = threading.Condition()
+        self._idle: Dict[str, List[Tuple[Any, float]]] = {}
+        self._sizes: Dict[str, int] = {}
+        self._checked_out: Dict[int, Tuple[str, Any]] = {}
+        self._defaults: Dict[int, Dict[str, Optional[str]]] = {}
+        self._shared: Dict[str, Tuple[Any, float]] = {}
+        self._shared_lock = threading.Lock()
+
+    @staticmethod
+    def _key(connection_parameters: Dict[str, Any]) -> str:
+        payload = json.dumps(connection_parameters, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _create(self, connection_parameters: Dict[str, Any]):
+        from snowflake.snowpark.session import Session
+
+        with SessionPool._banner_lock:
+            if not SessionPool._banner_shown:
+                print(colored(BANNER, "cyan"))
+                SessionPool._banner_shown = True
+        session = Session.builder.configs(connection_parameters).create()
+        session.sql_simplifier_enabled = True
+        self._defaults[id(session)] = {
+            "role": session.get_current_role(),
+            "database": session.get_current_database(),
+            "schema": session.get_current_schema(),
+        }
+        return session
+
+    def _is_healthy(self, session, last_used: float) -> bool:
+        if time.monotonic() - last_used < self.health_check_after:
+            return True
+        try:
+            session.sql("SELECT 1").collect()
+            return True
+        except Exception:
+            return False
+
+    def _close(self, session) -> None:
+        self._defaults.pop(id(session), None)
+        try:
+            session.close()
+        except Exception:
+            pass
+
+    def get_shared(self, connection_parameters: Dict[str, Any]):
+        """
+        Return the long-lived session shared by every caller with these
+        parameters, reset to its login state if a previous caller used it.
+        """
+        key = self._key(connection_parameters)
+        with self._shared_lock:
+            entry = self._shared.get(key)
+            session = None
+            if entry is not None and self._is_healthy(*entry):
+                try:
+                    self._reset(entry[0])
+                    session = entry[0]
+                except Exception:
+                    pass
+            if session is None:
+                if entry is not None:
+                    self._close(entry[0])
+                session = self._create(connection_parameters)
+            self._shared[key] = (session, time.monotonic())
+            return session
+
+    def checkout(
+        self, connection_parameters: Dict[str, Any], timeout: Optional[float] = None
+    ):
+        """
+        Take an exclusive session, reusing an idle one when possible.
+
+        Blocks while `max_size` sessions for these parameters are checked
+        out; raises TimeoutError if none is returned within `timeout`.
+        """
+        key = self._key(connection_parameters)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._condition:
+                self.evict_idle()
+                while (
+                    not self._idle.get(key) and self._sizes.get(key, 0) >= self.max_size
+                ):
+                    remaining = (
+                        None if deadline is None else deadline - time.monotonic()
+                    )
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(
+                            f"No Snowflake session became available within {timeout} seconds."
+                        )
+                    self._condition.wait(remaining)
+                if self._idle.get(key):
+                    session, last_used = self._idle[key].pop()
+                else:
+                    session, last_used = None, None
+                    # Reserve the slot now and log in outside the lock.
+                    self._sizes[key] = self._sizes.get(key, 0) + 1
+
+            if session is not None and not self._is_healthy(session, last_used):
+                self._discard(key, session)
+                continue
+
+            if session is None:
+                try:
+                    session = self._create(connection_parameters)
+                except Exception:
+                    with self._condition:
+                        self._sizes[key] -= 1
+                        self._condition.notify()
+                    raise
+
+            with self._condition:
+                self._checked_out[id(session)] = (key, session)
+            return session
+
+    def checkin(self, session) -> None:
+        """Return an exclusive session to the pool."""
+        with self._condition:
+            entry = self._checked_out.pop(id(session), None)
+        if entry is None:
+            return
+        key = entry[0]
+        try:
+            self._reset(session)
+        except Exception:
+            self._discard(key, session)
+            return
+        with self._condition:
+            self._idle.setdefault(key, []).append((session, time.monotonic()))
+            self._condition.notify()
+            self.evict_idle()
+
+    @contextmanager
+    def session(self, connection_parameters: Dict[str, Any], timeout=None):
+        session = self.checkout(connection_parameters, timeout)
+        try:
+            yield session
+        finally:
+            self.checkin(session)
+
+    def _reset(self, session) -> None:
+        """Undo per-caller state so the next borrower starts clean."""
+        session.clear_imports()
+        session.clear_packages()
+        defaults = self._defaults.get(id(session), {})
+        actions = {
+            "role": (session.get_current_role, session.use_role),
+            "database": (session.get_current_database, session.use_database),
+            "schema": (session.get_current_schema, session.use_schema),
+        }
+        for key, (current, use) in actions.items():
+            if defaults.get(key) and current() != defaults[key]:
+                use(defaults[key])
+
+    def _discard(self, key: str, session) -> None:
+        self._close(session)
+        with self._condition:
+            self._sizes[key] = max(0, self._sizes.get(key, 0) - 1)
+            self._condition.notify()
+
+    def evict_idle(self) -> None:
+        """Close sessions that have been idle longer than `idle_timeout`."""
+        now = time.monotonic()
+        with self._condition:
+            for key, sessions in self._idle.items():
+                keep = []
+                for session, last_used in sessions:
+                    if now - last_used > self.idle_timeout:
+                        self._close(session)
+                        self._sizes[key] = max(0, self._sizes.get(key, 0) - 1)
+                    else:
+                        keep.append((session, last_used))
+                sessions[:] = keep
+            self._condition.notify_all()
+
+    def close_all(self) -> None:
+        """Close every session, including ones still checked out."""
+        with self._condition:
+            for sessions in self._idle.values():
+                for session, _ in sessions:
+                    self._close(session)
+            for _, session in self._checked_out.values():
+                self._close(session)
+            self._idle.clear()
+            self._checked_out.clear()
+            self._sizes.clear()
+            self._condition.notify_all()
+        with self._shared_lock:
+            for session, _ in self._shared.values():
+                self._close(session)
+            self._shared.clear()
 
 
 class SnowflakeConnection:
@@ -23,12 +277,18 @@ class SnowflakeConnection:
     -------
     get_session()
         Establishes and returns the Snowflake connection session.
+    session_pool()
+        Returns the process-wide SessionPool shared by every connection.
 
     """
 
+    pool: Optional[SessionPool] = None
+    _pool_lock = threading.Lock()
+
     def __init__(self):
         self.connection_parameters = self._get_connection_parameters_from_env()
         self.session = None
+        self.session_pool()
 
     @staticmethod
     def _get_connection_parameters_from_env() -> Dict[str, Any]:
@@ -50,23 +310,17 @@ class SnowflakeConnection:
             session: Snowflake connection session.
         """
         if self.session is None:
-            print(
-                colored(
-                    """
-                                       _            
-            ___ _ __   _____      ____| | _____   __
-            / __| '_ \ / _ \ \ /\ / / _` |/ _ \ \ / /
-            \__ \ | | | (_) \ V  V / (_| |  __/\ V / 
-            |___/_| |_|\___/ \_/\_/ \__,_|\___| \_/  
-                                                    
-            """,
-                    "cyan",
-                )
-            )
-            self.session = Session.builder.configs(self.connection_parameters).create()
-            self.session.sql_simplifier_enabled = True
+            self.session = self.pool.get_shared(self.connection_parameters)
         return self.session
 
+    @classmethod
+    def session_pool(cls) -> SessionPool:
+        with cls._pool_lock:
+            if cls.pool is None:
+                cls.pool = SessionPool()
+                atexit.register(cls.pool.close_all)
+        return cls.pool
+
     def _get_snowflake_environment_info(self):
         return self.session.sql(
             """
@@ -81,6 +335,8 @@ class SnowflakeConnection:
         ).collect()
 
     def __str__(self) -> str:
+        from snowflake.snowpark.version import VERSION
+
         snowflake_environment = self._get_snowflake_environment_info()
         snowpark_version = VERSION
 
@@ -2,13 +2,18 @@ from __future__ import annotations
 import json
 
 import os
+import re
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
-import pkg_resources
 import toml
 from pydantic import BaseModel
 from termcolor import colored
 
+from .channel_cache import ChannelCache
+from .channel_index import ChannelIndex
+from .versions import VersionIndex, VersionSpec, poetry_range, split_clauses
+
 
 class SnowHelperConfig(BaseModel):
     udf: str = None
@@ -19,6 +24,7 @@ class SnowHelperConfig(BaseModel):
 
 class SnowHelper:
     SNOWFLAKE_ANACONDA_URL = "https://repo.anaconda.com/pkgs/snowflake/"
+    DEFAULT_MAX_WORKERS = 8
 
     BASE_PATHS = {
         "udf": "src/udf",
@@ -29,6 +35,8 @@ class SnowHelper:
 
     @staticmethod
     def get_template_path(relative_path):
+        import pkg_resources
+
         return pkg_resources.resource_filename("snowdev", relative_path)
 
     TEMPLATES = {
@@ -67,13 +75,79 @@ class SnowHelper:
         data = toml.load(os.path.join(path, "app.toml"))
         dependencies = data["tool"]["poetry"]["dependencies"]
         dependencies.pop("python", None)
-        return [f"{pkg}=={version}" for pkg, version in dependencies.items()]
+        return [
+            cls.format_requirement(pkg, version)
+            for pkg, version in dependencies.items()
+        ]
+
+    @staticmethod
+    def format_requirement(package_name, version):
+        """
+        Turn an app.toml entry into a requirement Snowpark understands.
+        Poetry's `^1.2` and `~1.2` become explicit `>=,<` ranges, and a bare
+        version is pinned with `==`.
+        """
+        version = str(version).strip()
+        if version in ("", "*"):
+            return package_name
+        clauses = []
+        for clause in split_clauses(version):
+            poetry = re.match(r"^(\^|~(?!=))\s*(.+)$", clause)
+            if poetry:
+                clauses.append(poetry_range(*poetry.groups()))
+            elif clause[:1] in ("<", ">", "=", "!") or clause.startswith("~="):
+                clauses.append(clause)
+            else:
+                clauses.append(f"=={clause}")
+        return package_name + ",".join(clauses)
+
+    _channel_cache = None
+    _channel_index = None
+    _version_indexes = {}
 
     @classmethod
-    def search_package_in_snowflake_channel(cls, package_name):
-        if len(package_name) <= 1:
-            print(f"Invalid package name: {package_name}")
-            return None
+    def get_channel_cache(cls):
+        if cls._channel_cache is None:
+            cls._channel_cache = ChannelCache()
+        return cls._channel_cache
+
+    @classmethod
+    def clear_channel_cache(cls, package_name=None):
+        cls.get_channel_cache().invalidate(package_name)
+        cls._version_indexes.clear()
+
+    @staticmethod
+    def channel_mode():
+        """
+        How channel lookups are answered: "conda" runs `conda search` per
+        package, "index" resolves everything from the channel's repodata.
+        """
+        return os.environ.get("SNOWDEV_CHANNEL_MODE", "conda").lower()
+
+    @classmethod
+    def get_channel_index(cls):
+        """
+        Load the channel index once per process.
+
+        Set `SNOWDEV_REPODATA` to one or more local repodata.json files
+        (separated by os.pathsep) to skip the download entirely.
+        """
+        if cls._channel_index is None:
+            repodata = os.environ.get("SNOWDEV_REPODATA")
+            if repodata:
+                cls._channel_index = ChannelIndex.from_files(repodata.split(os.pathsep))
+            else:
+                cls._channel_index = ChannelIndex.load(cls.SNOWFLAKE_ANACONDA_URL)
+        return cls._channel_index
+
+    @classmethod
+    def _conda_search_versions(cls, package_name):
+        """
+        Run `conda search` against the Snowflake channel.
+
+        Returns the list of versions, an empty list if the package does not
+        exist, or None if the lookup itself failed.
+        """
         cmd = [
             "conda",
             "search",
@@ -93,30 +167,166 @@ class SnowHelper:
             print(f"Failed to execute command {cmd}: {e}")
             return None
 
+        try:
+            results = json.loads(stdout.decode())
+        except json.JSONDecodeError:
+            results = None
+
+        # conda exits non-zero with a PackagesNotFoundError payload when the
+        # package does not exist, which is a valid (cacheable) answer.
+        if isinstance(results, dict) and (
+            results.get("exception_name") == "PackagesNotFoundError"
+        ):
+            return []
+
         if process.returncode != 0:
             print(
                 f"Command {cmd} failed with return code {process.returncode}: {stderr.decode()}"
             )
             return None
 
+        if results is None:
+            print(
+                f"Failed to parse package versions for {package_name}. Output: {stdout.decode()}"
+            )
+            return None
+
         try:
-            results = json.loads(stdout.decode())
-            if package_name not in results:
-                print(f"Package {package_name} not found")
-                return None
-            versions = [
-                package_info["version"] for package_info in results[package_name]
+            return [
+                package_info["version"]
+                for package_info in results.get(package_name, [])
             ]
-            latest_version = max(
-                versions, key=lambda version: tuple(map(int, version.split(".")))
-            )
-        except (json.JSONDecodeError, KeyError, ValueError) as e:
+        except (KeyError, TypeError):
             print(
                 f"Failed to parse package versions for {package_name}. Output: {stdout.decode()}"
             )
             return None
+
+    @classmethod
+    def get_channel_versions(cls, package_name):
+        """
+        Return every version of a package published on the Snowflake channel.
+
+        Results are served from the on-disk channel cache when possible, so
+        repeated lookups do not start conda again.
+        """
+        if len(package_name) <= 1:
+            print(f"Invalid package name: {package_name}")
+            return None
+
+        if cls.channel_mode() == "index":
+            return cls.get_channel_index().versions(package_name)
+
+        cache = cls.get_channel_cache()
+        versions = cache.get(package_name)
+        if versions is not None:
+            return versions
+
+        versions = cls._conda_search_versions(package_name)
+        if versions is not None:
+            cache.set(package_name, versions)
+        return versions
+
+    @classmethod
+    def get_version_index(cls, package_name):
+        """
+        Return the sorted VersionIndex of a package on the Snowflake channel,
+        or None if the lookup failed. Indexes are kept for the whole process.
+        """
+        key = package_name.lower()
+        version_index = cls._version_indexes.get(key)
+        if version_index is None:
+            versions = cls.get_channel_versions(package_name)
+            if versions is None:
+                return None
+            version_index = VersionIndex(versions)
+            cls._version_indexes[key] = version_index
+        return version_index
+
+    @staticmethod
+    def split_requirement(requirement):
+        """Split `pandas>=1.5` or `pandas==1.5.*` into its name and constraint."""
+        match = re.match(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(.*?)\s*$", requirement)
+        if not match:
+            raise ValueError(f"Invalid requirement: {requirement}")
+        return match.group(1), match.group(2)
+
+    @classmethod
+    def find_matching_version(cls, package_name, spec=None):
+        """
+        Return the highest channel version of a package that satisfies
+        `spec` (e.g. `==1.5.*`, `>=1.2,<2`, `~=1.4.2`), or None.
+        """
+        version_index = cls.get_version_index(package_name)
+        if not version_index:
+            if version_index is not None:
+                print(f"Package {package_name} not found")
+            return None
+        try:
+            return version_index.latest_matching(VersionSpec(spec))
+        except ValueError as e:
+            print(f"Invalid version constraint for {package_name}: {e}")
+            return None
+
+    @classmethod
+    def search_package_in_snowflake_channel(cls, package_name):
         # Return the latest version
-        return latest_version
+        return cls.find_matching_version(package_name)
+
+    @classmethod
+    def resolve_requirement(cls, requirement):
+        package_name, spec = cls.split_requirement(requirement)
+        return cls.find_matching_version(package_name, spec)
+
+    @classmethod
+    def get_max_workers(cls, max_workers=None):
+        if max_workers is None:
+            max_workers = int(
+                os.environ.get("SNOWDEV_MAX_WORKERS", cls.DEFAULT_MAX_WORKERS)
+            )
+        return max(1, max_workers)
+
+    @classmethod
+    def resolve_packages(cls, package_names, max_workers=None):
+        """
+        Resolve the latest channel version of several packages at once.
+
+        Each entry is a package name or a requirement with a constraint, such
+        as `pandas==1.5.*`; constrained entries resolve to the highest
+        matching version.
+
+        In conda mode the lookups run concurrently on a bounded thread pool
+        (`SNOWDEV_MAX_WORKERS`, default 8), so the whole check takes about as
+        long as the slowest single lookup.
+
+        Returns a dict mapping each entry, in the given order, to its resolved
+        version or None when no matching version is on the channel.
+        """
+        package_names = list(dict.fromkeys(package_names))
+        if not package_names:
+            return {}
+
+        if cls.channel_mode() == "index":
+            cls.get_channel_index()
+            workers = 1
+        else:
+            cls.get_channel_cache()
+            workers = min(cls.get_max_workers(max_workers), len(package_names))
+
+        if workers == 1:
+            versions = [
+                cls.resolve_requirement(package_name) for package_name in package_names
+            ]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                versions = list(executor.map(cls.resolve_requirement, package_names))
+        return dict(zip(package_names, versions))
+
+    @classmethod
+    def get_unavailable_packages(cls, package_names, max_workers=None):
+        """Return every package that is not on the channel, in the given order."""
+        resolved = cls.resolve_packages(package_names, max_workers)
+        return [package for package, version in resolved.items() if not version]
 
     @classmethod
     def is_package_available_in_snowflake_channel(cls, package_name):
@@ -125,10 +335,12 @@ class SnowHelper:
 
     @classmethod
     def get_available_versions_from_snowflake_channel(cls, package_name):
-        return cls.search_package_in_snowflake_channel(package_name)
+        return cls.get_channel_versions(package_name) or []
 
     @classmethod
     def get_dependencies_of_package(cls, package_name):
+        import pkg_resources
+
         try:
             distribution = pkg_resources.get_distribution(package_name)
             return [requirement.name for requirement in distribution.requires()]
@@ -138,16 +350,11 @@ class SnowHelper:
     @classmethod
     def are_dependencies_available_in_snowflake_channel(cls, package_name):
         dependencies = cls.get_dependencies_of_package(package_name)
-        return all(
-            cls.is_package_available_in_snowflake_channel(dep) for dep in dependencies
-        )
+        return not cls.get_unavailable_packages(dependencies)
 
     @classmethod
     def is_specific_version_available_in_snowflake_channel(cls, package_name, version):
-        available_versions = cls.get_available_versions_from_snowflake_channel(
-            package_name
-        )
-        return version in available_versions
+        return cls.find_matching_version(package_name, f"=={version}") is not None
 
     @classmethod
     def create_new_component(cls, args_dict):
@@ -209,6 +416,8 @@ class SnowHelper:
     def _create_file_from_template(
         new_item_path, filename, template_name, item_type, ext, item_name=None
     ):
+        import pkg_resources
+
         try:
             template_content = pkg_resources.resource_string(
                 "snowdev", template_name
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import fnmatch
+import os
+from typing import Dict, List, Optional, Tuple
+
+
+class IgnoreRules:
+    """
+    gitignore-style rules for what to leave out of an uploaded directory.
+
+    Supported syntax: `#` comments, `!` to re-include, a trailing `/` to
+    match directories only, and a `/` inside the pattern (or a leading `/`)
+    to match the path relative to the root instead of any file name. `**/`
+    at the start matches in every directory. The last matching rule wins.
+    """
+
+    FILENAME = ".snowdevignore"
+    DEFAULT_PATTERNS = [
+        "__pycache__/",
+        "*.py[cod]",
+        ".DS_Store",
+        ".git/",
+        ".ipynb_checkpoints/",
+        ".pytest_cache/",
+        ".mypy_cache/",
+        ".venv/",
+        "venv/",
+        "*.egg-info/",
+        ".env",
+        FILENAME,
+    ]
+
+    def __init__(self, patterns: Optional[List[str]] = None):
+        self.rules: List[Tuple[str, bool, bool, bool]] = []
+        for pattern in patterns or []:
+            rule = self._parse(pattern)
+            if rule is not None:
+                self.rules.append(rule)
+
+    @staticmethod
+    def _parse(pattern: str):
+        pattern = pattern.strip()
+        if not pattern or pattern.startswith("#"):
+            return None
+        negate = pattern.startswith("!")
+        if negate:
+            pattern = pattern[1:]
+        directory_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        if pattern.startswith("**/"):
+            pattern = pattern[3:]
+        anchored = "/" in pattern
+        return pattern.lstrip("/"), negate, directory_only, anchored
+
+    @classmethod
+    def for_directory(cls, directory: str, defaults: bool = True) -> "IgnoreRules":
+        """Default rules followed by the directory's .snowdevignore, if any."""
+        patterns = list(cls.DEFAULT_PATTERNS) if defaults else []
+        path = os.path.join(directory, cls.FILENAME)
+        if os.path.isfile(path):
+            with open(path, "r") as f:
+                patterns.extend(f.read().splitlines())
+        return cls(patterns)
+
+    def is_ignored(self, relative_path: str, is_dir: bool = False) -> bool:
+        relative_path = relative_path.replace(os.sep, "/").strip("/")
+        name = relative_path.rsplit("/", 1)[-1]
+        ignored = False
+        for pattern, negate, directory_only, anchored in self.rules:
+            if directory_only and not is_dir:
+                continue
+            target = relative_path if anchored else name
+            if fnmatch.fnmatchcase(target, pattern):
+                ignored = not negate
+        return ignored
+
+    def files(self, directory: str) -> Dict[str, str]:
+        """
+        Every file under `directory` that is not ignored, recursively.
+
+        Keys are paths relative to `directory` with `/` separators, so the
+        layout can be recreated on a stage. Ignored directories are not
+        descended into.
+        """
+        files = {}
+        for root, dirs, names in os.walk(directory):
+            relative_root = os.path.relpath(root, directory)
+            relative_root = "" if relative_root == "." else relative_root + "/"
+            dirs[:] = sorted(
+                name
+                for name in dirs
+                if not self.is_ignored(relative_root + name, is_dir=True)
+            )
+            for name in sorted(names):
+                relative_path = (relative_root + name).replace(os.sep, "/")
+                if not self.is_ignored(relative_path):
+                    files[relative_path] = os.path.join(root, name)
+        return files
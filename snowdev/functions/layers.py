@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from typing import IO, Iterable, List, Optional, Set
+
+from termcolor import colored
+
+from .stage_sync import StageSync
+
+
+class LayerStore:
+    """
+    Content-addressed store of package layers on the stage.
+
+    A layer is the reproducible zip of one pinned package, stored as
+    `@<stage>/static/layers/<name>-<version>-<hash>.zip`, where `hash` is
+    the start of the zip's sha256. Components that vendor the same package
+    version for the same target share one layer by listing it in their
+    `imports.txt`, and a layer that is already on the stage is never
+    uploaded again. `gc` removes layers that no `imports.txt` references.
+    """
+
+    PREFIX = "static/layers"
+    HASH_LENGTH = 16
+    REFERENCE_RE = re.compile(r"static/layers/([^/\s'\"]+\.zip)")
+
+    def __init__(self, session, stage_location: str):
+        """`stage_location` is the fully qualified stage, e.g. `db.schema.SNOWDEV`."""
+        self.stage_location = stage_location.lstrip("@")
+        self.stage_sync = StageSync(session, f"{self.stage_location}/{self.PREFIX}")
+        self._remote: Optional[Set[str]] = None
+
+    @staticmethod
+    def digest(stream: IO[bytes]) -> str:
+        """sha256 of a seekable stream, read from the start; the stream is rewound."""
+        digest = hashlib.sha256()
+        stream.seek(0)
+        for block in iter(lambda: stream.read(1024 * 1024), b""):
+            digest.update(block)
+        stream.seek(0)
+        return digest.hexdigest()
+
+    @classmethod
+    def layer_name(cls, name: str, version: str, stream: IO[bytes]) -> str:
+        return f"{name}-{version}-{cls.digest(stream)[: cls.HASH_LENGTH]}.zip"
+
+    def import_path(self, layer_name: str) -> str:
+        return f"@{self.stage_location}/{self.PREFIX}/{layer_name}"
+
+    def remote_layers(self) -> Set[str]:
+        """Names of the layers on the stage, listed once per store."""
+        if self._remote is None:
+            self._remote = {
+                path for path in self.stage_sync.remote_files() if "/" not in path
+            }
+        return self._remote
+
+    def publish(
+        self, layer_name: str, stream: IO[bytes], dry_run: bool = False
+    ) -> bool:
+        """Upload a layer unless the stage already has it. Returns False on failure."""
+        if layer_name in self.remote_layers():
+            print(colored(f"Layer {layer_name} is already on the stage", "blue"))
+            return True
+        if not self.stage_sync.put_stream(layer_name, stream, dry_run):
+            return False
+        if not dry_run:
+            self._remote.add(layer_name)
+        return True
+
+    @classmethod
+    def referenced(cls, root: str = "src") -> Set[str]:
+        """Names of the layers listed in any `imports.txt` under `root`."""
+        layers = set()
+        for directory, _, names in os.walk(root):
+            if "imports.txt" not in names:
+                continue
+            with open(os.path.join(directory, "imports.txt"), "r") as f:
+                layers.update(cls.REFERENCE_RE.findall(f.read()))
+        return layers
+
+    def gc(self, referenced: Iterable[str], dry_run: bool = False) -> List[str]:
+        """Remove every layer not in `referenced` and return their names."""
+        unreferenced = sorted(self.remote_layers() - set(referenced))
+        if not unreferenced:
+            print(colored("No unreferenced layers.", "green"))
+            return []
+        if dry_run:
+            for layer_name in unreferenced:
+                print(colored(f"Would remove {layer_name}", "yellow"))
+            return unreferenced
+        self.stage_sync.remove(unreferenced)
+        self._remote.difference_update(unreferenced)
+        return unreferenced
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from termcolor import colored
+
+
+class DeployManifest:
+    """
+    Content hashes of what was last deployed, per component.
+
+    Deployers hash their inputs (handler source, packages, imports, execute-as
+    or the Streamlit files) and skip the deploy when the hash matches the one
+    recorded for the same component in the same database and schema.
+
+    The manifest is kept in ``.snowdev/manifest.json``. With ``remote=True``
+    (or ``SNOWDEV_REMOTE_MANIFEST=1``) it is also read from and written to
+    ``@<stage>/manifest/manifest.json``, so fresh CI checkouts can skip
+    unchanged components too.
+    """
+
+    LOCAL_PATH = os.path.join(".snowdev", "manifest.json")
+    STAGE_DIR = "manifest"
+    FILENAME = "manifest.json"
+
+    def __init__(
+        self,
+        session=None,
+        stage_name: Optional[str] = None,
+        path: Optional[str] = None,
+        remote: Optional[bool] = None,
+        force: bool = False,
+    ):
+        self.session = session
+        self.stage_name = stage_name
+        self.path = path or self.LOCAL_PATH
+        if remote is None:
+            remote = os.environ.get("SNOWDEV_REMOTE_MANIFEST", "").lower() in (
+                "1",
+                "true",
+                "yes",
+            )
+        self.remote = bool(remote and session is not None and stage_name)
+        self.force = force
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._dirty = False
+
+    @staticmethod
+    def compute_hash(files: Iterable[str], extra: Optional[Dict] = None) -> str:
+        """Hash file contents (by path, in sorted order) plus any extra inputs."""
+        digest = hashlib.sha256()
+        for file_path in sorted(files):
+            digest.update(file_path.replace(os.sep, "/").encode())
+            digest.update(b"\0")
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(block)
+            digest.update(b"\0")
+        digest.update(json.dumps(extra or {}, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def key(kind: str, name: str, session=None) -> str:
+        if session is None:
+            return f"{kind}:{name}"
+        database = (session.get_current_database() or "").replace('"', "")
+        schema = (session.get_current_schema() or "").replace('"', "")
+        return f"{kind}:{database}.{schema}.{name}"
+
+    def is_unchanged(self, key: str, digest: str) -> bool:
+        if self.force:
+            return False
+        with self._lock:
+            entry = self._load().get(key)
+        return entry is not None and entry.get("hash") == digest
+
+    def record(self, key: str, digest: str) -> None:
+        with self._lock:
+            self._load()[key] = {"hash": digest, "deployed_at": time.time()}
+            self._dirty = True
+            self._save_local()
+
+    def flush(self) -> None:
+        """Upload the manifest to the stage if remote mode is on and it changed."""
+        if not self.remote or not self._dirty:
+            return
+        with self._lock:
+            try:
+                with tempfile.TemporaryDirectory() as temp_dir:
+                    file_path = os.path.join(temp_dir, self.FILENAME)
+                    with open(file_path, "w") as f:
+                        json.dump(self._entries, f, indent=2, sort_keys=True)
+                    self.session.file.put(
+                        file_path,
+                        f"@{self.stage_name}/{self.STAGE_DIR}",
+                        auto_compress=False,
+                        overwrite=True,
+                    )
+                self._dirty = False
+            except Exception as e:
+                print(colored(f"Failed to upload deploy manifest: {e}", "yellow"))
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            self._entries = self._read(self.path)
+            if self.remote:
+                for key, entry in self._load_remote().items():
+                    local = self._entries.get(key)
+                    if local is None or entry.get("deployed_at", 0) > local.get(
+                        "deployed_at", 0
+                    ):
+                        self._entries[key] = entry
+        return self._entries
+
+    def _load_remote(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                self.session.file.get(
+                    f"@{self.stage_name}/{self.STAGE_DIR}/{self.FILENAME}", temp_dir
+                )
+                return self._read(os.path.join(temp_dir, self.FILENAME))
+        except Exception:
+            return {}
+
+    @staticmethod
+    def _read(path: str) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_local(self) -> None:
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self._entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -1,18 +1,30 @@
 from __future__ import annotations
 
 import os
-import subprocess
-import tempfile
-import zipfile
+import shutil
+import sys
 
 from termcolor import colored
 
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
 from . import SnowHelper
+from .build_cache import BuildCache
+from .layers import LayerStore
+from .resolver import DependencyResolver
+from .stage_manager import StageManager
+from .stage_sync import StageSync
+from .zip_writer import ReproducibleZip
 
 
 class SnowPackageZip:
-    def __init__(self, session, stage_name):
+    def __init__(self, session, stage_name, python_version=None, platform=None):
         self.session = session
+        self.python_version = python_version
+        self.platform = platform
         self.current_database = self.session.get_current_database().replace('"', "")
         self.current_schema = self.session.get_current_schema().replace('"', "")
         self.stage_name = stage_name
@@ -26,97 +38,162 @@ class SnowPackageZip:
     def _print_info(self, message):
         print(colored(message, "blue"))
 
-    def zip_and_upload_package(self, package_name, upload):
-        try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                venv_path = os.path.join(temp_dir, "venv")
-                package_path = os.path.join(
-                    venv_path, "lib", "python3.9", "site-packages"
-                )
+    @staticmethod
+    def _peak_rss_mb(who):
+        peak = resource.getrusage(who).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+    @staticmethod
+    def _directory_size(path):
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(path)
+            for name in names
+        )
+
+    def _print_usage(self, install_dir, report, spilled):
+        install_mb = self._directory_size(install_dir) / 1024 / 1024
+        zip_mb = report.compressed_size / 1024 / 1024 if spilled else 0.0
+        self._print_info(
+            f"Peak disk: {install_mb + zip_mb:.1f} MB "
+            f"({install_mb:.1f} MB install, {zip_mb:.1f} MB zip spilled to disk)"
+        )
+        if resource is not None:
+            snowdev_mb = self._peak_rss_mb(resource.RUSAGE_SELF)
+            pip_mb = self._peak_rss_mb(resource.RUSAGE_CHILDREN)
+            self._print_info(
+                f"Peak memory: {snowdev_mb:.1f} MB snowdev, {pip_mb:.1f} MB pip"
+            )
 
-                # Create a virtual environment
-                subprocess.check_call(["python3", "-m", "venv", venv_path])
+    def _build_cache(self):
+        return BuildCache(python_version=self.python_version, platform=self.platform)
+
+    def _spool_zip(self, package_name, requirements, zip_name, no_deps=False):
+        """
+        Build `requirements` for the target runtime and zip them into a
+        spooled buffer. With `no_deps` only the given requirements are
+        installed. The install is taken from the BuildCache when possible.
+        """
+        build_dir, _ = self._build_cache().environment(
+            package_name, requirements, no_deps
+        )
+        install_dir = BuildCache.site_packages(build_dir)
+
+        zip_writer = ReproducibleZip()
+        buffer, report = zip_writer.spool(install_dir, zip_name)
+        report.print()
+        self._print_usage(
+            install_dir, report, report.compressed_size > zip_writer.spool_max
+        )
+        return buffer
+
+    @staticmethod
+    def _write_local(buffer, directory, zip_name):
+        zip_path = os.path.join("static", directory, zip_name)
+        os.makedirs(os.path.dirname(zip_path), exist_ok=True)
+        with open(zip_path, "wb") as f:
+            shutil.copyfileobj(buffer, f, ReproducibleZip.CHUNK_SIZE)
+
+    def _build_zip(self, package_name, requirements, zip_name, upload, no_deps=False):
+        """
+        Build `requirements` for the target runtime and deliver the zip.
+
+        With `upload` the zip goes straight to the stage with `put_stream`
+        and is never written to static/, otherwise it is written to
+        static/packages/. Zips are reproducible, so an unchanged package
+        uploads nothing.
+        """
+        with self._spool_zip(package_name, requirements, zip_name, no_deps) as buffer:
+            if upload:
+                return self.upload_to_snowflake(buffer, zip_name, package_name)
+            self._write_local(buffer, "packages", zip_name)
+            return True
+
+    def zip_and_upload_vendored(self, package_name, vendored, upload):
+        """
+        Zip exactly the `vendored` packages, pinned to their resolved versions.
+
+        The zip is `<package>.zip` when only the package itself is vendored
+        and `<package>_with_dependencies.zip` otherwise.
+        """
+        pins = sorted(package.pin for package in vendored.values())
+        with_dependencies = len(vendored) > 1
+        zip_name = (
+            f"{package_name}_with_dependencies.zip"
+            if with_dependencies
+            else f"{package_name}.zip"
+        )
+        try:
+            if not self._build_zip(package_name, pins, zip_name, upload, no_deps=True):
+                return
 
-                # Install the package in the virtual environment
-                subprocess.check_call(
-                    [os.path.join(venv_path, "bin", "pip"), "install", package_name]
+            contents = (
+                f"{package_name} along with {len(vendored) - 1} vendored dependencies"
+                if with_dependencies
+                else package_name
+            )
+            if upload:
+                self._print_success(
+                    f"\nPackage {contents} has been zipped and uploaded to Snowflake stage."
                 )
-                zip_path = f"static/packages/{package_name}.zip"
-
-                # Zip the package
-                with zipfile.ZipFile(
-                    f"static/packages/{package_name}.zip", "w"
-                ) as zipf:
-                    for foldername, subfolders, filenames in os.walk(package_path):
-                        for filename in filenames:
-                            absolute_path = os.path.join(foldername, filename)
-                            relative_path = os.path.relpath(absolute_path, package_path)
-                            zipf.write(absolute_path, relative_path)
-
-                if upload:
-                    self.upload_to_snowflake(zip_path, package_name)
-                    self._print_success(
-                        f"\nPackage {package_name} has been zipped and uploaded to Snowflake stage."
-                    )
-                else:
-                    self._print_success(f"\nPackage {package_name} has been zipped.")
+            else:
+                self._print_success(f"\nPackage {contents} has been zipped.")
 
         except Exception as e:
             self._print_error(f"Error encountered: {e}")
 
-    def zip_and_upload_package_with_dependencies(
-        self, package_name, dependencies, upload
-    ):
+    def zip_and_upload_layers(self, package_name, vendored, upload):
+        """
+        Zip each vendored package into its own content-addressed layer.
+
+        Layers already on the stage are not uploaded again, so components
+        that vendor the same packages share them. Prints the `imports.txt`
+        lines that reference the layers.
+        """
+        store = LayerStore(
+            self.session,
+            f"{self.current_database}.{self.current_schema}.{self.stage_name}",
+        )
+        imports = []
         try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                venv_path = os.path.join(temp_dir, "venv")
-                package_path = os.path.join(
-                    venv_path, "lib", "python3.9", "site-packages"
+            if upload:
+                StageManager.for_session(self.session).ensure(
+                    self.session, store.stage_location
                 )
-
-                # Create a virtual environment
-                subprocess.check_call(["python3", "-m", "venv", venv_path])
-
-                # Install the package and its dependencies in the virtual environment
-                subprocess.check_call(
-                    [os.path.join(venv_path, "bin", "pip"), "install", package_name]
-                    + dependencies
-                )
-                zip_path = f"static/packages/{package_name}_with_dependencies.zip"
-
-                # Zip the package and its dependencies
-                with zipfile.ZipFile(
-                    f"static/packages/{package_name}_with_dependencies.zip", "w"
-                ) as zipf:
-                    for foldername, subfolders, filenames in os.walk(package_path):
-                        for filename in filenames:
-                            absolute_path = os.path.join(foldername, filename)
-                            relative_path = os.path.relpath(absolute_path, package_path)
-                            zipf.write(absolute_path, relative_path)
-
-                if upload:
-                    self.upload_to_snowflake(zip_path, package_name)
-                    self._print_success(
-                        f"\nPackage {package_name} along with its dependencies has been zipped and uploaded to Snowflake stage."
-                    )
-                else:
-                    self._print_success(
-                        f"\nPackage {package_name} along with its dependencies has been zipped."
-                    )
-
+            for name, package in sorted(vendored.items()):
+                zip_name = f"{name}-{package.version}.zip"
+                with self._spool_zip(name, [package.pin], zip_name, True) as buffer:
+                    layer_name = LayerStore.layer_name(name, package.version, buffer)
+                    if upload:
+                        if not store.publish(layer_name, buffer):
+                            self._print_error(f"Failed to upload layer {layer_name}.")
+                            return
+                    else:
+                        self._write_local(buffer, "layers", layer_name)
+                imports.append(store.import_path(layer_name))
         except Exception as e:
             self._print_error(f"Error encountered: {e}")
+            return
+
+        action = "uploaded to Snowflake stage" if upload else "written to static/layers"
+        self._print_success(
+            f"\n{len(imports)} layers for {package_name} have been {action}. "
+            "Add them to the component's imports.txt:"
+        )
+        for import_path in imports:
+            print(colored(f"  {import_path}", "green"))
 
-    def deploy_package(self, package_name, upload):
+    def deploy_package(self, package_name, upload, layers=False):
         try:
-            available_versions = (
-                SnowHelper.get_available_versions_from_snowflake_channel(package_name)
+            latest_version = SnowHelper.search_package_in_snowflake_channel(
+                package_name
             )
 
-            if available_versions:
+            if latest_version:
                 print(
                     colored(
-                        f"\nPackage {package_name} is available on the Snowflake anaconda channel. Latest version: {available_versions[0]}\n",
+                        f"\nPackage {package_name} is available on the Snowflake anaconda channel. Latest version: {latest_version}\n",
                         "green",
                     )
                 )
@@ -128,47 +205,42 @@ class SnowPackageZip:
                 )
                 return
 
-            dependencies = SnowHelper.get_dependencies_of_package(package_name)
-            if dependencies:
-                available_dependencies = [
-                    dep
-                    for dep in dependencies
-                    if SnowHelper.is_package_available_in_snowflake_channel(dep)
-                ]
-                if len(available_dependencies) != len(dependencies):
-                    missing_dependencies = set(dependencies) - set(
-                        available_dependencies
-                    )
-                    print(
-                        f"Dependencies {', '.join(missing_dependencies)} are not available in Snowflake Anaconda channel."
-                    )
-                    print(f"Zipping and uploading only the {package_name} package.")
-                    self.zip_and_upload_package(package_name, upload)
-                else:
-                    print(
-                        f"Dependencies for {package_name} are available in Snowflake Anaconda channel."
-                    )
-                    print(
-                        f"Zipping and uploading the {package_name} package along with its dependencies."
-                    )
-                    self.zip_and_upload_package_with_dependencies(
-                        package_name, dependencies, upload
+            resolver = DependencyResolver(self._build_cache())
+            closure = resolver.closure([package_name])
+            channel, vendored = resolver.split(closure)
+
+            if channel:
+                print(
+                    colored(
+                        f"{len(channel)} dependencies of {package_name} are available in Snowflake Anaconda channel. "
+                        "Add them to your `app.toml` packages:",
+                        "green",
                     )
+                )
+                for name, version in sorted(channel.items()):
+                    print(colored(f"  {name}=={version}", "green"))
+            vendored_names = ", ".join(
+                package.pin for name, package in sorted(vendored.items())
+            )
+            print(f"Vendoring {vendored_names}.")
+            if layers:
+                self.zip_and_upload_layers(package_name, vendored, upload)
             else:
-                # print(f"Zipping and uploading only the {package_name} package.")
-                self.zip_and_upload_package(package_name, upload)
+                self.zip_and_upload_vendored(package_name, vendored, upload)
 
         except Exception as e:
             self._print_error(f"Error encountered: {e}")
 
-    def upload_to_snowflake(self, zip_path, package_name):
+    def upload_to_snowflake(self, stream, zip_name, package_name):
         try:
-            stage_location = (
-                f"{self.current_database}.{self.current_schema}.{self.stage_name}"
-            )
-            remote_path = f"@{stage_location}/static/packages"
-            self.session.file.put(
-                zip_path, remote_path, overwrite=True, auto_compress=False
+            stage_location = StageManager.for_session(self.session).ensure(
+                self.session,
+                f"{self.current_database}.{self.current_schema}.{self.stage_name}",
             )
+            stage_sync = StageSync(self.session, f"{stage_location}/static/packages")
+            if not stage_sync.sync_stream(zip_name, stream):
+                raise RuntimeError(f"Upload of {zip_name} failed.")
+            return True
         except Exception as e:
             self._print_error(f"Failed to upload {package_name}. Error: {e}")
+            return False
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import ast
+import os
+import re
+import sys
+from typing import List, NamedTuple, Optional
+
+from termcolor import colored
+
+
+class HandlerSignature(NamedTuple):
+    arg_types: List[str]
+    return_type: str
+
+    def __str__(self):
+        return f"({', '.join(self.arg_types)}) RETURN {self.return_type}"
+
+
+class HandlerPrecheck:
+    """
+    Validate a UDF or stored procedure handler locally, before any network call.
+
+    The check byte-compiles the file and finds the handler; a syntax error
+    or a missing handler fails the deploy. It also infers the handler's SQL
+    signature from its type annotations and looks for top-level imports
+    that are not provided by the standard library, a declared package, a
+    file next to the handler or an entry in imports.txt. Those findings are
+    warnings only: the channel installs the dependencies of declared
+    packages too, and Snowpark can be given types without annotations.
+    """
+
+    SQL_TYPES = {
+        "str": "STRING",
+        "int": "INT",
+        "float": "FLOAT",
+        "bool": "BOOLEAN",
+        "bytes": "BINARY",
+        "bytearray": "BINARY",
+        "dict": "OBJECT",
+        "list": "ARRAY",
+        "Decimal": "NUMBER",
+        "date": "DATE",
+        "datetime": "TIMESTAMP",
+        "time": "TIME",
+        "Variant": "VARIANT",
+        "Geography": "GEOGRAPHY",
+        "Geometry": "GEOMETRY",
+        "DataFrame": "TABLE",
+        "Table": "TABLE",
+        "PandasSeries": "VECTORIZED",
+        "PandasDataFrame": "VECTORIZED",
+        "Series": "VECTORIZED",
+    }
+
+    # Import names that differ from the conda package providing them.
+    MODULE_PACKAGES = {
+        "sklearn": "scikit-learn",
+        "yaml": "pyyaml",
+        "cv2": "opencv-python",
+        "PIL": "pillow",
+        "bs4": "beautifulsoup4",
+        "dateutil": "python-dateutil",
+        "google": "protobuf",
+        "jwt": "pyjwt",
+        "OpenSSL": "pyopenssl",
+        "Crypto": "pycryptodome",
+        "docx": "python-docx",
+        "magic": "python-magic",
+    }
+
+    # Always importable inside Snowflake's Python runtime.
+    BUILTIN_MODULES = {"snowflake", "_snowflake", "__future__"}
+
+    def __init__(
+        self,
+        func_path: str,
+        packages: Optional[List[str]] = None,
+        imports: Optional[List[str]] = None,
+        is_sproc: bool = False,
+        func_name: str = "handler",
+    ):
+        self.func_path = func_path
+        self.packages = packages or []
+        self.imports = imports or []
+        self.is_sproc = is_sproc
+        self.func_name = func_name
+        self.signature: Optional[HandlerSignature] = None
+        self.warnings: List[str] = []
+
+    @staticmethod
+    def _normalize(name: str) -> str:
+        return re.sub(r"[-_.]+", "_", name).lower()
+
+    def _available_modules(self) -> set:
+        available = set(self.BUILTIN_MODULES) | set(sys.stdlib_module_names)
+        for package in self.packages:
+            name = re.split(r"[<>=!~\s\[]", package, maxsplit=1)[0]
+            available.add(self._normalize(name))
+        for import_path in self.imports:
+            basename = os.path.basename(import_path.strip().rstrip("/"))
+            stem = basename.split(".")[0]
+            available.add(self._normalize(stem))
+            available.add(self._normalize(re.sub(r"_with_dependencies$", "", stem)))
+        directory = os.path.dirname(os.path.abspath(self.func_path))
+        for entry in os.listdir(directory):
+            if entry.endswith(".py") or os.path.isdir(os.path.join(directory, entry)):
+                available.add(
+                    self._normalize(entry[:-3] if entry.endswith(".py") else entry)
+                )
+        return available
+
+    @staticmethod
+    def _is_main_guard(node: ast.AST) -> bool:
+        return (
+            isinstance(node, ast.If)
+            and isinstance(node.test, ast.Compare)
+            and isinstance(node.test.left, ast.Name)
+            and node.test.left.id == "__name__"
+        )
+
+    @staticmethod
+    def _is_optional_import(node: ast.AST) -> bool:
+        """A try block guarded by `except ImportError` may import anything."""
+        if not isinstance(node, ast.Try):
+            return False
+        for handler in node.handlers:
+            if handler.type is None:
+                return True
+            names = ast.unparse(handler.type)
+            if "ImportError" in names or "ModuleNotFoundError" in names:
+                return True
+        return False
+
+    def _imported_modules(self, tree: ast.Module) -> List[tuple]:
+        """Top-level module names imported by the handler, with line numbers."""
+        modules = []
+
+        def visit(node):
+            if self._is_main_guard(node) or self._is_optional_import(node):
+                return
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    modules.append((alias.name.split(".")[0], node.lineno))
+            elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+                modules.append((node.module.split(".")[0], node.lineno))
+            for child in ast.iter_child_nodes(node):
+                visit(child)
+
+        visit(tree)
+        return modules
+
+    def _sql_type(self, annotation: ast.AST) -> str:
+        text = ast.unparse(annotation)
+        # Optional[X] / X | None -> X
+        match = re.fullmatch(r"(?:typing\.)?Optional\[(.*)\]", text)
+        if match:
+            text = match.group(1)
+        text = re.sub(r"\s*\|\s*None$", "", text)
+        base = text.split("[")[0].split(".")[-1]
+        if base in ("List", "Tuple"):
+            return "ARRAY"
+        if base == "Dict":
+            return "OBJECT"
+        return self.SQL_TYPES.get(base, text)
+
+    def _signature(
+        self, handler: ast.FunctionDef, problems: List[str], warnings: List[str]
+    ) -> Optional[HandlerSignature]:
+        """The inferred signature, or None when an annotation is missing."""
+        args = list(handler.args.posonlyargs) + list(handler.args.args)
+        if self.is_sproc:
+            if not args:
+                problems.append(
+                    f"{self.func_name}() must take the Snowpark session as its first argument."
+                )
+            else:
+                args = args[1:]
+        arg_types = []
+        for arg in args:
+            if arg.annotation is None:
+                warnings.append(
+                    f"Argument '{arg.arg}' of {self.func_name}() has no type annotation (line {arg.lineno})."
+                )
+                continue
+            arg_types.append(self._sql_type(arg.annotation))
+        if handler.returns is None:
+            warnings.append(f"{self.func_name}() has no return type annotation.")
+            return None
+        if len(arg_types) < len(args):
+            return None
+        return HandlerSignature(arg_types, self._sql_type(handler.returns))
+
+    def run(self) -> None:
+        """
+        Run every check. The inferred signature and the warnings are kept on
+        `signature` and `warnings`, and printed.
+
+        Raises ValueError listing all problems that would fail the deploy.
+        """
+        with open(self.func_path, "r") as f:
+            source = f.read()
+
+        try:
+            tree = ast.parse(source, filename=self.func_path)
+            compile(tree, self.func_path, "exec")
+        except SyntaxError as e:
+            raise ValueError(
+                f"{self.func_path}:{e.lineno}: syntax error: {e.msg}"
+            ) from e
+
+        problems: List[str] = []
+        warnings: List[str] = []
+        handler = next(
+            (
+                node
+                for node in tree.body
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+                and node.name == self.func_name
+            ),
+            None,
+        )
+        if handler is None:
+            problems.append(f"No top-level function named {self.func_name}() found.")
+        else:
+            self.signature = self._signature(handler, problems, warnings)
+
+        available = self._available_modules()
+        for module, lineno in self._imported_modules(tree):
+            package = self.MODULE_PACKAGES.get(module, module)
+            if (
+                self._normalize(module) in available
+                or self._normalize(package) in available
+            ):
+                continue
+            warnings.append(
+                f"Import '{module}' (line {lineno}) is not declared in app.toml packages "
+                "or imports.txt; it must come from the channel as a dependency."
+            )
+
+        if problems:
+            raise ValueError(
+                f"Local check of {self.func_path} failed:\n  - "
+                + "\n  - ".join(problems)
+            )
+
+        self.warnings = warnings
+        for warning in warnings:
+            print(colored(f"⚠️  {self.func_path}: {warning}", "yellow"))
+        if self.signature is None:
+            print(colored("Local check passed.", "green"))
+        else:
+            print(
+                colored("Local check passed. Signature:", "green"),
+                colored(f"{self.func_name}{self.signature}", "magenta"),
+            )
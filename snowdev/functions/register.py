@@ -5,40 +5,36 @@ import os
 import toml
 from termcolor import colored
 
+from .catalog import SchemaCatalog
+from .manifest import DeployManifest
+from .precheck import HandlerPrecheck
+
 
 class SnowflakeRegister:
-    def __init__(self, session):
+    def __init__(self, session, manifest=None):
         self.session = session
+        self.manifest = manifest
+
+    @property
+    def catalog(self):
+        return SchemaCatalog.for_session(self.session)
 
     def _entity_exists(self, entity_name, entity_type):
         try:
-            result = self.session.sql(
-                f"SHOW {entity_type} LIKE '{entity_name}'"
-            ).collect()
-            return len(result) > 0
+            return self.catalog.exists(self.session, entity_type, entity_name)
         except:
             print(f"Failed to check if {entity_type} {entity_name} exists.")
             return False
 
     def _get_entity_signature(self, entity_name, entity_type):
         try:
-            result = self.session.sql(
-                f"SHOW {entity_type} LIKE '{entity_name}'"
-            ).collect()
-            if result:
-                signature = result[0]["arguments"]
-                print(f"Signature for {entity_type} {entity_name}: {signature}")
-
-                # Extract everything between the first set of parentheses
-                arg_string = signature.split("(")[1].split(")")[0]
-
-                # If the argument string is empty, return an empty string
-                if not arg_string.strip():
-                    return ""
-
-                # Otherwise, split by spaces and take the first part
-                arg_types = arg_string.split()[0]
-                return arg_types.strip()
+            signatures = self.catalog.signatures(self.session, entity_type, entity_name)
+            if signatures:
+                signature = signatures[0]
+                print(
+                    f"Signature for {entity_type} {entity_name}: {signature.name}({signature.arguments}) RETURN {signature.return_type}"
+                )
+                return signature.arguments
 
             return ""
         except:
@@ -46,16 +42,16 @@ class SnowflakeRegister:
             return None
 
     def function_exists(self, function_name):
-        return self._entity_exists(function_name, "USER FUNCTIONS")
+        return self._entity_exists(function_name, "FUNCTION")
 
     def sproc_exists(self, sproc_name):
-        return self._entity_exists(sproc_name, "PROCEDURES")
+        return self._entity_exists(sproc_name, "PROCEDURE")
 
     def get_function_signature(self, function_name):
-        return self._get_entity_signature(function_name, "USER FUNCTIONS")
+        return self._get_entity_signature(function_name, "FUNCTION")
 
     def get_sproc_signature(self, sproc_name):
-        return self._get_entity_signature(sproc_name, "PROCEDURES")
+        return self._get_entity_signature(sproc_name, "PROCEDURE")
 
     def get_connection_details_from_toml(self, dir_path):
         # Load the app.toml from the specified directory
@@ -69,7 +65,10 @@ class SnowflakeRegister:
     def _drop_entity(self, entity_name, arg_type, entity_type):
         sql = f"DROP {entity_type} {entity_name}({arg_type})"
         print(sql)
-        self.session.sql(sql).collect()
+        try:
+            self.session.sql(sql).collect()
+        finally:
+            self.catalog.invalidate(entity_type, entity_name)
 
     def drop_function(self, function_name, arg_type):
         self._drop_entity(function_name, arg_type, "FUNCTION")
@@ -136,19 +135,24 @@ class SnowflakeRegister:
         is_temp=False,
         execute_as="OWNER",
     ):
-        if is_sproc:
-            self.register_sproc(
-                func,
-                function_name,
-                packages,
-                stage_location,
-                imports,
-                is_temp,
-                execute_as,
-            )
-        else:
-            self.register_udf(
-                func, function_name, packages, stage_location, imports, is_temp
+        try:
+            if is_sproc:
+                self.register_sproc(
+                    func,
+                    function_name,
+                    packages,
+                    stage_location,
+                    imports,
+                    is_temp,
+                    execute_as,
+                )
+            else:
+                self.register_udf(
+                    func, function_name, packages, stage_location, imports, is_temp
+                )
+        finally:
+            self.catalog.invalidate(
+                "PROCEDURE" if is_sproc else "FUNCTION", function_name
             )
 
     def _entity_signature(self, entity_name, is_sproc):
@@ -172,8 +176,31 @@ class SnowflakeRegister:
         return None
 
     def main(
-        self, func, function_name, stage_location, packages, is_sproc, imports=None
+        self,
+        func,
+        function_name,
+        stage_location,
+        packages,
+        is_sproc,
+        imports=None,
+        resolved_packages=None,
+        validation="local",
     ):
+        """
+        Register a UDF or stored procedure.
+
+        With `validation="local"` (the default) the handler is checked on this
+        machine first and only the real entity is registered. With
+        `validation="temp"` a temporary entity is registered as a dry run
+        before the real one, then dropped.
+
+        Returns False if the manifest shows nothing changed, True otherwise.
+        """
+        if validation not in ("local", "temp"):
+            raise ValueError(f"Unknown validation mode: {validation}")
+        if validation == "local":
+            HandlerPrecheck(func, packages, imports, is_sproc).run()
+
         temp_entity_name = "temp_" + function_name
         temp_arg_type = None
         execute_as_comment = self.extract_comment_from_file(func, "# execute as")
@@ -205,37 +232,62 @@ class SnowflakeRegister:
             else:
                 print(colored(f"Using default {detail}", "yellow"))
 
+        entity_type = "Sproc" if is_sproc else "Function"
+        manifest_key, digest = None, None
+        if self.manifest is not None:
+            manifest_key = DeployManifest.key(
+                "sproc" if is_sproc else "udf", function_name, self.session
+            )
+            digest = DeployManifest.compute_hash(
+                [func],
+                {
+                    "packages": sorted(packages or []),
+                    "resolved_packages": resolved_packages or {},
+                    "imports": sorted(imports or []),
+                    "execute_as": execute_as_value,
+                    "stage_location": stage_location,
+                },
+            )
+            if self.manifest.is_unchanged(manifest_key, digest):
+                print(
+                    colored(
+                        f"\n⏭️  {entity_type} {function_name} is unchanged since the last deploy. Skipping.",
+                        "yellow",
+                    )
+                )
+                return False
+
         try:
             print(colored("==========================================", "cyan"))
-            entity_type = "Sproc" if is_sproc else "Function"
 
-            print(
-                colored(
-                    f"Registering Temporary {entity_type}:",
-                    "yellow",
-                ),
-                colored(temp_entity_name, "magenta"),
-            )
+            if validation == "temp":
+                print(
+                    colored(
+                        f"Registering Temporary {entity_type}:",
+                        "yellow",
+                    ),
+                    colored(temp_entity_name, "magenta"),
+                )
 
-            self._register_entity(
-                func,
-                temp_entity_name,
-                stage_location,
-                packages,
-                imports,
-                is_sproc,
-                is_temp=True,
-                execute_as=execute_as_value,
-            )
+                self._register_entity(
+                    func,
+                    temp_entity_name,
+                    stage_location,
+                    packages,
+                    imports,
+                    is_sproc,
+                    is_temp=True,
+                    execute_as=execute_as_value,
+                )
 
-            print(
-                colored(
-                    f"\n✅ Temporary {entity_type} {temp_entity_name} passed the test. Proceeding with deployment...",
-                    "green",
+                print(
+                    colored(
+                        f"\n✅ Temporary {entity_type} {temp_entity_name} passed the test. Proceeding with deployment...",
+                        "green",
+                    )
                 )
-            )
 
-            temp_arg_type = self._entity_signature(temp_entity_name, is_sproc)
+                temp_arg_type = self._entity_signature(temp_entity_name, is_sproc)
 
             # Register main entity
             print(
@@ -254,6 +306,9 @@ class SnowflakeRegister:
 
             self._drop_temp_entity(temp_entity_name, temp_arg_type, is_sproc)
 
+            if self.manifest is not None:
+                self.manifest.record(manifest_key, digest)
+
             print(
                 colored(
                     f"\n✅ {entity_type} {function_name} deployed successfully!", "green"
@@ -271,3 +326,4 @@ class SnowflakeRegister:
             raise e
 
         print(colored("==========================================", "cyan"))
+        return True
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import subprocess
+import tempfile
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from packaging.markers import InvalidMarker, Marker
+from termcolor import colored
+
+from .build_cache import BuildCache
+from .helper import SnowHelper
+
+_NAME_AND_EXTRAS = (
+    r"^\s*(?P<name>[A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[(?P<extras>[^\]]*)\])?\s*"
+)
+_MARKER = r"\s*(?:;(?P<marker>.*))?$"
+_REQUIREMENT_RE = re.compile(_NAME_AND_EXTRAS + r"\(?(?P<spec>[^;)]*)\)?" + _MARKER)
+_DIRECT_REFERENCE_RE = re.compile(_NAME_AND_EXTRAS + r"@\s*[^;\s]+" + _MARKER)
+
+
+def normalize_name(name: str) -> str:
+    """PEP 503 normalised project name."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+class Requirement(NamedTuple):
+    name: str
+    spec: str
+    extras: Tuple[str, ...] = ()
+    marker: Optional[Marker] = None
+
+    def applies(self, environment: Dict[str, str], extras: Iterable[str] = ()) -> bool:
+        """
+        Whether the marker holds for `environment` with any of the selected
+        `extras`; requirements without a marker always apply.
+        """
+        if self.marker is None:
+            return True
+        return any(
+            self.marker.evaluate({**environment, "extra": extra})
+            for extra in ("", *extras)
+        )
+
+
+def parse_requirement(requirement: str) -> Requirement:
+    """
+    Parse `idna[all] (<4,>=2.5) ; extra == "x"` into its normalised name,
+    spec `<4,>=2.5`, extras and environment marker.
+
+    A direct reference, `name @ url`, pins nothing the channel can match,
+    so its spec is empty.
+    """
+    direct = _DIRECT_REFERENCE_RE.match(requirement)
+    match = direct or _REQUIREMENT_RE.match(requirement)
+    if not match:
+        raise ValueError(f"Invalid requirement: {requirement}")
+    marker = None
+    if (match.group("marker") or "").strip():
+        try:
+            marker = Marker(match.group("marker").strip())
+        except InvalidMarker:
+            raise ValueError(f"Invalid marker in requirement: {requirement}")
+    extras = (match.group("extras") or "").split(",")
+    return Requirement(
+        normalize_name(match.group("name")),
+        "" if direct else match.group("spec").replace(" ", ""),
+        tuple(normalize_name(extra.strip()) for extra in extras if extra.strip()),
+        marker,
+    )
+
+
+class ResolvedPackage(NamedTuple):
+    name: str
+    version: str
+    requires: List[str]
+    requested: bool
+    extras: Tuple[str, ...] = ()
+
+    @property
+    def pin(self) -> str:
+        return f"{self.name}=={self.version}"
+
+
+class DependencyResolver:
+    """
+    Transitive dependency closure of packages, built for the Snowflake runtime.
+
+    The closure comes from pip's own resolver: `pip install --dry-run
+    --report` for the target Python and platform, which reads each wheel's
+    METADATA from the index. Only binary wheels fit a cross-platform
+    resolve, so when a package is published only as an sdist, wheels are
+    built for it with `BuildCache.build_wheels` and the resolve is retried
+    with the wheelhouse as an extra source; when offline, the wheelhouse is
+    the only source.
+    `split` then sorts the closure into packages the Snowflake Anaconda
+    channel provides and packages that have to be vendored in a zip.
+    """
+
+    def __init__(self, build_cache: Optional[BuildCache] = None):
+        self.build_cache = build_cache or BuildCache()
+
+    def _report(
+        self, requirements: List[str], offline: bool, find_links: bool = False
+    ) -> Dict:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            report_path = os.path.join(temp_dir, "report.json")
+            command = self.build_cache.pip(
+                "install",
+                "--quiet",
+                "--dry-run",
+                "--ignore-installed",
+                "--report",
+                report_path,
+                "--target",
+                os.path.join(temp_dir, "target"),
+            )
+            if offline:
+                command += ["--no-index"]
+            if offline or find_links:
+                command += ["--find-links", self.build_cache.wheelhouse]
+            subprocess.check_call(
+                command + self.build_cache.target_options() + requirements
+            )
+            with open(report_path, "r") as f:
+                return json.load(f)
+
+    def closure(self, requirements: List[str]) -> Dict[str, ResolvedPackage]:
+        """Every package `requirements` need, keyed by normalised name."""
+        try:
+            report = self._report(requirements, offline=False)
+        except subprocess.CalledProcessError:
+            report = None
+        if report is None:
+            try:
+                # Some package has no binary wheel: build the missing wheels
+                # and resolve with the wheelhouse next to the index.
+                self.build_cache.build_wheels(requirements)
+                report = self._report(requirements, offline=False, find_links=True)
+            except subprocess.CalledProcessError:
+                print(
+                    colored(
+                        "Could not resolve dependencies from the index. Using cached wheels.",
+                        "yellow",
+                    )
+                )
+                report = self._report(requirements, offline=True)
+
+        packages = {}
+        for item in report.get("install", []):
+            metadata = item["metadata"]
+            packages[normalize_name(metadata["name"])] = ResolvedPackage(
+                normalize_name(metadata["name"]),
+                metadata["version"],
+                list(metadata.get("requires_dist") or []),
+                bool(item.get("requested")),
+                tuple(
+                    normalize_name(extra)
+                    for extra in item.get("requested_extras") or []
+                ),
+            )
+        return packages
+
+    def split(
+        self, closure: Dict[str, ResolvedPackage], max_workers: Optional[int] = None
+    ) -> Tuple[Dict[str, str], Dict[str, ResolvedPackage]]:
+        """
+        Return `(channel, vendored)`.
+
+        `channel` maps every dependency the channel can provide to the channel
+        version chosen for it. A dependency counts as available when the
+        channel has a version that satisfies every constraint placed on it by
+        the other packages in the closure. Only requirements whose marker
+        holds for the target runtime and the selected extras count. The
+        requested packages and any dependency the channel cannot provide go
+        in `vendored`.
+        """
+        environment = self.build_cache.marker_environment()
+        requires = {
+            name: [parse_requirement(text) for text in package.requires]
+            for name, package in closure.items()
+        }
+
+        # Extras asked for by other packages select more requirements, which
+        # may ask for further extras.
+        extras = {name: set(package.extras) for name, package in closure.items()}
+        changed = True
+        while changed:
+            changed = False
+            for name, requirements in requires.items():
+                for requirement in requirements:
+                    if requirement.name not in extras or not requirement.applies(
+                        environment, extras[name]
+                    ):
+                        continue
+                    missing = set(requirement.extras) - extras[requirement.name]
+                    if missing:
+                        extras[requirement.name] |= missing
+                        changed = True
+
+        constraints: Dict[str, List[str]] = {name: [] for name in closure}
+        for name, requirements in requires.items():
+            for requirement in requirements:
+                if (
+                    requirement.name in constraints
+                    and requirement.spec
+                    and requirement.applies(environment, extras[name])
+                ):
+                    constraints[requirement.name].append(requirement.spec)
+
+        dependencies = [
+            name for name, package in closure.items() if not package.requested
+        ]
+        requirements = {
+            name: name + ",".join(constraints[name]) for name in dependencies
+        }
+        resolved = SnowHelper.resolve_packages(
+            list(requirements.values()), max_workers=max_workers
+        )
+
+        channel, vendored = {}, {}
+        for name, package in closure.items():
+            version = resolved.get(requirements.get(name))
+            if package.requested or not version:
+                vendored[name] = package
+            else:
+                channel[name] = version
+        return channel, vendored
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import time
+from typing import List, NamedTuple
+
+import sqlparse
+from sqlparse import tokens as T
+from termcolor import colored
+
+
+def _first_keyword(statement: str) -> str:
+    text = sqlparse.format(statement, strip_comments=True).strip()
+    return text.split(None, 1)[0].upper() if text else ""
+
+
+def _trim(statement: str) -> str:
+    """Drop the trailing `;` and any comments after it."""
+    # A joined DECLARE block parses as several statements.
+    tokens = [
+        token for parsed in sqlparse.parse(statement) for token in parsed.flatten()
+    ]
+    while tokens and (
+        tokens[-1].is_whitespace
+        or tokens[-1].ttype in T.Comment
+        or tokens[-1].match(T.Punctuation, ";")
+    ):
+        tokens.pop()
+    return "".join(token.value for token in tokens).strip()
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Split a SQL script into statements, without their trailing `;` and
+    trailing comments.
+
+    sqlparse's tokenizer keeps semicolons inside string literals, `$$`
+    bodies and `BEGIN ... END` blocks together. It does split a Snowflake
+    Scripting `DECLARE` section from its `BEGIN ... END` body, so those are
+    joined back up. Comment-only fragments are dropped.
+    """
+    statements, declare = [], []
+    for statement in sqlparse.split(sql):
+        keyword = _first_keyword(statement)
+        if not keyword:
+            continue
+        if declare or keyword == "DECLARE":
+            declare.append(statement)
+            if keyword != "BEGIN":
+                continue
+            statement, declare = "\n".join(declare), []
+        statements.append(_trim(statement))
+    if declare:
+        statements.append(_trim("\n".join(declare)))
+    return statements
+
+
+class StatementTiming(NamedTuple):
+    statement: str
+    seconds: float
+
+
+class SqlScript:
+    """
+    A SQL script run statement by statement, or as one batch.
+
+    In batch mode every statement runs inside a single anonymous Snowflake
+    Scripting block, `EXECUTE IMMEDIATE '<BEGIN ... END>'`, so the whole
+    script costs one round-trip. Statements that Snowflake Scripting does
+    not allow, such as `USE`, need the statement-by-statement mode.
+    """
+
+    def __init__(self, statements: List[str]):
+        self.statements = statements
+
+    @classmethod
+    def from_text(cls, sql: str) -> "SqlScript":
+        return cls(split_statements(sql))
+
+    @staticmethod
+    def _summary(statement: str, width: int = 80) -> str:
+        line = " ".join(statement.split())
+        return line if len(line) <= width else line[: width - 3] + "..."
+
+    def batch(self) -> str:
+        """The statements as one `EXECUTE IMMEDIATE` of a scripting block."""
+        block = "BEGIN\n" + "".join(f"{s};\n" for s in self.statements) + "END;"
+        escaped = block.replace("\\", "\\\\").replace("'", "\\'")
+        return f"EXECUTE IMMEDIATE '{escaped}'"
+
+    def print_plan(self, batch: bool = False) -> None:
+        mode = "1 batched request" if batch else f"{len(self.statements)} requests"
+        print(colored(f"Plan: {len(self.statements)} statements in {mode}", "cyan"))
+        for index, statement in enumerate(self.statements, 1):
+            print(colored(f"\t{index}. {self._summary(statement)}", "yellow"))
+
+    def run(self, session, batch: bool = False) -> List[StatementTiming]:
+        """
+        Execute the script and return how long each request took. A batch
+        is a single request covering all statements.
+        """
+        timings = []
+        if batch and len(self.statements) > 1:
+            request = self.batch()
+            start = time.monotonic()
+            session.sql(request).collect()
+            elapsed = time.monotonic() - start
+            timings.append(StatementTiming(request, elapsed))
+            print(
+                colored(
+                    f"\t{len(self.statements)} statements in 1 request ({elapsed:.2f}s)",
+                    "blue",
+                )
+            )
+            return timings
+
+        for statement in self.statements:
+            start = time.monotonic()
+            session.sql(statement).collect()
+            elapsed = time.monotonic() - start
+            timings.append(StatementTiming(statement, elapsed))
+            print(colored(f"\t{elapsed:6.2f}s  {self._summary(statement)}", "blue"))
+        return timings
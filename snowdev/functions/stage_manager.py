@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, Set, Tuple
+
+from termcolor import colored
+
+
+class StageManager:
+    """
+    Stages of one schema, checked and created at most once.
+
+    Managers are shared by every session with the same account, role,
+    database and schema, like the SchemaCatalog, so the UDF, stored
+    procedure, Streamlit and task deployers of a batch deploy issue a single
+    `CREATE STAGE IF NOT EXISTS` per stage between them. The role is part of
+    the key because it owns the stages it creates and decides which ones
+    SHOW lists. A manager holds no session: each query runs on the session
+    passed to it. Subpaths such as
+    `/udf` or `/static/packages` are prefixes, not objects: they are ready
+    as soon as their stage exists, so only stages need ensuring.
+    """
+
+    CREATE_STAGE = "CREATE STAGE IF NOT EXISTS {} DIRECTORY = (ENABLE = TRUE)"
+
+    _managers: Dict[Tuple[str, str, str, str], "StageManager"] = {}
+    _managers_lock = threading.Lock()
+
+    def __init__(self, session):
+        self.database = str(session.get_current_database() or "").replace('"', "")
+        self.schema = str(session.get_current_schema() or "").replace('"', "")
+        self._exists: Dict[str, bool] = {}
+        self._ensured: Set[str] = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _schema_key(session) -> Tuple[str, str, str, str]:
+        return tuple(
+            str(value or "").replace('"', "").upper()
+            for value in (
+                session.get_current_account(),
+                session.get_current_role(),
+                session.get_current_database(),
+                session.get_current_schema(),
+            )
+        )
+
+    @classmethod
+    def for_session(cls, session) -> "StageManager":
+        """The stage manager of the session's current role and schema."""
+        key = cls._schema_key(session)
+        with cls._managers_lock:
+            manager = cls._managers.get(key)
+            if manager is None:
+                manager = cls._managers[key] = cls(session)
+        return manager
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._managers_lock:
+            cls._managers.clear()
+
+    def qualify(self, stage_name: str) -> str:
+        """`SNOWDEV` -> `DB.SCHEMA.SNOWDEV`; qualified names are kept as given."""
+        parts = stage_name.lstrip("@").replace('"', "").split(".")
+        parts = [self.database, self.schema][: 3 - len(parts)] + parts
+        return ".".join(parts).upper()
+
+    def exists(self, session, stage_name: str) -> bool:
+        """Whether the stage exists, with one `SHOW STAGES` per stage."""
+        qualified = self.qualify(stage_name)
+        with self._lock:
+            if qualified in self._exists:
+                return self._exists[qualified]
+            database, schema, name = qualified.rsplit(".", 2)
+            try:
+                rows = session.sql(
+                    f"SHOW STAGES LIKE '{name}' IN SCHEMA {database}.{schema}"
+                ).collect()
+            except Exception as e:
+                # A missing database or schema has no stages; other errors,
+                # such as lost connections, are not a missing stage.
+                if "does not exist" not in str(e):
+                    raise
+                rows = []
+            exists = any(row["name"].upper() == name for row in rows)
+            self._exists[qualified] = exists
+            return exists
+
+    def ensure(self, session, stage_name: str) -> str:
+        """Create the stage if needed, once per schema; returns the qualified name."""
+        qualified = self.qualify(stage_name)
+        with self._lock:
+            if qualified in self._ensured:
+                return qualified
+            rows = session.sql(self.CREATE_STAGE.format(stage_name)).collect()
+            status = str(rows[0]["status"]) if rows else ""
+            if "successfully created" in status:
+                print(colored(f"Stage {qualified} created successfully.", "green"))
+            self._ensured.add(qualified)
+            self._exists[qualified] = True
+            return qualified
@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import IO, Dict, List, Optional, Tuple
+
+from termcolor import colored
+
+from .channel_cache import ChannelCache
+from .uploader import StageUploader
+
+
+class SyncPlan:
+    """What a sync would do: files to upload, files to keep and files to remove."""
+
+    def __init__(
+        self,
+        uploads: List[Tuple[str, str]],
+        unchanged: List[str],
+        removals: List[str],
+        local_md5s: Optional[Dict[str, str]] = None,
+    ):
+        self.uploads = uploads
+        self.unchanged = unchanged
+        self.removals = removals
+        self.local_md5s = local_md5s or {}
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.uploads and not self.removals
+
+    def print(self, location: str) -> None:
+        print(colored(f"Sync plan for @{location}:", "cyan"))
+        for relative_path, _ in self.uploads:
+            print(colored(f"\t+ {relative_path}", "green"))
+        for relative_path in self.removals:
+            print(colored(f"\t- {relative_path}", "red"))
+        print(
+            colored(
+                f"\t{len(self.uploads)} to upload, {len(self.removals)} to remove, "
+                f"{len(self.unchanged)} unchanged.",
+                "blue",
+            )
+        )
+
+
+class StageDigests:
+    """
+    What LIST reported for files snowdev uploaded, next to the md5 of the
+    local content, kept in ``<SNOWDEV_CACHE_DIR>/stage_digests.json``.
+
+    LIST only reports the plain md5 of a file on stages with server-side
+    encryption, and only for single-part uploads. On client-side encrypted
+    stages it is the md5 of the encrypted file, and large files get
+    `<md5>-<parts>`. In those cases a file is unchanged when LIST still
+    reports the value recorded right after it was uploaded from the same
+    local content.
+    """
+
+    FILENAME = "stage_digests.json"
+    _lock = threading.Lock()
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(
+            ChannelCache.default_cache_dir(), self.FILENAME
+        )
+        self._data: Optional[Dict[str, Dict[str, List[str]]]] = None
+
+    def _read(self) -> Dict[str, Dict[str, List[str]]]:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def matches(
+        self, location: str, relative_path: str, remote_md5: str, local_md5: str
+    ) -> bool:
+        if self._data is None:
+            self._data = self._read()
+        recorded = self._data.get(location, {}).get(relative_path)
+        return recorded == [remote_md5, local_md5]
+
+    def record(self, location: str, entries: Dict[str, Tuple[str, str]]) -> None:
+        """Record `relative path -> (remote md5, local md5)` for `location`."""
+        if not entries:
+            return
+        with self._lock:
+            # Re-read so concurrent syncs of other locations are kept.
+            data = self._read()
+            stage = data.setdefault(location, {})
+            for relative_path, (remote_md5, local_md5) in entries.items():
+                stage[relative_path] = [remote_md5, local_md5]
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+            self._data = data
+
+
+class StageSync:
+    """
+    rsync-like sync of local files to a stage directory.
+
+    One `LIST @stage/prefix` gives the md5 and size of every remote file.
+    Only files that are new or whose md5 differs are uploaded; where LIST
+    does not report plain md5s, StageDigests decides instead. With
+    `delete=True` remote files without a local counterpart are removed with
+    a single `REMOVE`. Files are identified by their path relative to the
+    prefix, e.g. `packages/numpy.zip` for `@stage/static/packages/numpy.zip`.
+    """
+
+    def __init__(
+        self,
+        session,
+        location: str,
+        max_workers: Optional[int] = None,
+        digests: Optional[StageDigests] = None,
+    ):
+        """`location` is `db.schema.stage/prefix`, with or without a leading @."""
+        self.session = session
+        self.location = location.lstrip("@").strip("/")
+        self.stage, _, self.prefix = self.location.partition("/")
+        self.max_workers = max_workers
+        self.digests = digests or StageDigests()
+
+    @staticmethod
+    def md5_stream(stream: IO[bytes]) -> str:
+        """md5 of a seekable stream, read from the start; the stream is rewound."""
+        digest = hashlib.md5()
+        stream.seek(0)
+        for block in iter(lambda: stream.read(1024 * 1024), b""):
+            digest.update(block)
+        stream.seek(0)
+        return digest.hexdigest()
+
+    @classmethod
+    def md5(cls, file_path: str) -> str:
+        with open(file_path, "rb") as f:
+            return cls.md5_stream(f)
+
+    @staticmethod
+    def local_files(
+        directory: str, recursive: bool = True, flatten: bool = False
+    ) -> Dict[str, str]:
+        """
+        Map relative paths (with `/` separators) to local paths.
+
+        With `flatten=True` every file is keyed by its basename, matching
+        uploads that put a whole tree into one stage directory.
+        """
+        files = {}
+        for root, dirs, names in os.walk(directory):
+            dirs.sort()
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, directory).replace(os.sep, "/")
+                files[name if flatten else relative] = path
+            if not recursive:
+                break
+        return files
+
+    def remote_files(self) -> Dict[str, Tuple[int, str]]:
+        """Relative path -> (size, md5) of every file under the prefix."""
+        try:
+            rows = self.session.sql(f"LIST @{self.location}").collect()
+        except Exception as e:
+            if "does not exist" in str(e):
+                return {}
+            raise
+        prefix = f"{self.prefix}/" if self.prefix else ""
+        remote = {}
+        for row in rows:
+            # Names come back as `<stage>/<path>`, without database or schema.
+            path = row["name"].split("/", 1)[1] if "/" in row["name"] else ""
+            # LIST matches by prefix, so @stage/static also lists static_old/.
+            if not path.startswith(prefix):
+                continue
+            remote[path[len(prefix) :]] = (int(row["size"]), row["md5"])
+        return remote
+
+    @staticmethod
+    def plain_md5(remote_md5: str) -> Optional[str]:
+        """
+        The md5 LIST reported, or None for a multipart upload, whose
+        `<md5>-<parts>` is not the md5 of the file.
+        """
+        remote_md5 = str(remote_md5 or "")
+        return None if "-" in remote_md5 else remote_md5
+
+    def is_unchanged(
+        self, relative_path: str, remote: Optional[Tuple[int, str]], local_md5: str
+    ) -> bool:
+        if remote is None:
+            return False
+        if self.plain_md5(remote[1]) == local_md5:
+            return True
+        return self.digests.matches(self.location, relative_path, remote[1], local_md5)
+
+    def record_uploads(self, local_md5s: Dict[str, str]) -> None:
+        """
+        List the stage again and record what it reports for the uploaded
+        files whose md5 LIST does not show as is.
+        """
+        if not local_md5s:
+            return
+        remote = self.remote_files()
+        self.digests.record(
+            self.location,
+            {
+                path: (remote[path][1], md5)
+                for path, md5 in local_md5s.items()
+                if path in remote and self.plain_md5(remote[path][1]) != md5
+            },
+        )
+
+    def plan(
+        self, files: Dict[str, str], delete: bool = False, recursive: bool = True
+    ) -> SyncPlan:
+        """
+        Compare `files` with the stage. With `recursive=False` only files
+        directly under the prefix are considered, so subdirectories owned by
+        other uploads are never removed.
+        """
+        remote = self.remote_files()
+        if not recursive:
+            remote = {path: entry for path, entry in remote.items() if "/" not in path}
+        uploads, unchanged, local_md5s = [], [], {}
+        for relative_path, local_path in sorted(files.items()):
+            local_md5s[relative_path] = self.md5(local_path)
+            entry = remote.get(relative_path)
+            if self.is_unchanged(relative_path, entry, local_md5s[relative_path]):
+                unchanged.append(relative_path)
+            else:
+                uploads.append((relative_path, local_path))
+        removals = sorted(set(remote) - set(files)) if delete else []
+        return SyncPlan(uploads, unchanged, removals, local_md5s)
+
+    def _stage_directory(self, relative_path: str) -> str:
+        parts = [self.location] + relative_path.split("/")[:-1]
+        return "@" + "/".join(parts) + "/"
+
+    @staticmethod
+    def _escape_regex(text: str) -> str:
+        return re.sub(r"([.^$*+?()\[\]{}|\\])", r"\\\1", text)
+
+    def remove(self, removals: List[str]) -> None:
+        """Remove files, given relative to the sync location, in one REMOVE."""
+        if not removals:
+            return
+        names = "|".join(self._escape_regex(path) for path in removals)
+        prefix = self._escape_regex(f"{self.prefix}/") if self.prefix else ""
+        # PATTERN is matched against the whole `<stage>/<path>` name.
+        pattern = f"[^/]+/{prefix}({names})".replace("\\", "\\\\").replace("'", "\\'")
+        self.session.sql(f"REMOVE @{self.location} PATTERN = '{pattern}'").collect()
+        for relative_path in removals:
+            print(colored(f"Removed {relative_path} from @{self.location}", "yellow"))
+
+    def sync(
+        self,
+        files: Dict[str, str],
+        delete: bool = False,
+        dry_run: bool = False,
+        recursive: bool = True,
+    ) -> bool:
+        """
+        Bring the stage in line with `files` (relative path -> local path).
+
+        With `dry_run=True` only the plan is printed. Returns False if any
+        upload failed.
+        """
+        plan = self.plan(files, delete=delete, recursive=recursive)
+        plan.print(self.location)
+        if dry_run or plan.is_empty:
+            return True
+
+        ok = True
+        if plan.uploads:
+            uploader = StageUploader(self.session, max_workers=self.max_workers)
+            report = uploader.upload(
+                (local_path, self._stage_directory(relative_path))
+                for relative_path, local_path in plan.uploads
+            )
+            report.print_summary()
+            ok = report.ok
+            uploaded = {result.source for result in report.results if result.succeeded}
+            self.record_uploads(
+                {
+                    relative_path: plan.local_md5s[relative_path]
+                    for relative_path, local_path in plan.uploads
+                    if local_path in uploaded
+                }
+            )
+        if plan.removals:
+            self.remove(plan.removals)
+        return ok
+
+    def sync_stream(
+        self, relative_path: str, stream: IO[bytes], dry_run: bool = False
+    ) -> bool:
+        """
+        Upload one file from a seekable stream with `put_stream`, unless the
+        stage already holds the same content.
+        """
+        local_md5 = self.md5_stream(stream)
+        remote = self.remote_files().get(relative_path)
+        if self.is_unchanged(relative_path, remote, local_md5):
+            print(colored(f"{relative_path} is unchanged on @{self.location}", "blue"))
+            return True
+        if not self.put_stream(relative_path, stream, dry_run):
+            return False
+        if not dry_run:
+            self.record_uploads({relative_path: local_md5})
+        return True
+
+    def put_stream(
+        self, relative_path: str, stream: IO[bytes], dry_run: bool = False
+    ) -> bool:
+        """Upload one file from a seekable stream, without checking the stage."""
+        target = f"@{self.location}/{relative_path}"
+        if dry_run:
+            print(colored(f"Would upload {relative_path} to {target}", "green"))
+            return True
+        try:
+            stream.seek(0)
+            self.session.file.put_stream(
+                stream, target, auto_compress=False, overwrite=True
+            )
+        except Exception as e:
+            print(colored(f"❌ Failed to upload {relative_path}: {e}", "red"))
+            return False
+        print(colored(f"✅ Uploaded {relative_path} to {target}", "green"))
+        return True
@@ -5,19 +5,24 @@ import os
 from termcolor import colored
 import yaml
 
+from .ignore import IgnoreRules
+from .manifest import DeployManifest
+from .stage_manager import StageManager
+from .stage_sync import StageSync
+
 
 class StreamlitAppDeployer:
-    def __init__(self, session, stage_name):
+    def __init__(self, session, stage_name, manifest=None, max_workers=None):
         self.session = session
         self.stage_name = stage_name
+        self.manifest = manifest
+        self.max_workers = max_workers
         self.warehouse = self.session.get_current_warehouse().replace('"', "")
         self.database = self.session.get_current_database().replace('"', "")
         self.schema = self.session.get_current_schema().replace('"', "")
 
     def create_stage_if_not_exists(self, stage_name):
-        self.session.sql(
-            f"CREATE STAGE IF NOT EXISTS {stage_name} DIRECTORY = (ENABLE = TRUE)"
-        ).collect()
+        StageManager.for_session(self.session).ensure(self.session, stage_name)
 
     def get_connection_details_from_yml(self, directory):
         """
@@ -59,23 +64,6 @@ class StreamlitAppDeployer:
             directory, "role", self.session.use_role, "Using default role"
         )
 
-    def upload_to_stage(self, file_path, stage_name, app_name):
-        if os.path.isfile(file_path):
-            # Uploading files can fail due to permissions, or network issues.
-            # Check the response for any errors.
-            put_result = self.session.file.put(
-                file_path,
-                f"@{stage_name}/streamlit/{app_name}",
-                auto_compress=False,
-                overwrite=True,
-            )
-            print(
-                "\t\t-",
-                colored(file_path, "yellow"),
-                "...",
-                colored(put_result[0].status.upper(), "green"),
-            )
-
     def create_streamlit_app(self, func_name, stage_name):
 
         # Create Streamlit App with properly formatted names
@@ -94,7 +82,7 @@ class StreamlitAppDeployer:
 
         if not os.path.exists(directory):
             print(colored(f"Error: The directory {directory} does not exist.", "red"))
-            return
+            return False
 
         # self.connection_details = self.get_connection_details_from_yml(directory)
 
@@ -107,26 +95,52 @@ class StreamlitAppDeployer:
         func_name = directory_parts[-1]  # Using the directory name as function name
         streamlit_name = func_name.replace("_", " ").capitalize()
 
+        # Every file of the app, including pages/ and assets, minus ignored junk
+        files = IgnoreRules.for_directory(directory).files(directory)
+        app_files = list(files.values())
+        manifest_key, digest = None, None
+        if self.manifest is not None:
+            manifest_key = DeployManifest.key("streamlit", func_name, self.session)
+            digest = DeployManifest.compute_hash(
+                app_files,
+                {"stage": self.stage_name, "warehouse": self.warehouse},
+            )
+            if self.manifest.is_unchanged(manifest_key, digest):
+                print(
+                    colored(
+                        f"⏭️  Streamlit app {streamlit_name} is unchanged since the last deploy. Skipping.",
+                        "yellow",
+                    )
+                )
+                return True
+
         print("\n\t", colored("Stage:", "magenta"), colored(self.stage_name, "yellow"))
         print("\t", colored("App Name:", "magenta"), colored(streamlit_name, "yellow"))
         print("\n\t", colored("Files:", "magenta"))
 
-        # Loop through all files in the directory and upload them
-        for file in os.listdir(directory):
-            file_path = os.path.join(directory, file)
-
-            # Check for file existence before attempting upload.
-            if os.path.isfile(file_path):
-                self.upload_to_stage(file_path, self.stage_name, func_name)
+        self.create_stage_if_not_exists(self.stage_name)
+        # Upload only the files that differ from what is on the stage, keeping
+        # the layout, and drop files that were removed from the app
+        stage_sync = StageSync(
+            self.session,
+            f"{self.stage_name}/streamlit/{func_name}",
+            max_workers=self.max_workers,
+        )
+        if not stage_sync.sync(files, delete=True):
+            print(colored(f"Error: Failed to upload {streamlit_name} files.", "red"))
+            return False
 
         try:
             self.create_streamlit_app(func_name, self.stage_name)
+            if self.manifest is not None:
+                self.manifest.record(manifest_key, digest)
             print(
                 "\n",
                 colored(
                     f"Successfully Deployed Streamlit app: {streamlit_name}", "green"
                 ),
             )
+            return True
         except Exception as e:
             print(colored(f"Error: {e}", "red"))
-            return
+            return False
@@ -5,6 +5,9 @@ import re
 
 from termcolor import colored
 
+from .sql_script import SqlScript
+from .stage_manager import StageManager
+
 
 class TaskDeployer:
     def __init__(self, session, stage_name: str):
@@ -14,11 +17,22 @@ class TaskDeployer:
         self.database = self.session.get_current_database().replace('"', "")
 
     def create_stage_if_not_exists(self, stage_name: str):
-        self.session.sql(
-            f"CREATE STAGE IF NOT EXISTS {stage_name} DIRECTORY = (ENABLE = TRUE)"
-        ).collect()
+        StageManager.for_session(self.session).ensure(self.session, stage_name)
+
+    def deploy_task(
+        self,
+        task_name: str,
+        option: None,
+        batch: bool = False,
+        dry_run: bool = False,
+    ):
+        """
+        Run `src/task/<task_name>/app.sql`, or apply `option` (resume,
+        suspend or execute) to the task.
 
-    def deploy_task(self, task_name: str, option: None):
+        With `batch` the statements are sent as one request; with `dry_run`
+        the statement plan is printed and nothing is run.
+        """
         # Validate the task name
         if not re.match("^[a-zA-Z0-9_]+$", task_name):
             print(
@@ -27,7 +41,7 @@ class TaskDeployer:
                     "yellow",
                 )
             )
-            return
+            return False
 
         # Define the path to the SQL file
         sql_file_path = os.path.join("src", "task", task_name, "app.sql")
@@ -35,7 +49,7 @@ class TaskDeployer:
         # Check if the SQL file exists
         if not os.path.exists(sql_file_path):
             print(colored(f"⚠️ SQL file {sql_file_path} does not exist!", "yellow"))
-            return
+            return False
 
         if option:
             statement = (
@@ -45,25 +59,29 @@ class TaskDeployer:
             )
             self.session.sql(statement).collect()
             print(colored(f"✅ Task {task_name} {option} successfully!", "green"))
-            return
+            return True
 
         try:
             # Read the content of the SQL file
             with open(sql_file_path, "r") as sql_file:
-                sql_content = sql_file.read()
-
-            statements = [
-                stmt.strip() for stmt in sql_content.split(";") if stmt.strip()
-            ]
-
-            if statements:
-                for statement in statements:
-                    self.session.sql(statement).collect()
-                    print(
-                        colored(f"✅ Task {task_name} deployed successfully!", "green")
-                    )
-            else:
+                script = SqlScript.from_text(sql_file.read())
+
+            if not script.statements:
                 print(colored(f"⚠️ SQL file {sql_file_path} is empty!", "yellow"))
+                return False
+
+            if dry_run:
+                script.print_plan(batch=batch)
+                return True
+
+            timings = script.run(self.session, batch=batch)
+            total = sum(timing.seconds for timing in timings)
+            print(
+                colored(
+                    f"✅ Task {task_name} deployed successfully! ({total:.2f}s)",
+                    "green",
+                )
+            )
 
         except Exception as e:
             print(
@@ -72,3 +90,5 @@ class TaskDeployer:
                     "red",
                 )
             )
+            return False
+        return True
@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from termcolor import colored
+
+from .helper import SnowHelper
+
+_IDENTIFIER = r'(?:"[^"]+"|[A-Za-z_][\w$]*)'
+_NAME = rf"{_IDENTIFIER}(?:\s*\.\s*{_IDENTIFIER}){{0,2}}"
+_CREATE_RE = re.compile(
+    rf"\bCREATE\s+(?:OR\s+REPLACE\s+)?TASK\s+(?:IF\s+NOT\s+EXISTS\s+)?({_NAME})",
+    re.IGNORECASE,
+)
+_AFTER_RE = re.compile(rf"\bAFTER\s+({_NAME}(?:\s*,\s*{_NAME})*)", re.IGNORECASE)
+_CALL_RE = re.compile(rf"\bCALL\s+({_NAME})\s*\(", re.IGNORECASE)
+
+
+def strip_comments_and_strings(sql: str) -> str:
+    """
+    Blank out comments and single-quoted strings, so names that only appear
+    in a COMMENT or a literal are not mistaken for references. `$$` bodies
+    are kept, since scripting blocks call procedures from inside them.
+    """
+    out, i, length = [], 0, len(sql)
+    while i < length:
+        if sql.startswith(("--", "//"), i):
+            end = sql.find("\n", i)
+            i = length if end < 0 else end
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            i = length if end < 0 else end + 2
+            out.append(" ")
+        elif sql[i] == "'":
+            i += 1
+            while i < length:
+                if sql[i] == "\\":
+                    i += 2
+                elif sql.startswith("''", i):
+                    i += 2
+                elif sql[i] == "'":
+                    break
+                else:
+                    i += 1
+            i += 1
+            out.append("''")
+        else:
+            out.append(sql[i])
+            i += 1
+    return "".join(out)
+
+
+def normalize_identifier(name: str) -> str:
+    """`db.schema."My_Task"` -> `My_Task`; unquoted names are upper-cased."""
+    last = re.findall(_IDENTIFIER, name)[-1]
+    if last.startswith('"') and last.endswith('"'):
+        return last[1:-1]
+    return last.upper()
+
+
+class TaskNode(NamedTuple):
+    directory: str
+    name: str
+    after: List[str]
+    calls: List[str]
+
+
+class TaskGraph:
+    """
+    The tasks under src/task/ as a DAG.
+
+    Each `app.sql` is scanned for the task it creates, the `AFTER`
+    predecessors it declares and the procedures it `CALL`s. Tasks are keyed
+    by their normalised Snowflake name; predecessors outside the project
+    are assumed to exist already and do not constrain the order.
+    """
+
+    def __init__(self, nodes: List[TaskNode]):
+        self.nodes: Dict[str, TaskNode] = {}
+        for node in nodes:
+            if node.name in self.nodes:
+                raise ValueError(
+                    f"Task {node.name} is created by both "
+                    f"{self.nodes[node.name].directory} and {node.directory}."
+                )
+            self.nodes[node.name] = node
+
+    @staticmethod
+    def parse(directory: str, sql: str) -> TaskNode:
+        text = strip_comments_and_strings(sql)
+        created = _CREATE_RE.search(text)
+        name = normalize_identifier(
+            created.group(1) if created else os.path.basename(directory)
+        )
+        after = []
+        for match in _AFTER_RE.finditer(text):
+            for predecessor in re.findall(_NAME, match.group(1)):
+                after.append(normalize_identifier(predecessor))
+        calls = [normalize_identifier(call) for call in _CALL_RE.findall(text)]
+        return TaskNode(
+            os.path.basename(directory),
+            name,
+            list(dict.fromkeys(a for a in after if a != name)),
+            list(dict.fromkeys(calls)),
+        )
+
+    @classmethod
+    def from_directory(cls, root: str, filename: str = "app.sql") -> "TaskGraph":
+        nodes = []
+        if os.path.isdir(root):
+            for entry in sorted(os.listdir(root)):
+                path = os.path.join(root, entry, filename)
+                if os.path.isfile(path):
+                    with open(path, "r") as f:
+                        nodes.append(cls.parse(os.path.join(root, entry), f.read()))
+        return cls(nodes)
+
+    def predecessors(self, name: str) -> List[str]:
+        return [after for after in self.nodes[name].after if after in self.nodes]
+
+    def children(self, name: str) -> List[str]:
+        return [child for child in self.nodes if name in self.predecessors(child)]
+
+    def levels(self) -> List[List[str]]:
+        """
+        Topological levels: every task comes after all of its predecessors,
+        and the tasks of one level do not depend on each other.
+        """
+        remaining = {name: set(self.predecessors(name)) for name in self.nodes}
+        levels = []
+        while remaining:
+            ready = sorted(name for name, deps in remaining.items() if not deps)
+            if not ready:
+                raise ValueError(
+                    f"Task dependency cycle between {', '.join(sorted(remaining))}."
+                )
+            levels.append(ready)
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return levels
+
+    def roots(self) -> List[str]:
+        """Tasks without any predecessor, i.e. the roots of task trees."""
+        return [name for name, node in self.nodes.items() if not node.after]
+
+    def descendants(self, name: str) -> Set[str]:
+        found, stack = set(), [name]
+        while stack:
+            for child in self.children(stack.pop()):
+                if child not in found:
+                    found.add(child)
+                    stack.append(child)
+        return found
+
+    def procedures(self) -> List[str]:
+        """Every procedure called by a task, in first-seen order."""
+        return list(
+            dict.fromkeys(call for node in self.nodes.values() for call in node.calls)
+        )
+
+
+class TaskState(NamedTuple):
+    state: str
+    predecessors: List[str]
+
+
+class TaskGraphDeployer:
+    """
+    Deploy a TaskGraph level by level, with the tasks of a level in parallel.
+
+    Snowflake only lets children of a suspended root be changed, so roots
+    that are running are suspended first. That includes the root of a tree
+    the project only adds children to: it is found by following the
+    predecessors SHOW TASKS reports. Once everything is deployed the trees
+    that were running are resumed children first and root last, so a root
+    never runs with missing or suspended children. A task whose predecessor
+    failed is skipped, and a tree with a failed task stays suspended.
+    """
+
+    def __init__(
+        self,
+        session,
+        graph: TaskGraph,
+        deploy: Callable[[TaskNode], object],
+        max_workers: Optional[int] = None,
+    ):
+        self.session = session
+        self.graph = graph
+        self.deploy_node = deploy
+        self.max_workers = SnowHelper.get_max_workers(max_workers)
+        self.database = str(session.get_current_database() or "").replace('"', "")
+        self.schema = str(session.get_current_schema() or "").replace('"', "")
+
+    def qualify(self, name: str) -> str:
+        """`MY_TASK` -> `"DB"."SCHEMA"."MY_TASK"`, in the session's schema."""
+        return ".".join(f'"{part}"' for part in (self.database, self.schema, name))
+
+    def _tasks(self) -> Dict[str, TaskState]:
+        rows = self.session.sql("SHOW TASKS IN SCHEMA").collect()
+        tasks = {}
+        for row in rows:
+            predecessors = json.loads(row["predecessors"] or "[]")
+            tasks[row["name"]] = TaskState(
+                str(row["state"]).lower(),
+                [normalize_identifier(name) for name in predecessors],
+            )
+        return tasks
+
+    def _external_roots(self, tasks: Dict[str, TaskState]) -> Dict[str, Set[str]]:
+        """
+        Roots outside the project of trees the project adds children to,
+        each with the project tasks under it. Predecessors that are not in
+        this schema cannot be followed and are only warned about.
+        """
+        roots: Dict[str, Set[str]] = {}
+        for name, node in self.graph.nodes.items():
+            for after in node.after:
+                if after in self.graph.nodes:
+                    continue
+                root, seen = after, set()
+                while root in tasks and tasks[root].predecessors and root not in seen:
+                    seen.add(root)
+                    root = tasks[root].predecessors[0]
+                if root not in tasks:
+                    print(
+                        colored(
+                            f"Task {name} runs after {after}, whose tree is not in "
+                            "this schema; suspend its root first if it is running.",
+                            "yellow",
+                        )
+                    )
+                    continue
+                tree = {name} | self.graph.descendants(name)
+                roots.setdefault(root, set()).update(tree)
+        return roots
+
+    def _alter(self, names: List[str], action: str, dry_run: bool = False) -> None:
+        def alter(name):
+            if dry_run:
+                print(colored(f"Task {name}: would {action}", "yellow"))
+                return
+            self.session.sql(
+                f"ALTER TASK IF EXISTS {self.qualify(name)} {action}"
+            ).collect()
+            print(colored(f"Task {name}: {action}", "blue"))
+
+        self._run_parallel(alter, names)
+
+    def _run_parallel(self, function, items):
+        if not items:
+            return []
+        workers = min(self.max_workers, len(items))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(function, items))
+
+    def _deploy_one(self, name: str, failed: Set[str]):
+        node = self.graph.nodes[name]
+        start = time.monotonic()
+        blocked = [p for p in self.graph.predecessors(name) if p in failed]
+        if blocked:
+            error = f"skipped, predecessor {', '.join(blocked)} failed"
+            return node, False, error, 0.0
+        try:
+            succeeded = self.deploy_node(node) is not False
+            error = None if succeeded else "deployment reported a failure"
+        except Exception as e:
+            succeeded, error = False, str(e)
+        return node, succeeded, error, time.monotonic() - start
+
+    def deploy(
+        self, resume: bool = False, dry_run: bool = False
+    ) -> List[Tuple[TaskNode, bool, Optional[str], float]]:
+        """
+        Deploy every task and return `(node, succeeded, error, seconds)` in
+        deployment order. With `resume=True` every tree is resumed, not only
+        the ones that were running before. With `dry_run=True` suspends and
+        resumes are only printed; `deploy` is expected to dry-run as well.
+        """
+        levels = self.graph.levels()
+        tasks = self._tasks()
+        external = self._external_roots(tasks)
+        running = [
+            root
+            for root in self.graph.roots() + sorted(external)
+            if root in tasks and tasks[root].state == "started"
+        ]
+        self._alter(running, "SUSPEND", dry_run)
+
+        results, failed = [], set()
+        for level in levels:
+            level_results = self._run_parallel(
+                lambda name: self._deploy_one(name, failed), level
+            )
+            for node, succeeded, _, _ in level_results:
+                if not succeeded:
+                    failed.add(node.name)
+            results.extend(level_results)
+
+        to_resume = set()
+        for root in self.graph.roots() + sorted(external) if resume else running:
+            if root in external:
+                # Only the project's part of the tree is ours to resume; the
+                # root itself only if it was running before.
+                tree = external[root] | ({root} if root in running else set())
+            else:
+                tree = {root} | self.graph.descendants(root)
+            if tree & failed:
+                print(
+                    colored(
+                        f"Task tree {root} has failed tasks and stays suspended.",
+                        "yellow",
+                    )
+                )
+            else:
+                to_resume |= tree
+        for level in reversed(levels):
+            self._alter(
+                [name for name in level if name in to_resume], "RESUME", dry_run
+            )
+        self._alter(
+            [root for root in sorted(external) if root in to_resume], "RESUME", dry_run
+        )
+        return results
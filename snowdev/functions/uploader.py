@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import glob
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from termcolor import colored
+
+from .helper import SnowHelper
+
+
+class UploadResult(NamedTuple):
+    source: str
+    stage_location: str
+    size: int
+    succeeded: bool
+    error: Optional[str] = None
+
+
+def _format_bytes(size: float) -> str:
+    if size < 1024:
+        return f"{size:.0f} B"
+    for unit in ("KB", "MB"):
+        size /= 1024
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+    return f"{size / 1024:.1f} GB"
+
+
+class UploadReport:
+    """Per-file upload results plus totals for the whole run."""
+
+    def __init__(self, results: List[UploadResult], elapsed: float):
+        self.results = results
+        self.elapsed = elapsed
+
+    @property
+    def failed(self) -> List[UploadResult]:
+        return [result for result in self.results if not result.succeeded]
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(result.size for result in self.results if result.succeeded)
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second over the wall-clock time of the upload."""
+        return self.total_bytes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def print_summary(self) -> None:
+        print(colored("\n============ Upload summary ============", "cyan"))
+        for result in self.failed:
+            print(colored(f"❌ {result.source}: {result.error}", "red"))
+        uploaded = len(self.results) - len(self.failed)
+        print(
+            colored(
+                f"{uploaded} uploaded, {len(self.failed)} failed, "
+                f"{_format_bytes(self.total_bytes)} in {self.elapsed:.1f}s "
+                f"({_format_bytes(self.throughput)}/s).",
+                "green" if self.ok else "red",
+            )
+        )
+
+
+class StageUploader:
+    """
+    Upload many local files to stage locations with as few PUTs as possible.
+
+    Files are grouped by local directory and destination. A group whose file
+    names can be matched safely by a wildcard is sent with a single
+    `PUT dir/*`; other files fall back to one PUT each. Groups are uploaded
+    concurrently on a bounded thread pool, and each PUT transfers its files
+    with Snowflake's `parallel` option.
+    """
+
+    DEFAULT_PARALLEL = 4
+    _WILDCARD_CHARS = set("*?[]")
+
+    def __init__(
+        self,
+        session,
+        max_workers: Optional[int] = None,
+        parallel: Optional[int] = None,
+        overwrite: bool = True,
+        auto_compress: bool = False,
+    ):
+        self.session = session
+        self.max_workers = SnowHelper.get_max_workers(max_workers)
+        if parallel is None:
+            parallel = int(
+                os.environ.get("SNOWDEV_PUT_PARALLEL", self.DEFAULT_PARALLEL)
+            )
+        self.parallel = max(1, min(parallel, 99))
+        self.overwrite = overwrite
+        self.auto_compress = auto_compress
+
+    @classmethod
+    def _can_use_wildcard(cls, directory: str, files: List[str]) -> bool:
+        """A `directory/*` PUT uploads exactly `files`, and nothing else."""
+        if any(
+            name.startswith(".") or cls._WILDCARD_CHARS & set(name)
+            for name in map(os.path.basename, files)
+        ):
+            return False
+        if cls._WILDCARD_CHARS & set(directory):
+            return False
+        on_disk = {
+            path
+            for path in glob.glob(os.path.join(directory, "*"))
+            if os.path.isfile(path)
+        }
+        return on_disk == {os.path.join(directory, os.path.basename(f)) for f in files}
+
+    def _batches(
+        self, files: Iterable[Tuple[str, str]]
+    ) -> List[Tuple[str, str, List[str]]]:
+        """(put pattern, stage location, files covered) for each PUT to run."""
+        groups: Dict[Tuple[str, str], List[str]] = {}
+        for file_path, stage_location in files:
+            key = (os.path.dirname(file_path) or ".", stage_location)
+            groups.setdefault(key, []).append(file_path)
+
+        batches = []
+        for (directory, stage_location), group in groups.items():
+            if len(group) > 1 and self._can_use_wildcard(directory, group):
+                batches.append((os.path.join(directory, "*"), stage_location, group))
+            else:
+                batches.extend((path, stage_location, [path]) for path in group)
+        return batches
+
+    def _report(self, result: UploadResult, done: int, total: int, started: float):
+        elapsed = time.perf_counter() - started
+        if result.succeeded:
+            print(
+                colored(f"[{done}/{total}] ✅ {result.source}", "blue"),
+                colored(
+                    f"→ {result.stage_location} ({_format_bytes(result.size)}, "
+                    f"{elapsed:.1f}s elapsed)",
+                    "magenta",
+                ),
+            )
+        else:
+            print(colored(f"[{done}/{total}] ❌ {result.source}: {result.error}", "red"))
+
+    def _put(self, pattern: str, stage_location: str, covered: List[str]):
+        error = None
+        try:
+            self.session.file.put(
+                pattern,
+                stage_location,
+                parallel=self.parallel,
+                overwrite=self.overwrite,
+                auto_compress=self.auto_compress,
+            )
+        except Exception as e:
+            error = str(e)
+        return [
+            UploadResult(
+                path, stage_location, os.path.getsize(path), error is None, error
+            )
+            for path in covered
+        ]
+
+    def upload(self, files: Iterable[Tuple[str, str]]) -> UploadReport:
+        """
+        Upload `(local path, stage location)` pairs and return the report.
+
+        Stage locations are directories such as `@db.schema.stage/static/`.
+        """
+        files = list(files)
+        started = time.perf_counter()
+        results: List[UploadResult] = []
+        batches = self._batches(files)
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, max(1, len(batches)))
+        ) as executor:
+            futures = [executor.submit(self._put, *batch) for batch in batches]
+            for future in as_completed(futures):
+                for result in future.result():
+                    results.append(result)
+                    self._report(result, len(results), len(files), started)
+
+        return UploadReport(results, time.perf_counter() - started)
@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from langchain.embeddings.base import Embeddings
+from langchain.embeddings.openai import OpenAIEmbeddings
+from termcolor import colored
+
+EmbedFunction = Callable[[List[str]], List[List[float]]]
+T = TypeVar("T")
+
+# Exceptions worth retrying, by class name so the openai client is not
+# imported here: rate limits, overloaded or unreachable API, timeouts.
+RETRYABLE_ERRORS = {
+    "RateLimitError",
+    "ServiceUnavailableError",
+    "APIConnectionError",
+    "Timeout",
+    "TryAgain",
+}
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+class TokenCounter:
+    """
+    Count tokens with tiktoken. tiktoken downloads its encodings on first
+    use, so when that is not possible, or no encoding is given, the count
+    is estimated at four characters per token, which is close for English
+    text and code.
+    """
+
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, encoding: Optional[str] = "cl100k_base"):
+        self.encoding_name = encoding
+        self._encoding = None
+        self._loaded = encoding is None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if not self._loaded:
+                try:
+                    import tiktoken
+
+                    self._encoding = tiktoken.get_encoding(self.encoding_name)
+                except Exception as e:
+                    print(
+                        colored(
+                            f"tiktoken is unavailable ({type(e).__name__}), "
+                            "estimating token counts.",
+                            "yellow",
+                        )
+                    )
+                self._loaded = True
+        return self._encoding
+
+    def __call__(self, text: str) -> int:
+        encoding = self._load()
+        if encoding is None:
+            return len(text) // self.CHARS_PER_TOKEN + 1
+        return len(encoding.encode(text, disallowed_special=()))
+
+
+class EmbeddingCheckpoint:
+    """
+    Vectors embedded so far, appended to a JSON-lines file as each batch
+    finishes and keyed by the sha256 of the text. An interrupted run
+    reloads them and only embeds what is missing.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.vectors: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.decoder.JSONDecodeError:
+                        # A line cut short by the interruption.
+                        continue
+                    self.vectors[record["sha256"]] = record["embedding"]
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def get(self, text: str) -> Optional[List[float]]:
+        return self.vectors.get(self.key(text))
+
+    def add(self, texts: List[str], vectors: List[List[float]]) -> None:
+        with self._lock:
+            lines = []
+            for text, vector in zip(texts, vectors):
+                key = self.key(text)
+                self.vectors[key] = vector
+                lines.append(json.dumps({"sha256": key, "embedding": vector}))
+            if self.path:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a") as f:
+                    f.write("".join(line + "\n" for line in lines))
+
+    def clear(self) -> None:
+        self.vectors = {}
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class BatchEmbedder:
+    """
+    Embed texts in batches that fit a token budget, and at most
+    MAX_BATCH_TEXTS texts, with a bounded number of requests in flight.
+
+    Retryable errors (rate limits, timeouts, an overloaded API) are retried
+    with exponential backoff and jitter. Finished batches are written to an
+    EmbeddingCheckpoint, so re-running after an interruption only embeds the
+    texts that are still missing.
+    """
+
+    # The most inputs the OpenAI embeddings endpoint takes in one request.
+    MAX_BATCH_TEXTS = 2048
+
+    def __init__(
+        self,
+        embed: EmbedFunction,
+        max_tokens: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        max_retries: int = 6,
+        checkpoint: Optional[str] = None,
+        count_tokens: Optional[Callable[[str], int]] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.embed = embed
+        self.max_tokens = max_tokens or _env_int("SNOWDEV_EMBED_BATCH_TOKENS", 8000)
+        self.max_workers = max_workers or _env_int("SNOWDEV_EMBED_WORKERS", 4)
+        self.max_retries = max_retries
+        self.checkpoint = EmbeddingCheckpoint(checkpoint)
+        self.count_tokens = count_tokens or TokenCounter()
+        self.sleep = sleep
+
+    def batches(self, texts: List[str]) -> List[List[str]]:
+        """
+        Group texts in order so each batch stays within the token budget and
+        MAX_BATCH_TEXTS. A text larger than the budget gets a batch of its own.
+        """
+        batches, current, used = [], [], 0
+        for text in texts:
+            tokens = self.count_tokens(text)
+            if current and (
+                used + tokens > self.max_tokens or len(current) == self.MAX_BATCH_TEXTS
+            ):
+                batches.append(current)
+                current, used = [], 0
+            current.append(text)
+            used += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        if type(error).__name__ in RETRYABLE_ERRORS:
+            return True
+        return getattr(error, "http_status", None) in (429, 500, 502, 503, 504)
+
+    def backoff(self, attempt: int) -> float:
+        return min(60.0, 2**attempt) * (0.5 + random.random() / 2)
+
+    def call_with_retries(self, call: Callable[[], T]) -> T:
+        """Run `call`, retrying retryable errors with backoff."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return call()
+            except Exception as e:
+                if attempt == self.max_retries or not self.is_retryable(e):
+                    raise
+                delay = self.backoff(attempt)
+                print(
+                    colored(
+                        f"{type(e).__name__} while embedding, retrying in {delay:.1f}s",
+                        "yellow",
+                    )
+                )
+                self.sleep(delay)
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        vectors = self.call_with_retries(lambda: self.embed(batch))
+        if len(vectors) != len(batch):
+            raise ValueError(f"Expected {len(batch)} embeddings, got {len(vectors)}.")
+        self.checkpoint.add(batch, vectors)
+        return vectors
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed `texts`, in order, reusing vectors from the checkpoint."""
+        missing = list(
+            dict.fromkeys(text for text in texts if self.checkpoint.get(text) is None)
+        )
+        resumed = len(set(texts)) - len(missing)
+        if resumed:
+            print(colored(f"Resuming: {resumed} chunks already embedded.", "cyan"))
+        batches = self.batches(missing)
+        done = [0]
+        lock = threading.Lock()
+
+        def run(batch):
+            self._embed_batch(batch)
+            with lock:
+                done[0] += 1
+                print(
+                    colored(
+                        f"Embedded batch {done[0]}/{len(batches)} "
+                        f"({len(batch)} chunks)",
+                        "blue",
+                    )
+                )
+
+        if batches:
+            workers = min(self.max_workers, len(batches))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(run, batches))
+        return [self.checkpoint.get(text) for text in texts]
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    langchain Embeddings that send `embed_documents` through a
+    BatchEmbedder, so vector stores get batching, retries and the
+    checkpoint without any change on their side.
+    """
+
+    def __init__(self, inner: Embeddings, **options):
+        self.inner = inner
+        self.embedder = BatchEmbedder(inner.embed_documents, **options)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embedder.embed_texts(list(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embedder.call_with_retries(lambda: self.inner.embed_query(text))
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    A local, dependency-free embedding: signed feature hashing of the
+    lower-cased words and word pairs of a text, weighted by 1 + log(count)
+    and L2-normalised. It needs no model and no network, so it is fast and
+    deterministic, at the cost of only matching on shared vocabulary.
+    """
+
+    WORD_RE = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, dimensions: int = 1024):
+        self.dimensions = dimensions
+
+    def _vector(self, text: str) -> List[float]:
+        words = self.WORD_RE.findall(text.lower())
+        features = Counter(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+        vector = [0.0] * self.dimensions
+        for feature, count in features.items():
+            digest = zlib.crc32(feature.encode())
+            sign = -1.0 if digest & 0x80000000 else 1.0
+            vector[digest % self.dimensions] += sign * (1.0 + math.log(count))
+        norm = math.sqrt(sum(value * value for value in vector))
+        return [value / norm for value in vector] if norm else vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+
+class MiniLMEmbeddings(Embeddings):
+    """
+    all-MiniLM-L6-v2 on CPU through onnxruntime, using the model bundled
+    with chromadb. The model is downloaded once to ~/.cache/chroma and
+    runs offline after that.
+    """
+
+    def __init__(self):
+        from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+        self.model = ONNXMiniLM_L6_V2()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [[float(value) for value in vector] for vector in self.model(texts)]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+EMBEDDING_BACKENDS = ("openai", "hashing", "minilm")
+
+
+def get_embeddings(backend: str, openai_api_key: Optional[str] = None) -> Embeddings:
+    """
+    The langchain Embeddings for a backend named in EMBEDDING_BACKENDS.
+
+    OpenAI embeddings are meant to be wrapped in BatchedEmbeddings, which
+    owns batching and retries, so the client neither retries nor splits a
+    batch on its own.
+    """
+    if backend == "openai":
+        return OpenAIEmbeddings(
+            openai_api_key=openai_api_key,
+            model="text-embedding-ada-002",
+            max_retries=0,
+            chunk_size=BatchEmbedder.MAX_BATCH_TEXTS,
+        )
+    if backend == "hashing":
+        return HashingEmbeddings()
+    if backend == "minilm":
+        return MiniLMEmbeddings()
+    raise ValueError(
+        f"Unknown embedding backend {backend!r}, "
+        f"expected one of {', '.join(EMBEDDING_BACKENDS)}."
+    )
+
+
+def collection_name(backend: str) -> str:
+    """
+    The Chroma collection for a backend. Backends produce vectors of
+    different sizes, so each gets its own; openai keeps langchain's default.
+    """
+    return "langchain" if backend == "openai" else f"langchain-{backend}"
@@ -5,20 +5,28 @@ import json
 import os
 from enum import Enum
 from pathlib import Path
-from typing import Any, Dict, List, NamedTuple
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
+import chromadb
 import pkg_resources
 import sqlparse
-from langchain.document_loaders import DirectoryLoader
-from langchain.embeddings.openai import OpenAIEmbeddings
+from langchain.embeddings.base import Embeddings
 from langchain.text_splitter import CharacterTextSplitter
 from langchain.vectorstores import Chroma
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, validator
 from termcolor import colored
 
+from .embedding import (
+    EMBEDDING_BACKENDS,
+    BatchedEmbeddings,
+    TokenCounter,
+    collection_name,
+    get_embeddings,
+)
+
 
 class Secrets(BaseModel):
-    OPENAI_API_KEY: str
+    OPENAI_API_KEY: Optional[str] = None
 
 
 class Document(NamedTuple):
@@ -32,6 +40,18 @@ class Config(BaseModel):
     docs_dir: str = pkg_resources.resource_filename(
         "snowdev.functions.utils", "knowledge"
     )
+    embedding_backend: str = Field(
+        default_factory=lambda: os.environ.get("SNOWDEV_EMBEDDING_BACKEND", "openai")
+    )
+
+    @validator("embedding_backend")
+    def known_backend(cls, value):
+        if value not in EMBEDDING_BACKENDS:
+            raise ValueError(
+                f"Unknown embedding backend {value!r}, "
+                f"expected one of {', '.join(EMBEDDING_BACKENDS)}."
+            )
+        return value
 
 
 class PathType(Enum):
@@ -45,49 +65,126 @@ class PathType(Enum):
         self.desc = desc
 
 
+class FileEntry(NamedTuple):
+    mtime_ns: int
+    size: int
+    sha256: str
+    chunk_ids: List[str]
+
+
 class DocumentProcessor:
+    """
+    Incremental indexer for the knowledge base and src/ into Chroma.
+
+    Every source file is stat'ed first; only files whose mtime or size
+    changed are read and hashed, and only files whose content changed are
+    chunked. Chunks get stable IDs derived from their source and content,
+    so unchanged chunks of an edited file are kept as they are, new chunks
+    are upserted, and chunks that no longer exist (including every chunk of
+    a deleted file) are removed from the collection. The per-file state is
+    kept in ``checksum_file``.
+
+    Each embedding backend has its own collection and state file. Chunks
+    carry the sha256 of their text in their metadata, and before embedding,
+    the collection is asked for vectors it already holds for the same text,
+    so moved files and a lost state file cost lookups, not embeddings. Only
+    the changed chunks are looked up. A run's finished batches are also
+    appended to a checkpoint, which is removed once the run is done, so an
+    interrupted run resumes where it stopped.
+    """
+
+    STATE_VERSION = 2
+    # Content hashes looked up in the collection per query.
+    LOOKUP_BATCH = 100
+    SOURCES = [("{docs_dir}", ("**/*.py", "**/*.md")), ("src", ("**/*.py", "**/*.md"))]
+
     def __init__(
-        self, secrets: Secrets, config: Config, checksum_file: str = "checksums.json"
+        self,
+        secrets: Secrets,
+        config: Config,
+        checksum_file: Optional[str] = None,
     ):
-        self._initialize_loaders(config.docs_dir)
+        self.docs_dir = config.docs_dir
         self.text_splitter = CharacterTextSplitter(
             chunk_size=config.chunk_size, chunk_overlap=config.chunk_overlap
         )
-        self.embeddings = OpenAIEmbeddings(openai_api_key=secrets.OPENAI_API_KEY)
-        self.checksum_file = checksum_file
-        self.checksum_dict = self._load_checksums()
+        self.backend = config.embedding_backend
+        self.embeddings = get_embeddings(self.backend, secrets.OPENAI_API_KEY)
+        self.collection_name = collection_name(self.backend)
+        self.persist_directory = "chroma_db"
+        self.checksum_file = checksum_file or (
+            "checksums.json"
+            if self.backend == "openai"
+            else f"checksums-{self.backend}.json"
+        )
+        self.checkpoint_file = os.path.join(
+            self.persist_directory, f"{self.collection_name}.checkpoint.jsonl"
+        )
+        self._client = None
+        self.files: Dict[str, FileEntry] = {}
+        self.checksum_dict: Dict[str, str] = {}
+        self._load_checksums()
         self._convert_sql_to_md_if_changed()
 
-    def _initialize_loaders(self, docs_dir: str):
-        self.loader_py = DirectoryLoader(docs_dir, glob="**/*.py")
-        self.loader_md = DirectoryLoader(docs_dir, glob="**/*.md")
-        self.loader_src_py = DirectoryLoader("src/", glob="**/*.py")
-        self.loader_src_sql = DirectoryLoader("src/", glob="**/*.md")
-
-    def _load_checksums(self) -> Dict[str, str]:
-        if os.path.exists(self.checksum_file):
-            with open(self.checksum_file, "r") as f:
-                try:
-                    return json.load(f)
-                except json.decoder.JSONDecodeError:
-                    print(
-                        colored(
-                            "Checksum file is empty. Creating a new checksum dictionary.",
-                            "yellow",
-                        )
+    def _load_checksums(self) -> None:
+        """
+        Load the index state. The old format, a flat `{path: sha256}` map,
+        has no chunk IDs, so those files are re-indexed once.
+        """
+        if not os.path.exists(self.checksum_file):
+            return
+        with open(self.checksum_file, "r") as f:
+            try:
+                state = json.load(f)
+            except json.decoder.JSONDecodeError:
+                print(
+                    colored(
+                        "Checksum file is empty. Creating a new checksum dictionary.",
+                        "yellow",
                     )
-                    return {}
-        else:
-            return {}
+                )
+                return
+        if state.get("version") != self.STATE_VERSION:
+            self.checksum_dict = {
+                path: checksum
+                for path, checksum in state.items()
+                if path.endswith(".sql")
+            }
+            return
+        self.files = {
+            path: FileEntry(**entry) for path, entry in state["files"].items()
+        }
+        self.checksum_dict = state.get("compiled", {})
 
     def _save_checksums(self) -> None:
-        with open(self.checksum_file, "w") as f:
-            json.dump(self.checksum_dict, f)
+        state = {
+            "version": self.STATE_VERSION,
+            "files": {path: entry._asdict() for path, entry in self.files.items()},
+            "compiled": self.checksum_dict,
+        }
+        tmp_path = self.checksum_file + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checksum_file)
 
     @staticmethod
     def _create_checksum(content: str) -> str:
         return hashlib.sha256(content.encode()).hexdigest()
 
+    @classmethod
+    def chunk_ids(cls, source: str, chunks: List[str]) -> List[str]:
+        """
+        Stable chunk IDs: the source plus the hash of the chunk text, with a
+        counter for chunks repeated within the same file.
+        """
+        ids, seen = [], {}
+        for chunk in chunks:
+            digest = cls._create_checksum(chunk)[:16]
+            count = seen.get(digest, 0)
+            seen[digest] = count + 1
+            ids.append(f"{source}#{digest}" + (f"-{count}" if count else ""))
+        return ids
+
     def _generate_prompt_from_path(self, path: str) -> str:
         folder_name = os.path.basename(os.path.dirname(path))
         for path_type in PathType:
@@ -95,24 +192,184 @@ class DocumentProcessor:
                 return f"This is the {path_type.desc} written in snowflake snowpark named {folder_name}."
         return ""
 
+    def _candidate_files(self) -> List[str]:
+        files = []
+        for root, patterns in self.SOURCES:
+            root = root.format(docs_dir=self.docs_dir)
+            for pattern in patterns:
+                files.extend(str(path) for path in Path(root).glob(pattern))
+        return sorted(set(files))
+
+    def _changed_files(
+        self, candidates: List[str]
+    ) -> Tuple[Dict[str, Tuple[os.stat_result, str, str]], int]:
+        """
+        Stat every candidate and hash only those whose mtime or size moved.
+
+        Returns the files whose content changed, as path -> (stat, sha256,
+        text), and the number of files that were hashed.
+        """
+        changed, hashed = {}, 0
+        for path in candidates:
+            stat = os.stat(path)
+            entry = self.files.get(path)
+            if (
+                entry is not None
+                and entry.mtime_ns == stat.st_mtime_ns
+                and entry.size == stat.st_size
+            ):
+                continue
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                content = f.read()
+            hashed += 1
+            checksum = self._create_checksum(content)
+            if entry is not None and entry.sha256 == checksum and entry.chunk_ids:
+                # Touched but not modified: only the stat changes.
+                self.files[path] = entry._replace(
+                    mtime_ns=stat.st_mtime_ns, size=stat.st_size
+                )
+                continue
+            changed[path] = (stat, checksum, content)
+        return changed, hashed
+
+    def _chroma_client(self):
+        if self._client is None:
+            self._client = chromadb.PersistentClient(path=self.persist_directory)
+        return self._client
+
+    def _vector_store(self, embeddings: Optional[Embeddings] = None) -> Chroma:
+        return Chroma(
+            client=self._chroma_client(),
+            persist_directory=self.persist_directory,
+            embedding_function=embeddings or self.embeddings,
+            collection_name=self.collection_name,
+        )
+
+    def _collection(self, embeddings: Embeddings):
+        return self._chroma_client().get_or_create_collection(
+            name=self.collection_name,
+            embedding_function=embeddings.embed_documents,
+        )
+
+    def _indexed_vectors(self, collection, digests: List[str]) -> Dict[str, List]:
+        """Vectors the collection already holds for these chunk hashes."""
+        vectors = {}
+        unique = sorted(set(digests))
+        for start in range(0, len(unique), self.LOOKUP_BATCH):
+            clauses = [
+                {"sha256": {"$eq": digest}}
+                for digest in unique[start : start + self.LOOKUP_BATCH]
+            ]
+            found = collection.get(
+                where=clauses[0] if len(clauses) == 1 else {"$or": clauses},
+                include=["embeddings", "metadatas"],
+            )
+            for metadata, vector in zip(found["metadatas"], found["embeddings"]):
+                vectors[metadata["sha256"]] = list(vector)
+        return vectors
+
     def process(self) -> Dict[str, Any]:
-        data = self._load_and_filter_documents()
-        if not data:
+        candidates = self._candidate_files()
+        changed, hashed = self._changed_files(candidates)
+        deleted = sorted(set(self.files) - set(candidates))
+        print(
+            colored(
+                f"Checked {len(candidates)} files: hashed {hashed}, "
+                f"{len(changed)} changed, {len(deleted)} deleted.",
+                "cyan",
+            )
+        )
+        if not changed and not deleted:
+            self._save_checksums()
             print(colored("No new documents found to embed.", "yellow"))
             return {}
 
-        texts = self.text_splitter.split_documents(data)
-        if not texts:
-            print(colored("No new text segments found to embed.", "yellow"))
-            return {}
-
-        print(colored(f"Found {len(texts)} documents.", "cyan"))
-        vector_store = Chroma.from_documents(
-            texts, self.embeddings, persist_directory="chroma_db"
+        embeddings = BatchedEmbeddings(
+            self.embeddings,
+            checkpoint=self.checkpoint_file,
+            # Only the OpenAI API has a token limit worth counting exactly.
+            count_tokens=TokenCounter(
+                "cl100k_base" if self.backend == "openai" else None
+            ),
         )
-        vector_store.persist()
+        collection = self._collection(embeddings)
+        stale_ids: List[str] = []
+        texts: List[str] = []
+        metadatas: List[Dict[str, str]] = []
+        ids: List[str] = []
+
+        for path in deleted:
+            stale_ids.extend(self.files.pop(path).chunk_ids)
+            print(colored(f"Removing {path}", "yellow"))
+
+        for path, (stat, checksum, content) in changed.items():
+            previous = self.files.get(path)
+            chunks = self.text_splitter.split_text(content)
+            chunk_ids = self.chunk_ids(path, chunks)
+            if previous is not None and previous.chunk_ids:
+                stale_ids.extend(set(previous.chunk_ids) - set(chunk_ids))
+                known = set(previous.chunk_ids)
+            else:
+                # Indexed before chunk IDs existed: replace its chunks.
+                stale_ids.extend(collection.get(where={"source": path})["ids"])
+                known = set()
+            prompt = self._generate_prompt_from_path(path)
+            new = [
+                (chunk_id, chunk)
+                for chunk_id, chunk in zip(chunk_ids, chunks)
+                if chunk_id not in known
+            ]
+            for chunk_id, chunk in new:
+                ids.append(chunk_id)
+                texts.append(chunk)
+                metadatas.append(
+                    {
+                        "source": path,
+                        "prompt": prompt,
+                        "sha256": self._create_checksum(chunk),
+                    }
+                )
+            print(
+                colored(
+                    f"Embedding {path}: {len(new)} of {len(chunks)} chunks changed",
+                    "green",
+                )
+            )
+            self.files[path] = FileEntry(
+                stat.st_mtime_ns, stat.st_size, checksum, chunk_ids
+            )
+
+        if texts:
+            print(colored(f"Found {len(texts)} documents.", "cyan"))
+            digests = [metadata["sha256"] for metadata in metadatas]
+            vectors = self._indexed_vectors(collection, digests)
+            missing = [text for text, d in zip(texts, digests) if d not in vectors]
+            if len(missing) < len(texts):
+                print(
+                    colored(
+                        f"Reusing {len(texts) - len(missing)} vectors already indexed.",
+                        "cyan",
+                    )
+                )
+            if missing:
+                embedded = embeddings.embed_documents(missing)
+                for text, vector in zip(missing, embedded):
+                    vectors[self._create_checksum(text)] = vector
+            collection.upsert(
+                ids=ids,
+                embeddings=[vectors[digest] for digest in digests],
+                documents=texts,
+                metadatas=metadatas,
+            )
+        # Chunks found by source may be the ones just upserted.
+        removed = sorted(set(stale_ids) - set(ids))
+        if removed:
+            collection.delete(ids=removed)
+        print(colored(f"Upserted {len(texts)} chunks, removed {len(removed)}.", "cyan"))
         self._save_checksums()
-        return vector_store
+        # Everything is in the collection; the checkpoint was only for resuming.
+        embeddings.embedder.checkpoint.clear()
+        return self._vector_store()
 
     def _convert_sql_to_md_if_changed(self):
         src_dir = Path("src/task")
@@ -143,50 +400,3 @@ class DocumentProcessor:
                     file.write(md_content)
 
                 self._save_checksums()
-
-    def _load_and_filter_documents(self) -> List[str]:
-        data = []
-        for record in (
-            self.loader_py.load()
-            + self.loader_md.load()
-            + self.loader_src_py.load()
-            + self.loader_src_sql.load()
-        ):
-            content = self._extract_content_from_record(record)
-            checksum = self._create_checksum(content)
-            filename = self._extract_filename_from_record(record)
-
-            # Check if the content is SQL
-            if filename.endswith(".sql"):
-                # Convert SQL to Markdown
-                formatted_sql = sqlparse.format(content, reindent=True)
-                content = f"```sql\n{formatted_sql}\n```"
-
-            if checksum != self.checksum_dict.get(filename):
-                self.checksum_dict[filename] = checksum
-                prompt = self._generate_prompt_from_path(filename)
-                self._update_record_metadata(record, filename, prompt)
-                log_msg = (
-                    colored(f"Embedding {filename} with Prompt: {prompt}", "green")
-                    if filename.startswith("src/")
-                    else colored(f"Skipped {filename}", "yellow")
-                )
-                print(log_msg)
-                data.append(record)
-
-        return data
-
-    @staticmethod
-    def _extract_content_from_record(record: Any) -> str:
-        return getattr(record, "content", str(record))
-
-    @staticmethod
-    def _extract_filename_from_record(record: Any) -> str:
-        return getattr(record, "metadata", {}).get("source", "")
-
-    @staticmethod
-    def _update_record_metadata(record: Any, filename: str, prompt: str) -> None:
-        if hasattr(record, "metadata"):
-            record.metadata["prompt"] = prompt
-        else:
-            record.metadata = {"prompt": prompt, "source": filename}
@@ -0,0 +1,421 @@
+from __future__ import annotations
+
+import bisect
+import re
+from functools import total_ordering
+from typing import Callable, Iterable, List, Optional, Tuple
+
+_COMPONENT_RE = re.compile(r"\d+|[a-z]+")
+_OPERATOR_RE = re.compile(r"^(===|==|!=|~=|>=|<=|>|<|\^|~|=)?\s*(.*)$")
+_PEP440_RE = re.compile(
+    r"""
+    ^v?
+    (?:(?P<epoch>[0-9]+)!)?
+    (?P<release>[0-9]+(?:\.[0-9]+)*)
+    (?P<pre>[-_\.]?(?P<pre_l>alpha|a|beta|b|preview|pre|c|rc)[-_\.]?(?P<pre_n>[0-9]+)?)?
+    (?P<post>(?:-(?P<post_n1>[0-9]+))|(?:[-_\.]?(?P<post_l>post|rev|r)[-_\.]?(?P<post_n2>[0-9]+)?))?
+    (?P<dev>[-_\.]?dev[-_\.]?(?P<dev_n>[0-9]+)?)?
+    (?:\+(?P<local>[a-z0-9]+(?:[-_\.][a-z0-9]+)*))?
+    $
+    """,
+    re.VERBOSE,
+)
+# Conda versions that are not PEP 440, e.g. 1.1.1w or 9.0.1_1.
+_CONDA_RE = re.compile(
+    r"^v?(?:(?P<epoch>[0-9]+)!)?(?P<release>[0-9]+(?:[._][0-9]+)*)(?P<rest>\S*)$"
+)
+_PRE_RELEASE_RANK = {
+    "a": 0,
+    "alpha": 0,
+    "b": 1,
+    "beta": 1,
+    "c": 2,
+    "pre": 2,
+    "preview": 2,
+    "rc": 2,
+}
+_INFINITY = float("inf")
+# A version optionally followed by a conda build string, e.g. `1.2.3=py310_0`
+# or `1.2.3 py310_0`.
+_BUILD_RE = re.compile(r"^(?P<version>[^\s=]+)(?:\s*=\s*|\s+)(?P<build>[\w.*+]+)$")
+# Clauses are separated by commas, or by whitespace before an operator.
+_CLAUSE_SEPARATOR_RE = re.compile(r",|\s+(?=[<>=!~^])")
+
+
+def _tokens(text: str) -> Tuple:
+    return tuple(
+        (1, int(token)) if token.isdigit() else (0, token)
+        for token in _COMPONENT_RE.findall(text)
+    )
+
+
+@total_ordering
+class VersionOrder:
+    """
+    Comparable PEP 440 / conda version.
+
+    PEP 440 versions are ordered by epoch, release, pre-release, post-release,
+    dev-release and local segment, so `1.0.dev1 < 1.0a1 < 1.0rc1 < 1.0 <
+    1.0.post1 < 1.0.1`, and trailing zeros are ignored (`1.0 == 1.0.0`).
+    Conda-only versions such as `1.1.1w` are ordered by their numeric release
+    first and then by their remaining letters and numbers, after the plain
+    release. A conda build string (`1.2.3=py310_0` or `1.2.3 py310_0`) is kept
+    in `build` but does not take part in the ordering.
+    """
+
+    def __init__(self, version: str):
+        self.original = version
+        text, self.build = _split_build(version.strip().lower())
+        if not text:
+            raise ValueError(f"Empty version string: {version!r}")
+
+        match = _PEP440_RE.match(text)
+        if match:
+            self.epoch = int(match.group("epoch") or 0)
+            self.release = tuple(
+                int(part) for part in match.group("release").split(".")
+            )
+            pre, post, dev = self._pep440_segments(match)
+            extra = ()
+            local = _tokens(match.group("local") or "")
+        else:
+            match = _CONDA_RE.match(text)
+            if not match:
+                raise ValueError(f"Invalid version: {version!r}")
+            self.epoch = int(match.group("epoch") or 0)
+            self.release = tuple(
+                int(part) for part in re.split(r"[._]", match.group("release"))
+            )
+            pre, post, dev = (2,), -1, _INFINITY
+            rest, _, local_text = match.group("rest").partition("+")
+            extra = _tokens(rest)
+            local = _tokens(local_text)
+
+        release = list(self.release)
+        while len(release) > 1 and release[-1] == 0:
+            release.pop()
+        self._key = (self.epoch, tuple(release), pre, post, extra, dev, local)
+
+    @staticmethod
+    def _pep440_segments(match):
+        post_n = match.group("post_n1") or match.group("post_n2")
+        post = int(post_n or 0) if match.group("post") else -1
+        dev = int(match.group("dev_n") or 0) if match.group("dev") else _INFINITY
+        if match.group("pre"):
+            pre = (
+                1,
+                _PRE_RELEASE_RANK[match.group("pre_l")],
+                int(match.group("pre_n") or 0),
+            )
+        elif match.group("dev") and not match.group("post"):
+            # 1.0.dev1 sorts before every pre-release of 1.0.
+            pre = (0,)
+        else:
+            pre = (2,)
+        return pre, post, dev
+
+    @property
+    def is_prerelease(self) -> bool:
+        """True for alpha, beta, release candidate and dev releases."""
+        return self._key[2] != (2,) or self._key[5] != _INFINITY
+
+    @property
+    def is_final(self) -> bool:
+        """True for plain releases without pre, post, dev or extra parts."""
+        return self._key[2:6] == ((2,), -1, (), _INFINITY)
+
+    def startswith(self, prefix: "VersionOrder") -> bool:
+        """True if the release segment begins with `prefix`'s release (1.2.5 starts with 1.2)."""
+        if self.epoch != prefix.epoch:
+            return False
+        length = len(prefix.release)
+        release = self.release + (0,) * max(0, length - len(self.release))
+        return release[:length] == prefix.release
+
+    def __eq__(self, other):
+        if not isinstance(other, VersionOrder):
+            return NotImplemented
+        return self._key == other._key
+
+    def __lt__(self, other):
+        if not isinstance(other, VersionOrder):
+            return NotImplemented
+        return self._key < other._key
+
+    def __hash__(self):
+        return hash(self._key)
+
+    def __repr__(self):
+        return f"VersionOrder({self.original!r})"
+
+    def __str__(self):
+        return self.original
+
+
+def _split_build(text: str) -> Tuple[str, Optional[str]]:
+    match = _BUILD_RE.match(text)
+    if match:
+        return match.group("version"), match.group("build")
+    return text, None
+
+
+def split_clauses(text: str) -> List[str]:
+    """
+    Split a constraint into its clauses, which must all hold: `>=1.2,<2`
+    and `>=1.2 <2` both give `['>=1.2', '<2']`. A conda build string after
+    a version, as in `1.2.3 py310_0`, stays with its version.
+    """
+    return [part.strip() for part in _CLAUSE_SEPARATOR_RE.split(text) if part.strip()]
+
+
+def _release_string(release: Iterable[int]) -> str:
+    return ".".join(map(str, release))
+
+
+def poetry_range(operator: str, value: str) -> str:
+    """
+    Expand a Poetry tilde or caret constraint into an explicit range that
+    pip and Snowpark understand.
+
+    Tilde allows patch changes, or minor changes when only the major is
+    given: `~1.4.2` and `~1.4` are `>=1.4.x,<1.5`, `~1` is `>=1,<2`. Caret
+    allows changes that keep the left-most non-zero part: `^1.2` is
+    `>=1.2,<2`, `^0.2.3` is `>=0.2.3,<0.3`.
+    """
+    release = list(VersionOrder(value).release)
+    if operator == "~":
+        upper = release[:2]
+    elif operator == "^":
+        release = release[:3]
+        position = next(
+            (index for index, part in enumerate(release) if part),
+            len(release) - 1,
+        )
+        upper = release[: position + 1]
+    else:
+        raise ValueError(f"Not a Poetry range operator: {operator!r}")
+    upper[-1] += 1
+    return f">={value},<{_release_string(upper)}"
+
+
+class VersionClause:
+    """
+    A single constraint such as `>=1.2` or `==1.2.*`.
+
+    Besides the predicate, each clause exposes the interval it restricts
+    versions to, which lets VersionIndex jump to candidates with bisect.
+    """
+
+    def __init__(
+        self,
+        predicate: Callable[[VersionOrder], bool],
+        lower: Optional[VersionOrder] = None,
+        upper: Optional[VersionOrder] = None,
+        upper_inclusive: bool = False,
+    ):
+        self.predicate = predicate
+        self.lower = lower
+        self.upper = upper
+        self.upper_inclusive = upper_inclusive
+        self.prerelease = False
+
+    @classmethod
+    def parse(cls, text: str) -> List["VersionClause"]:
+        clauses = cls._parse(text)
+        value = _OPERATOR_RE.match(text.strip()).group(2).strip().rstrip("*.")
+        try:
+            prerelease = bool(value) and VersionOrder(value).is_prerelease
+        except ValueError:
+            prerelease = False
+        for clause in clauses:
+            clause.prerelease = prerelease
+        return clauses
+
+    @classmethod
+    def _parse(cls, text: str) -> List["VersionClause"]:
+        match = _OPERATOR_RE.match(text.strip())
+        operator, value = match.group(1) or "==", match.group(2).strip()
+        if not value:
+            raise ValueError(f"Missing version in constraint: {text!r}")
+
+        if value in ("*", "*.*"):
+            return [cls(lambda version: True)] if operator in ("==", "=") else []
+
+        if operator == "=":
+            # Conda's `=1.2` means "any 1.2.x release".
+            operator = "=="
+            if not value.endswith("*"):
+                value = value + ".*"
+
+        if value.endswith("*"):
+            if operator not in ("==", "!="):
+                raise ValueError(f"Wildcards are only allowed with == and !=: {text!r}")
+            prefix = VersionOrder(value.rstrip("*").rstrip("."))
+            if operator == "!=":
+                return [cls(lambda version: not version.startswith(prefix))]
+            # Every 1.2.x release lies in [1.2.dev0, 1.3.dev0).
+            upper = list(prefix.release)
+            upper[-1] += 1
+            return [
+                cls(
+                    lambda version: version.startswith(prefix),
+                    lower=VersionOrder(f"{_release_string(prefix.release)}.dev0"),
+                    upper=VersionOrder(f"{_release_string(upper)}.dev0"),
+                )
+            ]
+
+        target = VersionOrder(value)
+        if operator in ("==", "==="):
+            return [
+                cls(
+                    lambda version: version == target,
+                    lower=target,
+                    upper=target,
+                    upper_inclusive=True,
+                )
+            ]
+        if operator == "!=":
+            return [cls(lambda version: version != target)]
+        if operator == ">=":
+            return [cls(lambda version: version >= target, lower=target)]
+        if operator == ">":
+            # >1.0 excludes 1.0.post1 unless 1.0 is itself a post-release,
+            # and 1.0+local, as in PEP 440.
+            post = target._key[3] != -1
+
+            def greater(version):
+                if version <= target or version._key[:5] == target._key[:5]:
+                    return False
+                return post or version._key[:3] != target._key[:3]
+
+            return [cls(greater, lower=target)]
+        if operator == "<=":
+            return [
+                cls(
+                    lambda version: version <= target,
+                    upper=target,
+                    upper_inclusive=True,
+                )
+            ]
+        if operator == "<":
+            if target.is_final:
+                # <2.0 also excludes 2.0's pre-releases, as in PEP 440.
+                target = VersionOrder(
+                    f"{target.epoch}!{_release_string(target.release)}.dev0"
+                )
+            return [cls(lambda version: version < target, upper=target)]
+        if operator == "~=":
+            # ~=1.4.2 means >=1.4.2, ==1.4.*
+            if len(target.release) < 2:
+                raise ValueError(f"~= needs at least two release parts: {text!r}")
+            prefix = _release_string(target.release[:-1])
+            return cls._parse(f">={value}") + cls._parse(f"=={prefix}.*")
+        if operator in ("~", "^"):
+            return [
+                clause
+                for part in poetry_range(operator, value).split(",")
+                for clause in cls._parse(part)
+            ]
+        raise ValueError(f"Unsupported operator in constraint: {text!r}")
+
+
+class VersionSpec:
+    """
+    A version constraint as written in app.toml, e.g. `*`, `1.5.3`,
+    `==1.5.*`, `>=1.2,<2`, `>=1.2 <2`, `~=1.4.2`, `^1.2` or `1.2.3=py310_0`.
+
+    Pre-releases only match when a clause names one, as in PEP 440;
+    VersionIndex falls back to them when no final release matches.
+    """
+
+    def __init__(self, text: Optional[str] = None):
+        self.text = (text or "").strip()
+        self.clauses: List[VersionClause] = []
+        for part in split_clauses(self.text):
+            self.clauses.extend(VersionClause.parse(part))
+
+    @property
+    def prereleases(self) -> bool:
+        """True when a clause names a pre-release, e.g. `>=2.0rc1`."""
+        return any(clause.prerelease for clause in self.clauses)
+
+    def match(self, version) -> bool:
+        if not isinstance(version, VersionOrder):
+            version = VersionOrder(version)
+        return all(clause.predicate(version) for clause in self.clauses)
+
+    @property
+    def upper(self) -> Optional[Tuple[VersionOrder, bool]]:
+        bounds = [
+            (clause.upper, clause.upper_inclusive)
+            for clause in self.clauses
+            if clause.upper is not None
+        ]
+        # The tightest bound: lowest version, exclusive before inclusive.
+        return min(bounds, key=lambda bound: (bound[0], bound[1]), default=None)
+
+    @property
+    def lower(self) -> Optional[VersionOrder]:
+        bounds = [clause.lower for clause in self.clauses if clause.lower is not None]
+        return max(bounds, default=None)
+
+    def __str__(self):
+        return self.text or "*"
+
+
+class VersionIndex:
+    """
+    Pre-sorted versions of one package.
+
+    Sorting happens once; `latest` is O(1) and `latest_matching` bisects to
+    the highest candidate allowed by the spec, so repeated queries stay
+    O(log n). Both skip pre-releases unless the spec names one or there is
+    no final release to pick.
+    """
+
+    def __init__(self, versions: Iterable[str]):
+        parsed = []
+        for version in versions:
+            try:
+                parsed.append(VersionOrder(version))
+            except ValueError:
+                continue
+        parsed.sort()
+        self._versions: List[VersionOrder] = []
+        for version in parsed:
+            if self._versions and self._versions[-1] == version:
+                continue
+            self._versions.append(version)
+
+    def __len__(self):
+        return len(self._versions)
+
+    def latest(self) -> Optional[str]:
+        return self.latest_matching(None)
+
+    def latest_matching(self, spec) -> Optional[str]:
+        if not isinstance(spec, VersionSpec):
+            spec = VersionSpec(spec)
+
+        end = len(self._versions)
+        upper = spec.upper
+        if upper is not None:
+            bound, inclusive = upper
+            search = bisect.bisect_right if inclusive else bisect.bisect_left
+            end = search(self._versions, bound)
+
+        lower = spec.lower
+        prerelease = None
+        for index in range(end - 1, -1, -1):
+            version = self._versions[index]
+            if lower is not None and version < lower:
+                break
+            if spec.match(version):
+                if spec.prereleases or not version.is_prerelease:
+                    return version.original
+                if prerelease is None:
+                    prerelease = version.original
+        return prerelease
+
+    def versions(self) -> List[str]:
+        return [version.original for version in self._versions]
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import os
+import shutil
+import stat
+import tempfile
+import time
+import zipfile
+from typing import IO, Iterator, List, NamedTuple, Optional, Tuple
+
+from termcolor import colored
+
+from .ignore import IgnoreRules
+
+
+class ZipReport(NamedTuple):
+    path: str
+    files: int
+    raw_size: int
+    compressed_size: int
+
+    @property
+    def ratio(self) -> float:
+        return self.compressed_size / self.raw_size if self.raw_size else 1.0
+
+    def print(self) -> None:
+        print(
+            colored(f"Wrote {self.path}:", "blue"),
+            colored(
+                f"{self.files} files, {self.raw_size / 1024 / 1024:.1f} MB raw -> "
+                f"{self.compressed_size / 1024 / 1024:.1f} MB compressed "
+                f"({self.ratio:.0%}).",
+                "magenta",
+            ),
+        )
+
+
+class ReproducibleZip:
+    """
+    Write the same zip, byte for byte, for the same directory contents.
+
+    Entries are added in sorted order with a fixed timestamp and normalised
+    permissions, and compressed with DEFLATE. Caches, tests and pip's
+    RECORD files are left out. The compression level defaults to
+    ``SNOWDEV_ZIP_LEVEL`` (0-9, default 6) and the timestamp to
+    ``SOURCE_DATE_EPOCH`` when set, or 1980-01-01 otherwise.
+    """
+
+    DEFAULT_LEVEL = 6
+    DEFAULT_EXCLUDES = [
+        "__pycache__/",
+        "*.py[co]",
+        "*.dist-info/RECORD",
+        "tests/",
+        "test/",
+    ]
+    EPOCH = (1980, 1, 1, 0, 0, 0)
+    CHUNK_SIZE = 1024 * 1024
+    DEFAULT_SPOOL_MB = 64
+
+    def __init__(
+        self, level: Optional[int] = None, excludes: Optional[List[str]] = None
+    ):
+        if level is None:
+            level = int(os.environ.get("SNOWDEV_ZIP_LEVEL", self.DEFAULT_LEVEL))
+        if not 0 <= level <= 9:
+            raise ValueError(f"Compression level must be between 0 and 9, got {level}")
+        self.level = level
+        self.spool_max = (
+            int(os.environ.get("SNOWDEV_SPOOL_MAX_MB", self.DEFAULT_SPOOL_MB))
+            * 1024
+            * 1024
+        )
+        self.rules = IgnoreRules(
+            self.DEFAULT_EXCLUDES if excludes is None else excludes
+        )
+
+    @classmethod
+    def date_time(cls):
+        epoch = os.environ.get("SOURCE_DATE_EPOCH")
+        if not epoch:
+            return cls.EPOCH
+        return max(cls.EPOCH, time.gmtime(int(epoch))[:6])
+
+    def entries(self, source_dir: str) -> Iterator[Tuple[str, str]]:
+        """Yield `(archive name, local path)` pairs in archive order."""
+        files = self.rules.files(source_dir)
+        for relative_path in sorted(files):
+            yield relative_path, files[relative_path]
+
+    def _set_level(self, info: zipfile.ZipInfo) -> None:
+        # ZipFile.open() takes the level from the entry, not the archive. The
+        # attribute is public as `compress_level` from Python 3.13 on.
+        if hasattr(zipfile.ZipInfo, "compress_level"):
+            info.compress_level = self.level
+        else:
+            info._compresslevel = self.level
+
+    def write_to(self, source_dir: str, fileobj: IO[bytes]) -> Tuple[int, int]:
+        """
+        Stream the zip of `source_dir` into `fileobj`.
+
+        Files are copied in chunks, so memory use does not grow with the size
+        of the largest file. Returns the number of files and their raw size.
+        """
+        date_time = self.date_time()
+        count = raw_size = 0
+        with zipfile.ZipFile(
+            fileobj, "w", zipfile.ZIP_DEFLATED, compresslevel=self.level
+        ) as zipf:
+            for relative_path, absolute_path in self.entries(source_dir):
+                file_stat = os.stat(absolute_path)
+                info = zipfile.ZipInfo(relative_path, date_time=date_time)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                self._set_level(info)
+                info.file_size = file_stat.st_size
+                executable = file_stat.st_mode & stat.S_IXUSR
+                info.external_attr = (0o755 if executable else 0o644) << 16
+                with open(absolute_path, "rb") as src, zipf.open(info, "w") as dst:
+                    shutil.copyfileobj(src, dst, self.CHUNK_SIZE)
+                count += 1
+                raw_size += file_stat.st_size
+        return count, raw_size
+
+    def write(self, source_dir: str, zip_path: str) -> ZipReport:
+        """Zip the contents of `source_dir` into `zip_path`, atomically."""
+        tmp_path = zip_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            count, raw_size = self.write_to(source_dir, f)
+        os.replace(tmp_path, zip_path)
+        return ZipReport(zip_path, count, raw_size, os.path.getsize(zip_path))
+
+    def spool(
+        self, source_dir: str, name: str, max_memory: Optional[int] = None
+    ) -> Tuple[IO[bytes], ZipReport]:
+        """
+        Zip `source_dir` into a buffer that stays in memory up to `max_memory`
+        bytes (``SNOWDEV_SPOOL_MAX_MB``, default 64 MB) and spills to a
+        temporary file beyond that. The buffer is rewound before returning.
+        """
+        if max_memory is not None:
+            self.spool_max = max_memory
+        buffer = tempfile.SpooledTemporaryFile(max_size=self.spool_max)
+        count, raw_size = self.write_to(source_dir, buffer)
+        size = buffer.tell()
+        buffer.seek(0)
+        return buffer, ZipReport(name, count, raw_size, size)
@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path, monkeypatch):
+    """Keep caches written during tests out of ~/.cache/snowdev."""
+    monkeypatch.setenv("SNOWDEV_CACHE_DIR", str(tmp_path / "snowdev-cache"))
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import subprocess
+import zipfile
+from unittest import mock
+
+import pytest
+
+from snowdev.functions.build_cache import BuildCache
+from snowdev.functions.package_zip import SnowPackageZip
+from snowdev.functions.resolver import ResolvedPackage
+
+VENDORED = {"pkg": ResolvedPackage("pkg", "1.0", [], True)}
+
+
+@pytest.fixture
+def fake_pip():
+    calls = []
+
+    def check_call(command):
+        calls.append(command)
+        if "install" in command:
+            target = command[command.index("--target") + 1]
+            os.makedirs(os.path.join(target, "pkg"))
+            with open(os.path.join(target, "pkg", "__init__.py"), "w") as f:
+                f.write("VALUE = 1\n")
+
+    with mock.patch(
+        "snowdev.functions.build_cache.subprocess.check_call", side_effect=check_call
+    ):
+        yield calls
+
+
+def pip_command(command):
+    return command[3]
+
+
+def has_option(command, flag, value):
+    return any(
+        command[i] == flag and command[i + 1] == value for i in range(len(command) - 1)
+    )
+
+
+def test_builds_for_target_runtime_and_reuses_until_ttl(tmpdir, fake_pip):
+    build_cache = BuildCache(
+        root=str(tmpdir.join("builds")),
+        ttl=3600,
+        python_version="3.11",
+        platform="manylinux2014_x86_64, manylinux_2_28_x86_64",
+    )
+
+    build_dir, reused = build_cache.environment("pkg", ["pkg==1.0"])
+
+    assert not reused
+    assert [pip_command(command) for command in fake_pip] == ["download", "install"]
+    install = fake_pip[-1]
+    assert has_option(install, "--python-version", "3.11")
+    assert has_option(install, "--platform", "manylinux2014_x86_64")
+    assert has_option(install, "--platform", "manylinux_2_28_x86_64")
+    assert has_option(install, "--target", BuildCache.site_packages(build_dir))
+    assert has_option(install, "--find-links", build_cache.wheelhouse)
+    assert "--only-binary=:all:" in install
+    assert "--no-index" in install
+
+    fake_pip.clear()
+    assert build_cache.environment("pkg", ["pkg==1.0"]) == (build_dir, True)
+    assert fake_pip == []
+
+    other = BuildCache(root=build_cache.root, ttl=3600, python_version="3.10")
+    assert other.build_dir("pkg", ["pkg==1.0"]) != build_dir
+
+
+def test_falls_back_to_local_wheels_then_cached_wheels(tmpdir, fake_pip):
+    build_cache = BuildCache(root=str(tmpdir.join("builds")), ttl=3600)
+
+    def check_call(command):
+        fake_pip.append(command)
+        if pip_command(command) in ("download", "wheel"):
+            raise subprocess.CalledProcessError(1, command)
+
+    with mock.patch(
+        "snowdev.functions.build_cache.subprocess.check_call", side_effect=check_call
+    ):
+        build_dir, reused = build_cache.environment("pkg", ["pkg"])
+
+    assert not reused
+    assert [pip_command(command) for command in fake_pip] == [
+        "download",
+        "wheel",
+        "install",
+    ]
+    assert fake_pip[-1][-1] == "pkg"
+
+
+@pytest.fixture
+def package_zip(tmpdir, monkeypatch):
+    monkeypatch.setenv("SNOWDEV_CACHE_DIR", str(tmpdir.join("cache")))
+    monkeypatch.chdir(tmpdir)
+    session = mock.MagicMock()
+    session.get_current_database.return_value = "DB"
+    session.get_current_schema.return_value = "SCHEMA"
+    return SnowPackageZip(session, "SNOWDEV")
+
+
+def test_unchanged_rebuild_reuses_install(tmpdir, fake_pip, package_zip, capsys):
+    package_zip.zip_and_upload_vendored("pkg", VENDORED, upload=False)
+    zip_path = tmpdir.join("static", "packages", "pkg.zip")
+    with zipfile.ZipFile(str(zip_path)) as zipf:
+        assert zipf.namelist() == ["pkg/__init__.py"]
+    first = zip_path.read_binary()
+
+    zip_path.remove()
+    fake_pip.clear()
+    package_zip.zip_and_upload_vendored("pkg", VENDORED, upload=False)
+    assert zip_path.read_binary() == first
+    assert fake_pip == []
+    assert "Peak disk:" in capsys.readouterr().out
+
+
+def test_upload_streams_zip_without_local_copy(tmpdir, fake_pip, package_zip):
+    session = package_zip.session
+    uploaded = {}
+
+    def put_stream(stream, target, **kwargs):
+        uploaded[target] = stream.read()
+
+    session.file.put_stream.side_effect = put_stream
+    session.sql.return_value.collect.return_value = []
+
+    package_zip.zip_and_upload_vendored("pkg", VENDORED, upload=True)
+
+    assert list(uploaded) == ["@DB.SCHEMA.SNOWDEV/static/packages/pkg.zip"]
+    assert not tmpdir.join("static").exists()
+    session.file.put.assert_not_called()
+
+    digest = hashlib.md5(uploaded["@DB.SCHEMA.SNOWDEV/static/packages/pkg.zip"])
+    session.sql.return_value.collect.return_value = [
+        {
+            "name": "snowdev/static/packages/pkg.zip",
+            "size": 1,
+            "md5": digest.hexdigest(),
+        }
+    ]
+    session.file.put_stream.reset_mock()
+    package_zip.zip_and_upload_vendored("pkg", VENDORED, upload=True)
+    session.file.put_stream.assert_not_called()
+
+
+def test_no_deps_installs_only_pinned_requirements(tmpdir, fake_pip):
+    build_cache = BuildCache(root=str(tmpdir.join("builds")))
+
+    build_dir, _ = build_cache.environment("pkg", ["pkg==1.0"], no_deps=True)
+
+    assert build_dir != build_cache.build_dir("pkg", ["pkg==1.0"])
+    assert all("--no-deps" in command for command in fake_pip)
@@ -0,0 +1,135 @@
+from unittest import mock
+
+import pytest
+
+from snowdev import SnowflakeRegister
+from snowdev.functions.catalog import SchemaCatalog, parse_signature
+
+
+@pytest.fixture(autouse=True)
+def clear_catalogs():
+    SchemaCatalog.clear()
+    yield
+    SchemaCatalog.clear()
+
+
+def make_session(functions=(), procedures=()):
+    rows = {"USER FUNCTIONS": list(functions), "PROCEDURES": list(procedures)}
+    session = mock.MagicMock()
+    session.get_current_account.return_value = "ACCOUNT"
+    session.get_current_role.return_value = "DEPLOYER"
+    session.get_current_database.return_value = '"DB"'
+    session.get_current_schema.return_value = '"SCHEMA"'
+
+    def sql(query):
+        kind = "USER FUNCTIONS" if "USER FUNCTIONS" in query else "PROCEDURES"
+        result = mock.MagicMock()
+        if query.startswith("SHOW"):
+            matching = rows[kind]
+            if " LIKE '" in query:
+                name = query.split("LIKE '")[1].split("'")[0].upper()
+                matching = [row for row in matching if row["name"] == name]
+            result.collect.return_value = matching
+        else:
+            result.collect.return_value = []
+        return result
+
+    session.sql.side_effect = sql
+    return session, rows
+
+
+def row(name, arguments):
+    return {"name": name, "arguments": arguments}
+
+
+def test_parse_signature():
+    signature = parse_signature(
+        "MY_FUNC(VARCHAR, NUMBER(38,0) [, FLOAT]) RETURN TABLE (A VARCHAR)"
+    )
+
+    assert signature.name == "MY_FUNC"
+    assert signature.arg_types == ["VARCHAR", "NUMBER(38,0)", "FLOAT"]
+    assert signature.arguments == "VARCHAR, NUMBER(38,0), FLOAT"
+    assert signature.return_type == "TABLE (A VARCHAR)"
+    assert parse_signature("NOARGS() RETURN VARCHAR").arg_types == []
+
+
+def test_lookups_share_one_show_per_kind():
+    session, _ = make_session(
+        functions=[
+            row("GET_SENTIMENT", "GET_SENTIMENT(VARCHAR) RETURN FLOAT"),
+            row("ADD", "ADD(NUMBER, NUMBER) RETURN NUMBER"),
+        ],
+        procedures=[row("LOAD", "LOAD(VARCHAR, BOOLEAN) RETURN VARCHAR")],
+    )
+
+    register = SnowflakeRegister(session)
+    assert register.function_exists("get_sentiment")
+    assert register.get_function_signature("add") == "NUMBER, NUMBER"
+    assert not register.function_exists("missing")
+    assert register.get_sproc_signature("load") == "VARCHAR, BOOLEAN"
+    assert SnowflakeRegister(session).sproc_exists("load")
+
+    queries = [call.args[0] for call in session.sql.call_args_list]
+    assert queries == [
+        "SHOW USER FUNCTIONS IN SCHEMA",
+        "SHOW PROCEDURES IN SCHEMA",
+    ]
+
+
+def test_drop_and_register_invalidate_only_that_name():
+    session, rows = make_session(
+        functions=[
+            row("TEMP_ADD", "TEMP_ADD(NUMBER, NUMBER) RETURN NUMBER"),
+            row("OTHER", "OTHER(VARCHAR) RETURN VARCHAR"),
+        ]
+    )
+    register = SnowflakeRegister(session)
+    assert register.get_function_signature("temp_add") == "NUMBER, NUMBER"
+
+    rows["USER FUNCTIONS"].pop(0)
+    register.drop_function("temp_add", "NUMBER, NUMBER")
+    assert not register.function_exists("temp_add")
+    assert register.function_exists("other")
+
+    with mock.patch.object(SnowflakeRegister, "register_udf"):
+        rows["USER FUNCTIONS"].append(row("NEW", "NEW(FLOAT) RETURN FLOAT"))
+        register._register_entity("app.py", "new", "stage", [], None, False)
+    assert register.get_function_signature("new") == "FLOAT"
+
+    queries = [call.args[0] for call in session.sql.call_args_list]
+    assert queries == [
+        "SHOW USER FUNCTIONS IN SCHEMA",
+        "DROP FUNCTION temp_add(NUMBER, NUMBER)",
+        "SHOW USER FUNCTIONS LIKE 'TEMP_ADD' IN SCHEMA",
+        "SHOW USER FUNCTIONS LIKE 'NEW' IN SCHEMA",
+    ]
+
+
+def test_catalogs_are_per_schema():
+    session, _ = make_session()
+    first = SchemaCatalog.for_session(session)
+    assert SchemaCatalog.for_session(session) is first
+
+    session.get_current_schema.return_value = "OTHER"
+    assert SchemaCatalog.for_session(session) is not first
+
+
+def test_catalogs_are_per_role_and_hold_no_session():
+    session, _ = make_session(functions=[row("ADD", "ADD(NUMBER) RETURN NUMBER")])
+    other, _ = make_session()
+    other.get_current_role.return_value = "ANALYST"
+    first = SchemaCatalog.for_session(session)
+    assert SchemaCatalog.for_session(other) is not first
+
+    assert first.exists(session, "FUNCTION", "add")
+    assert not SchemaCatalog.for_session(other).exists(other, "FUNCTION", "add")
+    assert not hasattr(first, "session")
+
+    # Registering under one role refreshes the name for every role.
+    SnowflakeRegister(session).drop_function("add", "NUMBER")
+    queries = [call.args[0] for call in other.sql.call_args_list]
+    assert not SchemaCatalog.for_session(other).exists(other, "FUNCTION", "add")
+    assert [call.args[0] for call in other.sql.call_args_list] == queries + [
+        "SHOW USER FUNCTIONS LIKE 'ADD' IN SCHEMA"
+    ]
@@ -0,0 +1,76 @@
+from unittest.mock import patch
+
+import pytest
+
+from snowdev import SnowHelper
+from snowdev.functions.channel_cache import ChannelCache
+
+
+@pytest.fixture(autouse=True)
+def clear_version_indexes():
+    with patch.dict(SnowHelper._version_indexes, clear=True):
+        yield
+
+
+@pytest.fixture
+def channel_cache(tmpdir):
+    cache = ChannelCache(path=str(tmpdir.join("channel.json")), ttl=3600)
+    with patch.object(SnowHelper, "_channel_cache", cache):
+        yield cache
+
+
+def test_cache_round_trip(channel_cache):
+    channel_cache.set("Pandas", ["1.5.3", "2.0.3"])
+
+    reloaded = ChannelCache(path=channel_cache.path, ttl=3600)
+    assert reloaded.get("pandas") == ["1.5.3", "2.0.3"]
+
+
+def test_cache_expires_after_ttl(channel_cache):
+    channel_cache.set("pandas", ["1.5.3"])
+
+    with patch("snowdev.functions.channel_cache.time.time", return_value=1e12):
+        assert channel_cache.get("pandas") is None
+
+
+def test_invalidate(channel_cache):
+    channel_cache.set("pandas", ["1.5.3"])
+    channel_cache.set("numpy", ["1.24.3"])
+
+    channel_cache.invalidate("pandas")
+    assert channel_cache.get("pandas") is None
+    assert channel_cache.get("numpy") == ["1.24.3"]
+
+    channel_cache.invalidate()
+    assert channel_cache.get("numpy") is None
+
+
+def test_repeat_lookups_skip_conda(channel_cache):
+    with patch.object(
+        SnowHelper, "_conda_search_versions", return_value=["1.5.3", "2.0.3"]
+    ) as mock_search:
+        assert SnowHelper.search_package_in_snowflake_channel("pandas") == "2.0.3"
+        assert SnowHelper.is_package_available_in_snowflake_channel("pandas")
+        assert SnowHelper.get_available_versions_from_snowflake_channel("pandas") == [
+            "1.5.3",
+            "2.0.3",
+        ]
+
+    mock_search.assert_called_once_with("pandas")
+
+
+def test_missing_package_is_cached(channel_cache):
+    with patch.object(
+        SnowHelper, "_conda_search_versions", return_value=[]
+    ) as mock_search:
+        assert not SnowHelper.is_package_available_in_snowflake_channel("nopkg")
+        assert not SnowHelper.is_package_available_in_snowflake_channel("nopkg")
+
+    mock_search.assert_called_once_with("nopkg")
+
+
+def test_failed_lookup_is_not_cached(channel_cache):
+    with patch.object(SnowHelper, "_conda_search_versions", return_value=None):
+        assert SnowHelper.search_package_in_snowflake_channel("pandas") is None
+
+    assert channel_cache.get("pandas") is None
@@ -0,0 +1,76 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from snowdev import SnowHelper
+from snowdev.functions.channel_index import ChannelIndex
+
+REPODATA = {
+    "packages": {
+        "pandas-1.5.3-py310_0.tar.bz2": {"name": "pandas", "version": "1.5.3"},
+        "pandas-1.5.3-py39_0.tar.bz2": {"name": "pandas", "version": "1.5.3"},
+        "numpy-1.24.3-py310_0.tar.bz2": {"name": "numpy", "version": "1.24.3"},
+    },
+    "packages.conda": {
+        "pandas-2.0.3-py310_0.conda": {"name": "pandas", "version": "2.0.3"},
+    },
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_version_indexes():
+    with patch.dict(SnowHelper._version_indexes, clear=True):
+        yield
+
+
+@pytest.fixture
+def repodata_file(tmpdir):
+    path = tmpdir.join("repodata.json")
+    path.write(json.dumps(REPODATA))
+    return str(path)
+
+
+def test_index_from_local_repodata(repodata_file):
+    index = ChannelIndex.from_files([repodata_file])
+
+    assert index.versions("pandas") == ["1.5.3", "2.0.3"]
+    assert index.versions("Numpy") == ["1.24.3"]
+    assert "missing" not in index
+
+
+def test_resolve_packages_in_index_mode(repodata_file, monkeypatch):
+    monkeypatch.setenv("SNOWDEV_CHANNEL_MODE", "index")
+    monkeypatch.setenv("SNOWDEV_REPODATA", repodata_file)
+
+    with patch.object(SnowHelper, "_channel_index", None), patch.object(
+        SnowHelper, "_conda_search_versions"
+    ) as mock_search:
+        resolved = SnowHelper.resolve_packages(["pandas", "numpy", "missing"])
+
+    assert resolved == {"pandas": "2.0.3", "numpy": "1.24.3", "missing": None}
+    mock_search.assert_not_called()
+
+
+def test_load_falls_back_to_cached_copy_offline(tmpdir):
+    for subdir in ChannelIndex.SUBDIRS:
+        tmpdir.join(f"repodata-{subdir}.json").write(json.dumps(REPODATA))
+
+    with patch.object(ChannelIndex, "_download", side_effect=OSError("offline")):
+        index = ChannelIndex.load("https://example.com/", str(tmpdir), ttl=0)
+
+    assert index.versions("pandas") == ["1.5.3", "2.0.3"]
+
+
+def test_load_downloads_once_within_ttl(tmpdir):
+    def fake_download(url, path):
+        with open(path, "w") as f:
+            json.dump(REPODATA, f)
+
+    with patch.object(
+        ChannelIndex, "_download", side_effect=fake_download
+    ) as mock_download:
+        ChannelIndex.load("https://example.com/", str(tmpdir), ttl=3600)
+        ChannelIndex.load("https://example.com/", str(tmpdir), ttl=3600)
+
+    assert mock_download.call_count == len(ChannelIndex.SUBDIRS)
@@ -0,0 +1,70 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+HEAVY_MODULES = [
+    "langchain",
+    "chromadb",
+    "openai",
+    "snowflake.snowpark",
+    "snowflake.ml",
+]
+# Seconds `snowdev --help` may take; override on slow CI machines.
+STARTUP_BUDGET = float(os.environ.get("SNOWDEV_CLI_STARTUP_BUDGET", "1.5"))
+
+
+def _run(code):
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_cli_import_does_not_load_heavy_modules():
+    result = _run(
+        "import json, sys\n"
+        "import snowdev, snowdev.cli.main, snowdev.deployment\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    assert json.loads(result.stdout) == []
+
+
+def test_cli_help_startup_time():
+    # Take the best of a few runs to keep noise from failing the benchmark.
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-m", "snowdev.cli.main", "--help"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+        )
+        timings.append(time.perf_counter() - start)
+        assert result.returncode == 0, result.stderr
+    assert min(timings) < STARTUP_BUDGET, f"snowdev --help took {min(timings):.2f}s"
+
+
+def test_public_names_resolve_lazily():
+    result = _run(
+        "import sys, snowdev\n"
+        "from snowdev import SnowHelper, DeployManifest\n"
+        "print('snowdev.functions.bot' in sys.modules)"
+    )
+    assert result.stdout.strip() == "False"
+
+
+def test_deployment_import_loads_no_subsystems():
+    result = _run(
+        "import json, sys\n"
+        "import snowdev.deployment\n"
+        "print(json.dumps(sorted(m for m in sys.modules"
+        " if m.startswith('snowdev.functions'))))"
+    )
+    assert json.loads(result.stdout) == []
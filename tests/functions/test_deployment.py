@@ -0,0 +1,110 @@
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+from click.testing import CliRunner
+
+from snowdev.cli.commands import cli
+from snowdev.functions.connect import SessionPool, SnowflakeConnection
+from snowdev.deployment import DeploymentArguments, DeploymentManager
+
+
+@pytest.fixture
+def project(tmpdir):
+    try:
+        previous_dir = os.getcwd()
+    except FileNotFoundError:
+        # An earlier test may have left us in a deleted directory.
+        previous_dir = None
+    os.chdir(str(tmpdir))
+    for component_type, name, filename in [
+        ("udf", "udf_a", "app.py"),
+        ("udf", "udf_b", "app.py"),
+        ("sproc", "sproc_a", "app.py"),
+        ("streamlit", "app_a", "streamlit_app.py"),
+        ("task", "task_a", "app.sql"),
+        ("udf", "not_a_component", "README.md"),
+    ]:
+        os.makedirs(os.path.join("src", component_type, name))
+        open(os.path.join("src", component_type, name, filename), "w").close()
+    yield tmpdir
+    if previous_dir:
+        os.chdir(previous_dir)
+
+
+@pytest.fixture
+def mock_connection(monkeypatch):
+    for name in ["ACCOUNT", "USER_NAME", "PASSWORD", "WAREHOUSE", "DATABASE"]:
+        monkeypatch.setenv(name, "test")
+    monkeypatch.setenv("SCHEMA", "test")
+    monkeypatch.setenv("ROLE", "test")
+    pool = SessionPool(max_size=2)
+    with patch.object(SnowflakeConnection, "pool", pool), patch.object(
+        SessionPool, "_create", side_effect=lambda params: MagicMock()
+    ) as mock_create:
+        yield mock_create
+
+
+def test_discover_components(project):
+    assert DeploymentManager.discover_components() == [
+        ("udf", "udf_a"),
+        ("udf", "udf_b"),
+        ("sproc", "sproc_a"),
+        ("streamlit", "app_a"),
+        ("task", "task_a"),
+    ]
+
+
+def test_deploy_all_reports_failures(project, mock_connection):
+    deployed = []
+
+    def fake_deploy(self, component_type, name):
+        deployed.append((component_type, name))
+        if name == "udf_b":
+            raise Exception("boom")
+        return True
+
+    manager = DeploymentManager(
+        DeploymentArguments(all=True, workers=2), session=MagicMock()
+    )
+    with patch.object(DeploymentManager, "deploy_component", fake_deploy):
+        assert manager.main() is False
+
+    assert sorted(deployed) == sorted(DeploymentManager.discover_components())
+    # Tasks are only deployed once the functions are done.
+    assert deployed[-1] == ("task", "task_a")
+    # Sessions are reused across components, at most one per worker.
+    assert mock_connection.call_count <= 2
+
+
+def test_deploy_all_success(project, mock_connection):
+    manager = DeploymentManager(DeploymentArguments(all=True), session=MagicMock())
+    with patch.object(DeploymentManager, "deploy_component", return_value=True):
+        assert manager.deploy_all(max_workers=3) is True
+
+
+def test_task_cycle_is_reported_as_a_failed_step(project, mock_connection, capsys):
+    project.join("src", "task", "task_a", "app.sql").write(
+        "CREATE TASK task_a AFTER task_b AS SELECT 1"
+    )
+    project.join("src", "task").mkdir("task_b").join("app.sql").write(
+        "CREATE TASK task_b AFTER task_a AS SELECT 1"
+    )
+    manager = DeploymentManager(DeploymentArguments(all=True), session=MagicMock())
+    with patch.object(DeploymentManager, "deploy_component", return_value=True):
+        assert manager.deploy_all(max_workers=2) is False
+        assert manager.deploy_task_graph() is False
+
+    out = capsys.readouterr().out
+    assert "task graph (0.0s): Task dependency cycle between TASK_A, TASK_B." in out
+    assert "4 succeeded, 1 failed." in out
+
+
+def test_deploy_all_cli_exit_code():
+    with patch("snowdev.deployment.DeploymentManager") as MockManager:
+        MockManager.return_value.main.return_value = False
+        result = CliRunner().invoke(cli, ["deploy", "--all", "--workers", "4"])
+
+    assert result.exit_code == 1
+    args = MockManager.call_args[0][0]
+    assert args.all and args.workers == 4
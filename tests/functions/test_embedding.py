@@ -0,0 +1,164 @@
+import threading
+
+import pytest
+
+from snowdev.functions.utils.embedding import (
+    BatchedEmbeddings,
+    BatchEmbedder,
+    HashingEmbeddings,
+    get_embeddings,
+)
+
+
+class RateLimitError(Exception):
+    pass
+
+
+class LocalEmbed:
+    """A stand-in embedding endpoint: one vector per text, from its length."""
+
+    def __init__(self, fail=None):
+        self.batches = []
+        self.fail = fail or (lambda batch: None)
+        self.in_flight = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            self.fail(texts)
+            with self.lock:
+                self.batches.append(list(texts))
+            return [[float(len(text))] for text in texts]
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def words(text):
+    return len(text.split())
+
+
+def test_batches_respect_token_budget():
+    embedder = BatchEmbedder(LocalEmbed(), max_tokens=4, count_tokens=words)
+
+    assert embedder.batches(["a b", "c", "d e", "f g h i j", "k"]) == [
+        ["a b", "c"],
+        ["d e"],
+        ["f g h i j"],
+        ["k"],
+    ]
+
+
+def test_embed_texts_keeps_order_and_bounds_concurrency():
+    embed = LocalEmbed()
+    embedder = BatchEmbedder(embed, max_tokens=1, max_workers=2, count_tokens=words)
+    texts = [f"text {i}" * (i + 1) for i in range(10)] + ["text 0"]
+
+    vectors = embedder.embed_texts(texts)
+
+    assert vectors == [[float(len(text))] for text in texts]
+    assert len(embed.batches) == 10
+    assert embed.peak <= 2
+
+
+def test_rate_limits_are_retried_with_backoff():
+    attempts = []
+
+    def fail(batch):
+        attempts.append(batch)
+        if len(attempts) < 3:
+            raise RateLimitError("slow down")
+
+    delays = []
+    embedder = BatchEmbedder(LocalEmbed(fail), count_tokens=words, sleep=delays.append)
+
+    assert embedder.embed_texts(["a"]) == [[1.0]]
+    assert len(delays) == 2 and delays[0] < delays[1]
+
+    def broken(batch):
+        raise ValueError("bad input")
+
+    with pytest.raises(ValueError, match="bad input"):
+        BatchEmbedder(
+            LocalEmbed(broken), count_tokens=words, sleep=delays.append
+        ).embed_texts(["b"])
+    assert len(delays) == 2
+
+
+def test_interrupted_run_resumes_from_checkpoint(tmpdir):
+    checkpoint = str(tmpdir.join("embed.checkpoint.jsonl"))
+
+    def fail(batch):
+        if batch == ["c"]:
+            raise KeyboardInterrupt
+
+    first = LocalEmbed(fail)
+    with pytest.raises(KeyboardInterrupt):
+        BatchEmbedder(
+            first,
+            max_tokens=1,
+            max_workers=1,
+            checkpoint=checkpoint,
+            count_tokens=words,
+        ).embed_texts(["a", "b", "c"])
+    assert first.batches == [["a"], ["b"]]
+
+    second = LocalEmbed()
+    embedder = BatchEmbedder(
+        second, max_tokens=1, checkpoint=checkpoint, count_tokens=words
+    )
+    assert embedder.embed_texts(["a", "b", "c"]) == [[1.0], [1.0], [1.0]]
+    assert second.batches == [["c"]]
+
+    embedder.checkpoint.clear()
+    assert not tmpdir.join("embed.checkpoint.jsonl").exists()
+
+
+def test_hashing_embeddings_are_deterministic_and_normalized():
+    local = HashingEmbeddings(dimensions=64)
+    udf, reordered, chart = local.embed_documents(
+        ["Create a Snowpark UDF", "snowpark udf create", "streamlit chart"]
+    )
+
+    def dot(a, b):
+        return sum(x * y for x, y in zip(a, b))
+
+    assert local.embed_query("Create a Snowpark UDF") == udf
+    assert len(udf) == 64
+    assert dot(udf, udf) == pytest.approx(1.0)
+    assert dot(udf, reordered) > dot(udf, chart)
+    assert local.embed_query("") == [0.0] * 64
+
+
+def test_batches_are_capped_at_the_request_limit(monkeypatch):
+    monkeypatch.setattr(BatchEmbedder, "MAX_BATCH_TEXTS", 2)
+    embedder = BatchEmbedder(LocalEmbed(), max_tokens=100, count_tokens=words)
+
+    assert embedder.batches(["a", "b", "c"]) == [["a", "b"], ["c"]]
+
+
+def test_openai_client_leaves_retries_and_batching_to_batch_embedder():
+    openai = get_embeddings("openai", "sk-test")
+
+    assert openai.max_retries == 0
+    assert openai.chunk_size >= BatchEmbedder.MAX_BATCH_TEXTS
+
+
+def test_queries_are_retried_too():
+    attempts = []
+
+    class Flaky(HashingEmbeddings):
+        def embed_query(self, text):
+            attempts.append(text)
+            if len(attempts) == 1:
+                raise RateLimitError("slow down")
+            return super().embed_query(text)
+
+    embeddings = BatchedEmbeddings(Flaky(dimensions=4), sleep=lambda delay: None)
+
+    assert len(embeddings.embed_query("udf")) == 4
+    assert attempts == ["udf", "udf"]
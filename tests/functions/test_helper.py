@@ -0,0 +1,110 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from snowdev import SnowHelper
+from snowdev.functions.versions import VersionSpec
+
+
+@pytest.fixture(autouse=True)
+def clear_version_indexes():
+    with patch.dict(SnowHelper._version_indexes, clear=True):
+        yield
+
+
+def test_resolve_packages_runs_concurrently_in_order(monkeypatch):
+    monkeypatch.setenv("SNOWDEV_CHANNEL_MODE", "conda")
+    delays = {"pandas": 0.3, "numpy": 0.1, "missing": 0.2, "other": 0.05}
+    versions = {"pandas": ["2.0.3"], "numpy": ["1.24.3"], "missing": [], "other": []}
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def fake_versions(package_name):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(delays[package_name])
+        with lock:
+            active[0] -= 1
+        return versions[package_name]
+
+    with patch.object(SnowHelper, "get_channel_versions", side_effect=fake_versions):
+        start = time.monotonic()
+        resolved = SnowHelper.resolve_packages(
+            ["pandas", "numpy", "missing", "other"], max_workers=4
+        )
+        elapsed = time.monotonic() - start
+
+    assert list(resolved) == ["pandas", "numpy", "missing", "other"]
+    assert resolved == {
+        "pandas": "2.0.3",
+        "numpy": "1.24.3",
+        "missing": None,
+        "other": None,
+    }
+    assert peak[0] > 1
+    assert elapsed < sum(delays.values())
+
+
+def test_get_unavailable_packages_reports_all(monkeypatch):
+    monkeypatch.setenv("SNOWDEV_CHANNEL_MODE", "conda")
+    available = {"pandas": ["2.0.3"]}
+
+    with patch.object(
+        SnowHelper,
+        "get_channel_versions",
+        side_effect=lambda name: available.get(name, []),
+    ):
+        unavailable = SnowHelper.get_unavailable_packages(
+            ["zeta", "pandas", "alpha"], max_workers=2
+        )
+
+    assert unavailable == ["zeta", "alpha"]
+
+
+def test_max_workers_from_env(monkeypatch):
+    monkeypatch.setenv("SNOWDEV_MAX_WORKERS", "3")
+    assert SnowHelper.get_max_workers() == 3
+    assert SnowHelper.get_max_workers(0) == 1
+
+
+def test_resolve_packages_honours_constraints(monkeypatch):
+    monkeypatch.setenv("SNOWDEV_CHANNEL_MODE", "conda")
+    versions = {"pandas": ["1.5.3", "2.0.3", "2.1.0rc1"]}
+
+    with patch.object(
+        SnowHelper,
+        "get_channel_versions",
+        side_effect=lambda name: versions.get(name, []),
+    ):
+        resolved = SnowHelper.resolve_packages(
+            ["pandas", "pandas==1.5.*", "pandas>=3"], max_workers=1
+        )
+
+    assert resolved == {
+        "pandas": "2.0.3",
+        "pandas==1.5.*": "1.5.3",
+        "pandas>=3": None,
+    }
+
+
+def test_format_requirement():
+    assert SnowHelper.format_requirement("pandas", "*") == "pandas"
+    assert SnowHelper.format_requirement("pandas", "1.5.3") == "pandas==1.5.3"
+    assert SnowHelper.format_requirement("pandas", ">=1.5") == "pandas>=1.5"
+    assert SnowHelper.format_requirement("pandas", ">=1.2, <2") == "pandas>=1.2,<2"
+    assert SnowHelper.format_requirement("pandas", ">=1.2 <2") == "pandas>=1.2,<2"
+    assert SnowHelper.format_requirement("pandas", "~=1.4") == "pandas~=1.4"
+
+
+def test_format_requirement_expands_poetry_ranges():
+    assert SnowHelper.format_requirement("pandas", "^1.2") == "pandas>=1.2,<2"
+    assert SnowHelper.format_requirement("pandas", "^0.2.3") == "pandas>=0.2.3,<0.3"
+    assert SnowHelper.format_requirement("pandas", "~1.2") == "pandas>=1.2,<1.3"
+    assert SnowHelper.format_requirement("pandas", "~1.4.2") == "pandas>=1.4.2,<1.5"
+    assert SnowHelper.format_requirement("pandas", "~1") == "pandas>=1,<2"
+
+    spec = VersionSpec(SnowHelper.format_requirement("pandas", "^1.2")[len("pandas") :])
+    assert spec.match("1.5.3") and not spec.match("2.0.0rc1")
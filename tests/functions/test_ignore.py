@@ -0,0 +1,57 @@
+from snowdev.functions.ignore import IgnoreRules
+
+
+def make_app(tmpdir):
+    app = tmpdir.mkdir("app")
+    app.join("streamlit_app.py").write("")
+    app.join("environment.yml").write("")
+    app.join("notes.md").write("")
+    app.mkdir("pages").join("1_chart.py").write("")
+    app.mkdir("assets").mkdir("img").join("logo.png").write("")
+    app.mkdir("__pycache__").join("streamlit_app.cpython-39.pyc").write("")
+    app.join("stale.pyc").write("")
+    app.mkdir("data").join("big.csv").write("")
+    app.join(".DS_Store").write("")
+    return app
+
+
+def test_defaults_skip_junk_and_keep_layout(tmpdir):
+    app = make_app(tmpdir)
+
+    files = IgnoreRules.for_directory(str(app)).files(str(app))
+
+    assert list(files) == [
+        "environment.yml",
+        "notes.md",
+        "streamlit_app.py",
+        "assets/img/logo.png",
+        "data/big.csv",
+        "pages/1_chart.py",
+    ]
+    assert files["pages/1_chart.py"] == str(app.join("pages", "1_chart.py"))
+
+
+def test_snowdevignore_rules(tmpdir):
+    app = make_app(tmpdir)
+    app.join(".snowdevignore").write(
+        "# local only\n" "data/\n" "*.md\n" "!stale.pyc\n" "/assets/img/*.png\n"
+    )
+
+    files = IgnoreRules.for_directory(str(app)).files(str(app))
+
+    assert list(files) == [
+        "environment.yml",
+        "stale.pyc",
+        "streamlit_app.py",
+        "pages/1_chart.py",
+    ]
+
+
+def test_directory_only_and_anchored_patterns():
+    rules = IgnoreRules(["build/", "/top.txt", "**/cache"])
+
+    assert rules.is_ignored("build", is_dir=True)
+    assert not rules.is_ignored("build")
+    assert rules.is_ignored("top.txt")
+    assert not rules.is_ignored("sub/top.txt")
+    assert rules.is_ignored("a/b/cache")
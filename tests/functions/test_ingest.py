@@ -0,0 +1,155 @@
+import json
+import os
+
+import pytest
+from langchain.embeddings.fake import FakeEmbeddings
+
+from snowdev.functions.utils import embedding, ingest
+from snowdev.functions.utils.ingest import Config, DocumentProcessor, Secrets
+
+
+class CountingEmbeddings(FakeEmbeddings):
+    calls: list = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def processor(tmpdir, monkeypatch):
+    monkeypatch.chdir(str(tmpdir))
+    monkeypatch.setenv("ANONYMIZED_TELEMETRY", "False")
+    embeddings = CountingEmbeddings(size=8, calls=[])
+    monkeypatch.setattr(ingest, "get_embeddings", lambda backend, key: embeddings)
+    # Estimate token counts instead of downloading the tiktoken encoding.
+    monkeypatch.setattr(embedding.TokenCounter, "_load", lambda self: None)
+    tmpdir.mkdir("knowledge").join("guide.md").write("snowpark guide")
+    tmpdir.mkdir("src").mkdir("udf").mkdir("add")
+    write("src/udf/add/app.py", "def add():\n    return 1\n\n\nthird = 3\n")
+
+    def make(backend="openai"):
+        return DocumentProcessor(
+            Secrets(OPENAI_API_KEY="x"),
+            Config(
+                docs_dir="knowledge",
+                chunk_size=20,
+                chunk_overlap=0,
+                embedding_backend=backend,
+            ),
+        )
+
+    return make, embeddings
+
+
+def write(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def stored(processor):
+    return processor._vector_store().get()
+
+
+def test_only_changed_chunks_are_embedded(processor):
+    make, embeddings = processor
+    first = make()
+    first.process()
+    assert sorted(sum(embeddings.calls, [])) == [
+        "def add():\n    return 1",
+        "snowpark guide",
+        "third = 3",
+    ]
+    ids = set(stored(first)["ids"])
+    assert "src/udf/add/app.py#" + first._create_checksum("third = 3")[:16] in ids
+
+    # Touching a file re-hashes it, but nothing is embedded.
+    embeddings.calls.clear()
+    os.utime("knowledge/guide.md", ns=(1, 1))
+    assert make().process() == {}
+    assert embeddings.calls == []
+
+    # Editing one chunk embeds it alone and drops the chunk it replaced.
+    write("src/udf/add/app.py", "def add():\n    return 1\n\n\nfourth = 4\n")
+    second = make()
+    second.process()
+    assert embeddings.calls == [["fourth = 4"]]
+    docs = stored(second)
+    assert sorted(docs["documents"]) == [
+        "def add():\n    return 1",
+        "fourth = 4",
+        "snowpark guide",
+    ]
+    assert len(docs["ids"]) == 3
+    metadata = docs["metadatas"][docs["documents"].index("fourth = 4")]
+    assert metadata["source"] == "src/udf/add/app.py"
+    assert "user-defined function" in metadata["prompt"]
+
+
+def test_deleted_file_chunks_are_removed(processor):
+    make, embeddings = processor
+    make().process()
+
+    os.remove("src/udf/add/app.py")
+    third = make()
+    third.process()
+
+    assert stored(third)["documents"] == ["snowpark guide"]
+    with open("checksums.json") as f:
+        assert list(json.load(f)["files"]) == ["knowledge/guide.md"]
+
+
+def test_legacy_checksums_are_migrated(processor):
+    make, _ = processor
+    write("checksums.json", json.dumps({"src/task/t/app.sql": "abc", "a.py": "x"}))
+
+    migrated = make()
+
+    assert migrated.files == {}
+    assert migrated.checksum_dict == {"src/task/t/app.sql": "abc"}
+
+
+def test_backends_have_own_collection_and_reuse_indexed_vectors(processor, monkeypatch):
+    make, _ = processor
+    monkeypatch.setattr(ingest, "get_embeddings", embedding.get_embeddings)
+    local = make("hashing")
+    local.process()
+
+    assert local._vector_store()._collection.name == "langchain-hashing"
+    assert len(stored(local)["ids"]) == 3
+    assert os.path.exists("checksums-hashing.json")
+    assert not os.path.exists("checksums.json")
+    # The run finished, so its checkpoint is gone.
+    assert not os.path.exists("chroma_db/langchain-hashing.checkpoint.jsonl")
+
+    # Without its state the index is rebuilt from the vectors it holds.
+    os.remove("checksums-hashing.json")
+    rebuilt = make("hashing")
+    monkeypatch.setattr(
+        embedding.HashingEmbeddings,
+        "embed_documents",
+        lambda self, texts: pytest.fail("indexed chunks were embedded again"),
+    )
+    rebuilt.process()
+    assert len(stored(rebuilt)["ids"]) == 3
+
+
+def test_indexed_vectors_are_looked_up_in_batches(processor, monkeypatch):
+    make, _ = processor
+    monkeypatch.setattr(ingest, "get_embeddings", embedding.get_embeddings)
+    local = make("hashing")
+    local.process()
+    monkeypatch.setattr(ingest.DocumentProcessor, "LOOKUP_BATCH", 2)
+    collection = local._collection(local.embeddings)
+    digests = stored(local)["metadatas"]
+    digests = [metadata["sha256"] for metadata in digests] + ["0" * 64]
+
+    vectors = local._indexed_vectors(collection, digests)
+
+    assert sorted(vectors) == sorted(digests[:3])
+    assert len(vectors[digests[0]]) == 1024
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="expected one of openai, hashing"):
+        Config(embedding_backend="word2vec")
@@ -0,0 +1,75 @@
+import io
+from unittest import mock
+
+from snowdev.functions.layers import LayerStore
+
+
+def make_store(remote_names):
+    session = mock.MagicMock()
+    session.sql.return_value.collect.return_value = [
+        {"name": f"snowdev/{name}", "size": 10, "md5": "x"} for name in remote_names
+    ]
+    return session, LayerStore(session, "DB.SCHEMA.SNOWDEV")
+
+
+def test_layer_name_is_content_addressed():
+    first = LayerStore.layer_name("idna", "3.4", io.BytesIO(b"zip one"))
+    second = LayerStore.layer_name("idna", "3.4", io.BytesIO(b"zip two"))
+
+    assert first == LayerStore.layer_name("idna", "3.4", io.BytesIO(b"zip one"))
+    assert first != second
+    assert first.startswith("idna-3.4-") and first.endswith(".zip")
+
+
+def test_publish_skips_layers_already_on_stage():
+    session, store = make_store(["static/layers/idna-3.4-aaaa.zip"])
+
+    assert store.publish("idna-3.4-aaaa.zip", io.BytesIO(b"zip"))
+    assert store.publish("tiny-0.4-bbbb.zip", io.BytesIO(b"zip"))
+    assert store.publish("tiny-0.4-bbbb.zip", io.BytesIO(b"zip"))
+
+    # One LIST for the whole store, and only the new layer is uploaded once.
+    assert session.sql.call_count == 1
+    session.file.put_stream.assert_called_once()
+    assert (
+        session.file.put_stream.call_args[0][1]
+        == "@DB.SCHEMA.SNOWDEV/static/layers/tiny-0.4-bbbb.zip"
+    )
+
+
+def test_referenced_reads_imports_files(tmpdir):
+    udf = tmpdir.mkdir("src").mkdir("udf").mkdir("a")
+    udf.join("imports.txt").write(
+        "@DB.SCHEMA.SNOWDEV/static/layers/idna-3.4-aaaa.zip\n"
+        "@DB.SCHEMA.SNOWDEV/static/packages/pyjokes.zip\n"
+    )
+    sproc = tmpdir.join("src").mkdir("sproc").mkdir("b")
+    sproc.join("imports.txt").write(
+        "@DB.SCHEMA.SNOWDEV/static/layers/idna-3.4-aaaa.zip\n"
+    )
+
+    assert LayerStore.referenced(str(tmpdir.join("src"))) == {"idna-3.4-aaaa.zip"}
+
+
+def test_gc_removes_unreferenced_layers():
+    session, store = make_store(
+        [
+            "static/layers/idna-3.4-aaaa.zip",
+            "static/layers/idna-3.3-cccc.zip",
+            "static/layers/tiny-0.4-bbbb.zip",
+        ]
+    )
+
+    assert store.gc({"idna-3.4-aaaa.zip"}, dry_run=True) == [
+        "idna-3.3-cccc.zip",
+        "tiny-0.4-bbbb.zip",
+    ]
+    assert session.sql.call_count == 1
+
+    removed = store.gc({"idna-3.4-aaaa.zip"})
+
+    assert removed == ["idna-3.3-cccc.zip", "tiny-0.4-bbbb.zip"]
+    remove = session.sql.call_args[0][0]
+    assert remove.startswith("REMOVE @DB.SCHEMA.SNOWDEV/static/layers PATTERN")
+    assert "idna-3\\\\.3-cccc\\\\.zip|tiny-0\\\\.4-bbbb\\\\.zip" in remove
+    assert store.gc({"idna-3.4-aaaa.zip"}) == []
@@ -0,0 +1,82 @@
+import json
+import os
+from unittest import mock
+
+import pytest
+
+from snowdev import DeployManifest, SnowflakeRegister
+
+
+@pytest.fixture
+def handler_file(tmpdir):
+    path = tmpdir.join("app.py")
+    path.write("def handler(name: str) -> str:\n    return name\n")
+    return str(path)
+
+
+@pytest.fixture
+def manifest(tmpdir):
+    return DeployManifest(path=str(tmpdir.join(".snowdev", "manifest.json")))
+
+
+def test_compute_hash_is_stable(handler_file):
+    first = DeployManifest.compute_hash([handler_file], {"packages": ["pandas"]})
+    second = DeployManifest.compute_hash([handler_file], {"packages": ["pandas"]})
+    other = DeployManifest.compute_hash([handler_file], {"packages": ["numpy"]})
+
+    assert first == second
+    assert first != other
+
+
+def test_record_persists(manifest):
+    manifest.record("udf:DB.SCHEMA.fn", "abc")
+
+    reloaded = DeployManifest(path=manifest.path)
+    assert reloaded.is_unchanged("udf:DB.SCHEMA.fn", "abc")
+    assert not reloaded.is_unchanged("udf:DB.SCHEMA.fn", "def")
+    assert not DeployManifest(path=manifest.path, force=True).is_unchanged(
+        "udf:DB.SCHEMA.fn", "abc"
+    )
+
+
+def test_register_skips_unchanged_function(handler_file, manifest):
+    session = mock.MagicMock()
+    session.get_current_database.return_value = '"DB"'
+    session.get_current_schema.return_value = '"SCHEMA"'
+    register = SnowflakeRegister(session, manifest=manifest)
+
+    with mock.patch.object(
+        SnowflakeRegister, "_register_entity"
+    ) as mock_register, mock.patch.object(
+        SnowflakeRegister, "get_connection_details_from_toml", return_value={}
+    ):
+        assert register.main(handler_file, "fn", "SNOWDEV", ["pandas"], False)
+        calls = mock_register.call_count
+        assert not register.main(handler_file, "fn", "SNOWDEV", ["pandas"], False)
+        assert mock_register.call_count == calls
+
+        # A different package set is a change.
+        assert register.main(handler_file, "fn", "SNOWDEV", ["numpy"], False)
+        assert mock_register.call_count > calls
+
+
+def test_remote_manifest_is_merged_and_flushed(tmpdir):
+    session = mock.MagicMock()
+
+    def fake_get(stage_path, target_dir):
+        with open(os.path.join(target_dir, DeployManifest.FILENAME), "w") as f:
+            json.dump({"udf:DB.S.fn": {"hash": "remote", "deployed_at": 1}}, f)
+
+    session.file.get.side_effect = fake_get
+    manifest = DeployManifest(
+        session, "SNOWDEV", path=str(tmpdir.join("manifest.json")), remote=True
+    )
+
+    assert manifest.is_unchanged("udf:DB.S.fn", "remote")
+    manifest.flush()
+    session.file.put.assert_not_called()
+
+    manifest.record("udf:DB.S.other", "new")
+    manifest.flush()
+    session.file.put.assert_called_once()
+    assert session.file.put.call_args[0][1] == "@SNOWDEV/manifest"
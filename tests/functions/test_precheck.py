@@ -0,0 +1,122 @@
+import os
+
+import pytest
+
+from snowdev import SnowHelper
+from snowdev.functions.precheck import HandlerPrecheck
+
+
+def write_handler(tmpdir, source, name="app.py"):
+    path = tmpdir.join(name)
+    path.write(source)
+    return str(path)
+
+
+def test_infers_udf_signature(tmpdir):
+    func = write_handler(
+        tmpdir,
+        "from typing import List, Optional\n"
+        "import pandas as pd\n\n"
+        "def handler(name: str, count: Optional[int], tags: List[str]) -> dict:\n"
+        "    return {}\n",
+    )
+
+    precheck = HandlerPrecheck(func, packages=["pandas==1.5.3"])
+    precheck.run()
+
+    signature = precheck.signature
+    assert precheck.warnings == []
+    assert signature.arg_types == ["STRING", "INT", "ARRAY"]
+    assert signature.return_type == "OBJECT"
+
+
+def test_sproc_skips_session_argument(tmpdir):
+    func = write_handler(
+        tmpdir,
+        "from snowflake.snowpark import Session\n\n"
+        "def handler(session: Session, table: str) -> str:\n"
+        "    return table\n",
+    )
+
+    precheck = HandlerPrecheck(func, is_sproc=True)
+    precheck.run()
+
+    signature = precheck.signature
+    assert signature.arg_types == ["STRING"]
+    assert signature.return_type == "STRING"
+
+
+def test_unknown_imports_and_missing_annotations_only_warn(tmpdir):
+    func = write_handler(
+        tmpdir,
+        "import requests\n\n" "def handler(name):\n" "    return name\n",
+    )
+
+    precheck = HandlerPrecheck(func)
+    precheck.run()
+
+    assert precheck.signature is None
+    warnings = "\n".join(precheck.warnings)
+    assert "Argument 'name'" in warnings
+    assert "no return type annotation" in warnings
+    assert "Import 'requests' (line 1)" in warnings
+
+
+def test_sproc_without_session_fails(tmpdir):
+    func = write_handler(tmpdir, "def handler() -> str:\n    return 'x'\n")
+
+    with pytest.raises(ValueError, match="Snowpark session as its first argument"):
+        HandlerPrecheck(func, is_sproc=True).run()
+
+
+def test_syntax_error(tmpdir):
+    func = write_handler(tmpdir, "def handler(x: int) -> int\n    return x\n")
+
+    with pytest.raises(ValueError, match="syntax error"):
+        HandlerPrecheck(func).run()
+
+
+def test_missing_handler(tmpdir):
+    func = write_handler(tmpdir, "def main(x: int) -> int:\n    return x\n")
+
+    with pytest.raises(ValueError, match=r"No top-level function named handler\(\)"):
+        HandlerPrecheck(func).run()
+
+
+def test_imports_resolved_from_aliases_imports_and_local_files(tmpdir):
+    write_handler(tmpdir, "VALUE = 1\n", name="utils.py")
+    func = write_handler(
+        tmpdir,
+        "import sklearn\n"
+        "import mylib\n"
+        "import utils\n"
+        "try:\n"
+        "    import ujson\n"
+        "except ImportError:\n"
+        "    ujson = None\n\n"
+        "def handler(x: float) -> float:\n"
+        "    return x\n\n"
+        "if __name__ == '__main__':\n"
+        "    import pytest\n",
+    )
+
+    HandlerPrecheck(
+        func,
+        packages=["scikit-learn"],
+        imports=["@my_stage/static/mylib_with_dependencies.zip"],
+    ).run()
+
+
+def test_repository_example_passes():
+    example = os.path.join(
+        os.path.dirname(__file__), "..", "..", "examples", "src", "sproc"
+    )
+    directory = os.path.join(example, "snowflake_ml_xgboost")
+    packages = SnowHelper.get_packages_from_toml(directory)
+
+    precheck = HandlerPrecheck(
+        os.path.join(directory, "app.py"), packages=packages, is_sproc=True
+    )
+    precheck.run()
+
+    assert any("joblib" in warning for warning in precheck.warnings)
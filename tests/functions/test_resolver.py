@@ -0,0 +1,220 @@
+import io
+import json
+import os
+import subprocess
+import tarfile
+from unittest import mock
+
+import pytest
+
+from snowdev.functions.build_cache import BuildCache
+from snowdev.functions.resolver import (
+    DependencyResolver,
+    ResolvedPackage,
+    parse_requirement,
+)
+
+REPORT = {
+    "install": [
+        {
+            "requested": True,
+            "metadata": {
+                "name": "Foo_Client",
+                "version": "2.0.1",
+                "requires_dist": [
+                    "requests (>=2.28,<3)",
+                    "Tiny-Parser>=0.3",
+                    "pytest ; extra == 'test'",
+                ],
+            },
+        },
+        {
+            "requested": False,
+            "metadata": {
+                "name": "requests",
+                "version": "2.31.0",
+                "requires_dist": ["idna<4,>=2.5", "PySocks!=1.5.7; extra == 'socks'"],
+            },
+        },
+        {"requested": False, "metadata": {"name": "idna", "version": "3.4"}},
+        {"requested": False, "metadata": {"name": "tiny-parser", "version": "0.4"}},
+    ]
+}
+
+
+@pytest.fixture
+def resolver(tmpdir):
+    return DependencyResolver(BuildCache(root=str(tmpdir.join("builds"))))
+
+
+def write_report(report):
+    def check_call(command):
+        with open(command[command.index("--report") + 1], "w") as f:
+            json.dump(report, f)
+
+    return check_call
+
+
+def test_parse_requirement():
+    assert parse_requirement("requests (>=2.28,<3)")[:2] == ("requests", ">=2.28,<3")
+    parsed = parse_requirement("Tiny_Parser[Fast] >= 0.3 ; python_version > '3'")
+    assert parsed[:3] == ("tiny-parser", ">=0.3", ("fast",))
+    assert str(parsed.marker) == 'python_version > "3"'
+    assert parse_requirement("idna") == ("idna", "", (), None)
+    direct = parse_requirement(
+        "Foo @ https://example.com/foo-1.0.tar.gz ; os_name == 'x'"
+    )
+    assert direct[:2] == ("foo", "")
+    assert str(direct.marker) == 'os_name == "x"'
+
+
+def test_markers_are_evaluated_for_the_target(resolver):
+    environment = resolver.build_cache.marker_environment()
+    old_python = parse_requirement('typing-extensions>=4.0; python_version < "3.8"')
+    test_extra = parse_requirement('pytest>=7; extra == "test"')
+
+    assert not old_python.applies(environment)
+    assert not test_extra.applies(environment)
+    assert test_extra.applies(environment, ["test"])
+    assert parse_requirement("numpy; sys_platform == 'linux'").applies(environment)
+
+
+def test_closure_from_pip_report_for_target(resolver):
+    with mock.patch(
+        "snowdev.functions.resolver.subprocess.check_call",
+        side_effect=write_report(REPORT),
+    ) as check_call:
+        closure = resolver.closure(["foo-client"])
+
+    command = check_call.call_args[0][0]
+    assert "--dry-run" in command and "--only-binary=:all:" in command
+    assert "--no-index" not in command
+    assert list(closure) == ["foo-client", "requests", "idna", "tiny-parser"]
+    assert closure["foo-client"].requested
+    assert closure["requests"].pin == "requests==2.31.0"
+    assert closure["idna"].requires == []
+
+
+def test_closure_falls_back_to_wheelhouse(resolver):
+    def check_call(command):
+        if "--no-index" not in command:
+            raise subprocess.CalledProcessError(1, command)
+        write_report(REPORT)(command)
+
+    with mock.patch(
+        "snowdev.functions.resolver.subprocess.check_call", side_effect=check_call
+    ) as mocked:
+        closure = resolver.closure(["foo-client"])
+
+    # Index, then a local wheel build, then the wheelhouse alone.
+    assert mocked.call_count == 3
+    assert "wheel" in mocked.call_args_list[1][0][0]
+    assert "--find-links" in mocked.call_args[0][0]
+    assert len(closure) == 4
+
+
+def test_split_checks_channel_with_combined_constraints(resolver):
+    closure = {
+        name: ResolvedPackage(name, version, requires, requested)
+        for name, version, requires, requested in [
+            ("foo-client", "2.0.1", ["requests (>=2.28,<3)", "tiny-parser>=0.3"], True),
+            ("requests", "2.31.0", ["idna<4,>=2.5", "pysocks; extra == 'x'"], False),
+            ("idna", "3.4", [], False),
+            ("tiny-parser", "0.4", [], False),
+        ]
+    }
+    channel_versions = {
+        "requests>=2.28,<3": "2.31.0",
+        "idna<4,>=2.5": "3.4",
+        "tiny-parser>=0.3": None,
+    }
+
+    with mock.patch(
+        "snowdev.functions.resolver.SnowHelper.resolve_packages",
+        side_effect=lambda names, max_workers=None: {
+            name: channel_versions[name] for name in names
+        },
+    ) as resolve_packages:
+        channel, vendored = resolver.split(closure)
+
+    assert resolve_packages.call_args[0][0] == list(channel_versions)
+    assert channel == {"requests": "2.31.0", "idna": "3.4"}
+    assert sorted(vendored) == ["foo-client", "tiny-parser"]
+
+
+def write_sdist(directory, name, version):
+    """An sdist-only project, the way pure-Python packages are often published."""
+    root = f"{name}-{version}"
+    files = {
+        "setup.py": f"from setuptools import setup\n"
+        f"setup(name={name!r}, version={version!r}, packages=[{name!r}])\n",
+        f"{name}/__init__.py": "",
+        "PKG-INFO": f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n",
+    }
+    project = os.path.join(directory, name)
+    os.makedirs(project)
+    archive = f"{root}.tar.gz"
+    with tarfile.open(os.path.join(project, archive), "w:gz") as tar:
+        for path, content in files.items():
+            info = tarfile.TarInfo(f"{root}/{path}")
+            info.size = len(content.encode())
+            tar.addfile(info, io.BytesIO(content.encode()))
+    with open(os.path.join(project, "index.html"), "w") as f:
+        f.write(f'<a href="{archive}">{archive}</a>\n')
+
+
+def test_closure_builds_wheels_for_sdist_only_packages(resolver, tmpdir, monkeypatch):
+    index = str(tmpdir.mkdir("simple"))
+    write_sdist(index, "tinysdist", "0.1")
+    monkeypatch.setenv("PIP_INDEX_URL", f"file://{index}")
+    monkeypatch.setenv("PIP_EXTRA_INDEX_URL", "")
+    # Build with the host setuptools, as there is no index to fetch it from.
+    monkeypatch.setenv("PIP_NO_BUILD_ISOLATION", "0")
+
+    closure = resolver.closure(["tinysdist"])
+
+    assert closure["tinysdist"].pin == "tinysdist==0.1"
+    assert os.listdir(resolver.build_cache.wheelhouse) == [
+        "tinysdist-0.1-py3-none-any.whl"
+    ]
+
+
+def test_split_ignores_requirements_whose_marker_does_not_apply(resolver):
+    closure = {
+        name: ResolvedPackage(name, version, requires, requested, extras)
+        for name, version, requires, requested, extras in [
+            (
+                "foo-client",
+                "2.0.1",
+                [
+                    'typing-extensions<4; python_version < "3.8"',
+                    "httpx[http2]>=0.24",
+                ],
+                True,
+                (),
+            ),
+            ("typing-extensions", "4.7.1", [], False, ()),
+            (
+                "httpx",
+                "0.24.1",
+                ['h2<5,>=3; extra == "http2"', "pytest; extra == 'test'"],
+                False,
+                (),
+            ),
+            ("h2", "4.1.0", [], False, ()),
+            ("pytest", "7.4.0", [], False, ()),
+        ]
+    }
+
+    with mock.patch(
+        "snowdev.functions.resolver.SnowHelper.resolve_packages",
+        side_effect=lambda names, max_workers=None: dict.fromkeys(names, "1"),
+    ) as resolve_packages:
+        resolver.split(closure)
+
+    assert resolve_packages.call_args[0][0] == [
+        "typing-extensions",
+        "httpx>=0.24",
+        "h2<5,>=3",
+        "pytest",
+    ]
@@ -0,0 +1,145 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from snowdev.functions.connect import SessionPool, SnowflakeConnection
+
+PARAMS = {"account": "test", "user": "test"}
+
+
+@pytest.fixture
+def created():
+    sessions = []
+
+    def create(self, params):
+        session = MagicMock()
+        sessions.append(session)
+        self._defaults[id(session)] = {"database": "DB"}
+        session.get_current_database.return_value = "DB"
+        return session
+
+    with patch.object(SessionPool, "_create", create):
+        yield sessions
+
+
+def test_checkout_reuses_returned_session(created):
+    pool = SessionPool(max_size=2)
+
+    with pool.session(PARAMS) as first:
+        first.get_current_database.return_value = "OTHER"
+    with pool.session(PARAMS) as second:
+        pass
+
+    assert first is second
+    assert len(created) == 1
+    first.clear_imports.assert_called()
+    first.use_database.assert_called_with("DB")
+
+
+def test_sessions_are_keyed_by_parameters(created):
+    pool = SessionPool()
+    with pool.session(PARAMS) as first, pool.session({"account": "other"}) as other:
+        assert first is not other
+
+
+def test_checkout_blocks_at_max_size(created):
+    pool = SessionPool(max_size=1)
+    session = pool.checkout(PARAMS)
+
+    with pytest.raises(TimeoutError):
+        pool.checkout(PARAMS, timeout=0.05)
+
+    threading.Timer(0.05, pool.checkin, args=[session]).start()
+    assert pool.checkout(PARAMS, timeout=5) is session
+
+
+def test_unhealthy_session_is_replaced(created):
+    pool = SessionPool(health_check_after=0)
+    with pool.session(PARAMS) as first:
+        first.sql.side_effect = Exception("expired")
+    with pool.session(PARAMS) as second:
+        pass
+
+    assert second is not first
+    first.close.assert_called_once()
+
+
+def test_idle_sessions_are_evicted(created):
+    pool = SessionPool(idle_timeout=0)
+    with pool.session(PARAMS) as first:
+        pass
+
+    pool.evict_idle()
+    first.close.assert_called_once()
+    with pool.session(PARAMS) as second:
+        assert second is not first
+
+
+def test_checkin_evicts_idle_sessions(created):
+    pool = SessionPool(idle_timeout=60)
+    with pool.session(PARAMS) as first:
+        pass
+    # The first session has been idle for longer than the timeout.
+    key = pool._key(PARAMS)
+    pool._idle[key] = [(first, pool._idle[key][0][1] - 120)]
+
+    with pool.session({"account": "other"}):
+        pass
+
+    first.close.assert_called_once()
+    assert pool._idle[key] == []
+
+
+def test_process_pool_is_closed_at_exit(created, monkeypatch):
+    registered = []
+    monkeypatch.setattr("atexit.register", registered.append)
+    monkeypatch.setattr(SnowflakeConnection, "pool", None)
+
+    pool = SnowflakeConnection.session_pool()
+    shared = pool.get_shared(PARAMS)
+    borrowed = pool.checkout(PARAMS)
+    assert registered == [pool.close_all]
+
+    registered[0]()
+    shared.close.assert_called_once()
+    borrowed.close.assert_called_once()
+
+
+def test_connections_share_one_session(created, monkeypatch):
+    for name in ["ACCOUNT", "USER_NAME", "PASSWORD", "WAREHOUSE"]:
+        monkeypatch.setenv(name, "test")
+    for name in ["DATABASE", "SCHEMA", "ROLE"]:
+        monkeypatch.setenv(name, "test")
+
+    with patch.object(SnowflakeConnection, "pool", SessionPool()):
+        first = SnowflakeConnection().get_session()
+        second = SnowflakeConnection().get_session()
+
+    assert first is second
+    assert len(created) == 1
+
+
+def test_shared_session_is_reset_for_the_next_caller(created):
+    pool = SessionPool()
+    first = pool.get_shared(PARAMS)
+    first.get_current_database.return_value = "OTHER"
+
+    second = pool.get_shared(PARAMS)
+
+    assert first is second
+    first.clear_imports.assert_called_once()
+    first.clear_packages.assert_called_once()
+    first.use_database.assert_called_once_with("DB")
+
+
+def test_banner_is_printed_once_per_process(capsys, monkeypatch):
+    monkeypatch.setattr(SessionPool, "_banner_shown", False)
+    pool = SessionPool()
+
+    with patch("snowflake.snowpark.session.Session"):
+        with pool.session(PARAMS), pool.session(PARAMS):
+            pass
+        pool.get_shared(PARAMS)
+
+    assert capsys.readouterr().out.count("|___/_|") == 1
@@ -0,0 +1,79 @@
+import os
+from unittest import mock
+
+from snowdev import TaskDeployer
+from snowdev.functions.sql_script import SqlScript, split_statements
+
+SCRIPT = """
+-- Load; then transform
+CREATE OR REPLACE TASK load_task
+  WAREHOUSE = COMPUTE_WH
+  COMMENT = 'Runs daily; at 1am'
+AS
+    CALL load('a;b'); -- call stored procedure
+EXECUTE IMMEDIATE $$
+BEGIN
+  CREATE TABLE IF NOT EXISTS x (a INT);
+  INSERT INTO x VALUES (1);
+END;
+$$;
+DECLARE
+  total INT DEFAULT 0;
+BEGIN
+  SELECT COUNT(*) INTO :total FROM x;
+  RETURN total;
+END;
+ALTER TASK load_task RESUME
+"""
+
+
+def test_split_statements_keeps_literals_and_blocks_together():
+    statements = split_statements(SCRIPT)
+
+    assert len(statements) == 4
+    assert statements[0].startswith("-- Load; then transform\nCREATE OR REPLACE TASK")
+    assert statements[0].endswith("CALL load('a;b')")
+    assert (
+        statements[1].startswith("EXECUTE IMMEDIATE $$") and "END;\n$$" in statements[1]
+    )
+    assert statements[2].startswith("DECLARE") and statements[2].endswith("END")
+    assert statements[3] == "ALTER TASK load_task RESUME"
+    assert split_statements("-- nothing here;\n/* or here */") == []
+
+
+def test_batch_is_one_escaped_scripting_block():
+    script = SqlScript(["SELECT 'it''s'", "SELECT '\\n'"])
+
+    assert script.batch() == (
+        "EXECUTE IMMEDIATE 'BEGIN\nSELECT \\'it\\'\\'s\\';\nSELECT \\'\\\\n\\';\nEND;'"
+    )
+
+
+def test_run_times_each_statement_or_the_batch():
+    session = mock.MagicMock()
+    script = SqlScript.from_text(SCRIPT)
+
+    timings = script.run(session)
+    assert [t.statement for t in timings] == script.statements
+    assert session.sql.call_count == 4
+
+    session.reset_mock()
+    timings = script.run(session, batch=True)
+    assert len(timings) == 1
+    session.sql.assert_called_once_with(script.batch())
+
+
+def test_task_deployer_dry_run_and_batch(tmpdir, monkeypatch):
+    monkeypatch.chdir(str(tmpdir))
+    os.makedirs(os.path.join("src", "task", "load_task"))
+    with open(os.path.join("src", "task", "load_task", "app.sql"), "w") as f:
+        f.write(SCRIPT)
+    session = mock.MagicMock()
+    deployer = TaskDeployer(session, "SNOWDEV")
+
+    assert deployer.deploy_task("load_task", None, dry_run=True)
+    session.sql.assert_not_called()
+
+    assert deployer.deploy_task("load_task", None, batch=True)
+    session.sql.assert_called_once()
+    assert session.sql.call_args[0][0].startswith("EXECUTE IMMEDIATE 'BEGIN")
@@ -0,0 +1,100 @@
+from unittest import mock
+
+import pytest
+
+from snowdev import StreamlitAppDeployer, TaskDeployer
+from snowdev.functions.stage_manager import StageManager
+
+
+@pytest.fixture(autouse=True)
+def clear_managers():
+    StageManager.clear()
+    yield
+    StageManager.clear()
+
+
+def make_session(stages=()):
+    session = mock.MagicMock()
+    session.get_current_account.return_value = "ACCOUNT"
+    session.get_current_role.return_value = "DEPLOYER"
+    session.get_current_database.return_value = '"DB"'
+    session.get_current_schema.return_value = '"SCHEMA"'
+
+    def sql(query):
+        result = mock.MagicMock()
+        if query.startswith("SHOW STAGES"):
+            result.collect.return_value = [{"name": name} for name in stages]
+        else:
+            result.collect.return_value = [
+                {"status": "Stage area SNOWDEV successfully created."}
+            ]
+        return result
+
+    session.sql.side_effect = sql
+    return session
+
+
+def queries(session):
+    return [call[0][0] for call in session.sql.call_args_list]
+
+
+def test_qualify():
+    manager = StageManager(make_session())
+
+    assert manager.qualify("snowdev") == "DB.SCHEMA.SNOWDEV"
+    assert manager.qualify("@other.snowdev") == "DB.OTHER.SNOWDEV"
+    assert manager.qualify('"X"."Y".snowdev') == "X.Y.SNOWDEV"
+
+
+def test_exists_is_memoized():
+    session = make_session(stages=["SNOWDEV"])
+    manager = StageManager.for_session(session)
+
+    assert manager.exists(session, "SNOWDEV")
+    assert manager.exists(session, "DB.SCHEMA.SNOWDEV")
+    assert not manager.exists(session, "OTHER")
+    assert queries(session) == [
+        "SHOW STAGES LIKE 'SNOWDEV' IN SCHEMA DB.SCHEMA",
+        "SHOW STAGES LIKE 'OTHER' IN SCHEMA DB.SCHEMA",
+    ]
+
+
+def test_exists_raises_errors_other_than_missing_schema():
+    session = make_session()
+    session.sql.side_effect = Exception("Schema 'DB.SCHEMA' does not exist")
+    assert not StageManager(session).exists(session, "SNOWDEV")
+
+    session.sql.side_effect = Exception("Connection reset")
+    with pytest.raises(Exception, match="Connection reset"):
+        StageManager(session).exists(session, "SNOWDEV")
+
+
+def test_deployers_share_one_create_per_schema():
+    first, second = make_session(), make_session()
+
+    StreamlitAppDeployer(first, "SNOWDEV").create_stage_if_not_exists("SNOWDEV")
+    TaskDeployer(second, "SNOWDEV").create_stage_if_not_exists("SNOWDEV")
+    StageManager.for_session(second).ensure(second, "DB.SCHEMA.SNOWDEV")
+
+    assert queries(first) == [
+        "CREATE STAGE IF NOT EXISTS SNOWDEV DIRECTORY = (ENABLE = TRUE)"
+    ]
+    assert queries(second) == []
+    assert StageManager.for_session(second).exists(second, "SNOWDEV")
+    assert queries(second) == []
+
+
+def test_roles_have_own_managers_and_queries_use_the_callers_session():
+    deployer, admin = make_session(), make_session()
+    admin.get_current_role.return_value = "SYSADMIN"
+
+    StageManager.for_session(deployer).ensure(deployer, "SNOWDEV")
+    assert StageManager.for_session(admin) is not StageManager.for_session(deployer)
+    StageManager.for_session(admin).ensure(admin, "SNOWDEV")
+    assert len(queries(deployer)) == len(queries(admin)) == 1
+
+    # A shared manager never keeps the session of an earlier caller.
+    other = make_session(stages=["SNOWDEV"])
+    assert StageManager.for_session(other).exists(other, "OTHER_STAGE") is False
+    assert queries(other) == ["SHOW STAGES LIKE 'OTHER_STAGE' IN SCHEMA DB.SCHEMA"]
+    assert len(queries(deployer)) == 1
@@ -0,0 +1,158 @@
+import hashlib
+import json
+from unittest import mock
+
+from snowflake.snowpark import Row
+
+from snowdev import StageSync
+from snowdev.functions.stage_sync import StageDigests
+
+
+def md5(data):
+    return hashlib.md5(data).hexdigest()
+
+
+def make_session(listing):
+    session = mock.MagicMock()
+
+    def sql(query):
+        result = mock.MagicMock()
+        result.collect.return_value = listing if query.startswith("LIST") else []
+        return result
+
+    session.sql.side_effect = sql
+    return session
+
+
+def test_plan_uploads_only_new_or_changed_files(tmpdir):
+    app = tmpdir.mkdir("app")
+    app.join("same.py").write(b"same", mode="wb")
+    app.join("changed.py").write(b"new", mode="wb")
+    app.mkdir("pages").join("new.py").write(b"page", mode="wb")
+    session = make_session(
+        [
+            {"name": "stage/streamlit/app/same.py", "size": 4, "md5": md5(b"same")},
+            {"name": "stage/streamlit/app/changed.py", "size": 3, "md5": md5(b"old")},
+            {"name": "stage/streamlit/app/gone.py", "size": 1, "md5": md5(b"x")},
+            {"name": "stage/streamlit/app_old/same.py", "size": 4, "md5": "x"},
+        ]
+    )
+    stage_sync = StageSync(session, "@DB.SCHEMA.STAGE/streamlit/app/")
+
+    plan = stage_sync.plan(StageSync.local_files(str(app)), delete=True)
+
+    assert [path for path, _ in plan.uploads] == ["changed.py", "pages/new.py"]
+    assert plan.unchanged == ["same.py"]
+    assert plan.removals == ["gone.py"]
+    session.sql.assert_called_once_with("LIST @DB.SCHEMA.STAGE/streamlit/app")
+
+
+def test_sync_puts_changed_files_and_removes_stale_ones(tmpdir):
+    app = tmpdir.mkdir("app")
+    app.join("changed.py").write(b"new", mode="wb")
+    app.mkdir("pages").join("new.py").write(b"page", mode="wb")
+    session = make_session(
+        [{"name": "stage/streamlit/app/gone.v1.py", "size": 1, "md5": md5(b"x")}]
+    )
+    stage_sync = StageSync(session, "DB.SCHEMA.STAGE/streamlit/app")
+
+    assert stage_sync.sync(StageSync.local_files(str(app)), delete=True)
+
+    targets = sorted(call.args[1] for call in session.file.put.call_args_list)
+    assert targets == [
+        "@DB.SCHEMA.STAGE/streamlit/app/",
+        "@DB.SCHEMA.STAGE/streamlit/app/pages/",
+    ]
+    queries = [call.args[0] for call in session.sql.call_args_list]
+    assert queries[-1] == (
+        "REMOVE @DB.SCHEMA.STAGE/streamlit/app "
+        "PATTERN = '[^/]+/streamlit/app/(gone\\\\.v1\\\\.py)'"
+    )
+
+
+def test_dry_run_changes_nothing(tmpdir):
+    static = tmpdir.mkdir("static")
+    static.mkdir("packages").join("a.zip").write(b"zip", mode="wb")
+    session = make_session(
+        [{"name": "stage/static/old.zip", "size": 1, "md5": md5(b"x")}]
+    )
+    stage_sync = StageSync(session, "DB.SCHEMA.STAGE/static")
+
+    files = StageSync.local_files(str(static), flatten=True)
+    assert list(files) == ["a.zip"]
+    assert stage_sync.sync(files, delete=True, dry_run=True)
+
+    session.file.put.assert_not_called()
+    assert session.sql.call_count == 1
+
+
+def list_rows(*entries):
+    """Rows as `LIST` returns them through Snowpark."""
+    return [
+        Row(
+            name=name,
+            size=size,
+            md5=md5_value,
+            last_modified="Tue, 17 Oct 2023 10:00:00 GMT",
+        )
+        for name, size, md5_value in entries
+    ]
+
+
+def test_encrypted_and_multipart_listings_use_recorded_digests(tmpdir):
+    app = tmpdir.mkdir("app")
+    app.join("small.py").write(b"small", mode="wb")
+    app.join("big.zip").write(b"big", mode="wb")
+    # A client-side encrypted stage lists the md5 of the encrypted file and
+    # its padded size; multipart uploads list `<md5>-<parts>`.
+    listing = list_rows(
+        ("stage/app/small.py", 16, "0f343b0931126a20f133d67c2b018a3b"),
+        ("stage/app/big.zip", 2 * 16, "b1946ac92492d2347c6235b4d2611184-3"),
+    )
+    session = make_session(listing)
+    digests = StageDigests(str(tmpdir.join("digests.json")))
+    stage_sync = StageSync(session, "DB.SCHEMA.STAGE/app", digests=digests)
+    files = StageSync.local_files(str(app))
+
+    # Nothing is known yet, so both files are uploaded and their listing recorded.
+    assert stage_sync.sync(files)
+    assert session.file.put.called
+    # One LIST to plan and one to read back what the uploads listed as.
+    assert session.sql.call_count == 2
+    with open(digests.path) as f:
+        assert sorted(json.load(f)["DB.SCHEMA.STAGE/app"]) == ["big.zip", "small.py"]
+
+    session.reset_mock()
+    again = StageSync(
+        session, "DB.SCHEMA.STAGE/app", digests=StageDigests(digests.path)
+    )
+    plan = again.plan(files)
+    assert plan.uploads == [] and plan.unchanged == ["big.zip", "small.py"]
+
+    # New local content no longer matches what was recorded.
+    app.join("small.py").write(b"changed", mode="wb")
+    plan = again.plan(StageSync.local_files(str(app)))
+    assert [path for path, _ in plan.uploads] == ["small.py"]
+
+
+def test_plain_md5_from_sse_stage_needs_no_record(tmpdir):
+    app = tmpdir.mkdir("app")
+    app.join("a.py").write(b"a", mode="wb")
+    session = make_session(list_rows(("stage/app/a.py", 1, md5(b"a"))))
+    digests = StageDigests(str(tmpdir.join("digests.json")))
+
+    plan = StageSync(session, "DB.SCHEMA.STAGE/app", digests=digests).plan(
+        StageSync.local_files(str(app))
+    )
+
+    assert plan.unchanged == ["a.py"]
+    assert StageSync.plain_md5(md5(b"a") + "-2") is None
+    assert not tmpdir.join("digests.json").exists()
+
+
+def test_remove_without_paths_runs_nothing():
+    session = make_session([])
+
+    StageSync(session, "DB.SCHEMA.STAGE/static").remove([])
+
+    session.sql.assert_not_called()
@@ -4,6 +4,14 @@ import pytest
 import yaml
 
 from snowdev import StreamlitAppDeployer
+from snowdev.functions.stage_manager import StageManager
+
+
+@pytest.fixture(autouse=True)
+def clear_stage_managers():
+    StageManager.clear()
+    yield
+    StageManager.clear()
 
 
 @pytest.fixture
@@ -45,23 +53,6 @@ def test_create_stage_if_not_exists(mock_session):
     )
 
 
-def test_upload_to_stage(mock_session, tmpdir):
-    file_content = "test data"
-    file_path = tmpdir.join("test_file.txt")
-    with open(file_path, "w") as file:
-        file.write(file_content)
-
-    deployer = StreamlitAppDeployer(mock_session, "test_stage")
-    deployer.upload_to_stage(str(file_path), "test_stage", "test_app_name")
-
-    mock_session.file.put.assert_called_once_with(
-        str(file_path),
-        "@test_stage/streamlit/test_app_name",
-        auto_compress=False,
-        overwrite=True,
-    )
-
-
 def test_apply_connection_details(tmpdir, mock_session):
     yml_content = {
         "database": "test_database",
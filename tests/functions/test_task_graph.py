@@ -0,0 +1,173 @@
+import json
+import threading
+from unittest import mock
+
+import pytest
+
+from snowdev.functions.task_graph import TaskGraph, TaskGraphDeployer
+
+ROOT = """
+CREATE OR REPLACE TASK load_root
+  WAREHOUSE = COMPUTE_WH
+  SCHEDULE = 'USING CRON 0 1 * * * UTC'
+  COMMENT = 'Runs AFTER midnight, see CALL docs()'
+AS
+    CALL load_raw(); -- AFTER nothing
+"""
+
+
+def child(name, *after, call="transform"):
+    return (
+        f"CREATE OR REPLACE TASK {name}\n"
+        f"  WAREHOUSE = COMPUTE_WH\n"
+        f"  AFTER {', '.join(after)}\n"
+        f"AS\n"
+        f"  EXECUTE IMMEDIATE $$ BEGIN CALL {call}('x;y'); END $$;"
+    )
+
+
+def make_graph(tmpdir, tasks):
+    root = tmpdir.mkdir("task")
+    for directory, sql in tasks.items():
+        root.mkdir(directory).join("app.sql").write(sql)
+    return TaskGraph.from_directory(str(root))
+
+
+@pytest.fixture
+def pipeline(tmpdir):
+    return make_graph(
+        tmpdir,
+        {
+            "root": ROOT,
+            "left": child("left_task", "load_root"),
+            "right": child('"Right"', "db.schema.load_root"),
+            "merge": child("merge_task", "left_task", '"Right"', call="db.s.merge"),
+            "external": child("external_task", "not_in_project"),
+        },
+    )
+
+
+def test_parse_references(pipeline):
+    root = pipeline.nodes["LOAD_ROOT"]
+    assert root.directory == "root"
+    assert root.after == []
+    assert root.calls == ["LOAD_RAW"]
+
+    merge = pipeline.nodes["MERGE_TASK"]
+    assert merge.after == ["LEFT_TASK", "Right"]
+    assert merge.calls == ["MERGE"]
+    assert pipeline.procedures() == ["TRANSFORM", "MERGE", "LOAD_RAW"]
+
+
+def test_levels_and_roots(pipeline):
+    assert pipeline.levels() == [
+        ["EXTERNAL_TASK", "LOAD_ROOT"],
+        ["LEFT_TASK", "Right"],
+        ["MERGE_TASK"],
+    ]
+    assert pipeline.roots() == ["LOAD_ROOT"]
+    assert pipeline.descendants("LOAD_ROOT") == {"LEFT_TASK", "Right", "MERGE_TASK"}
+
+
+def test_cycle_is_rejected(tmpdir):
+    graph = make_graph(tmpdir, {"a": child("a", "b"), "b": child("b", "a")})
+
+    with pytest.raises(ValueError, match="cycle between A, B"):
+        graph.levels()
+
+
+def make_session(states, predecessors=None):
+    session = mock.MagicMock()
+    session.get_current_database.return_value = '"DB"'
+    session.get_current_schema.return_value = '"SCHEMA"'
+    statements = []
+
+    def sql(query):
+        statements.append(query)
+        result = mock.MagicMock()
+        result.collect.return_value = (
+            [
+                {
+                    "name": name,
+                    "state": state,
+                    "predecessors": json.dumps(
+                        (predecessors or {}).get(name, []), indent=2
+                    ),
+                }
+                for name, state in states.items()
+            ]
+            if query.startswith("SHOW TASKS")
+            else []
+        )
+        return result
+
+    session.sql.side_effect = sql
+    return session, statements
+
+
+def test_deploy_suspends_running_root_and_resumes_children_first(pipeline):
+    session, statements = make_session({"LOAD_ROOT": "started"})
+    lock = threading.Lock()
+
+    def deploy(node):
+        with lock:
+            statements.append(f"deploy {node.name}")
+
+    results = TaskGraphDeployer(session, pipeline, deploy, max_workers=4).deploy()
+
+    assert all(succeeded for _, succeeded, _, _ in results)
+    assert statements[:2] == [
+        "SHOW TASKS IN SCHEMA",
+        'ALTER TASK IF EXISTS "DB"."SCHEMA"."LOAD_ROOT" SUSPEND',
+    ]
+    deploys = statements[2:7]
+    assert sorted(deploys[:2]) == ["deploy EXTERNAL_TASK", "deploy LOAD_ROOT"]
+    assert sorted(deploys[2:4]) == ["deploy LEFT_TASK", "deploy Right"]
+    assert deploys[4] == "deploy MERGE_TASK"
+    resumes = statements[7:]
+    assert resumes[0] == 'ALTER TASK IF EXISTS "DB"."SCHEMA"."MERGE_TASK" RESUME'
+    assert resumes[-1] == 'ALTER TASK IF EXISTS "DB"."SCHEMA"."LOAD_ROOT" RESUME'
+    # Trees that were not running are left suspended.
+    assert len(resumes) == 4
+
+
+def test_failed_task_skips_descendants_and_keeps_tree_suspended(pipeline):
+    session, statements = make_session({"LOAD_ROOT": "started"})
+
+    def deploy(node):
+        if node.name == "LEFT_TASK":
+            raise Exception("boom")
+
+    results = TaskGraphDeployer(session, pipeline, deploy).deploy(resume=True)
+
+    outcome = {node.name: (succeeded, error) for node, succeeded, error, _ in results}
+    assert outcome["LEFT_TASK"] == (False, "boom")
+    assert outcome["MERGE_TASK"] == (False, "skipped, predecessor LEFT_TASK failed")
+    assert outcome["Right"] == (True, None)
+    assert not any("RESUME" in statement for statement in statements)
+
+
+def test_root_outside_the_project_is_suspended_and_resumed_last(pipeline, capsys):
+    session, statements = make_session(
+        {"LOAD_ROOT": "suspended", "UPSTREAM": "started", "NOT_IN_PROJECT": "started"},
+        {"NOT_IN_PROJECT": ["OTHER_DB.OTHER_SCHEMA.UPSTREAM"]},
+    )
+
+    TaskGraphDeployer(session, pipeline, lambda node: None).deploy()
+
+    alters = [statement for statement in statements if statement.startswith("ALTER")]
+    assert alters == [
+        'ALTER TASK IF EXISTS "DB"."SCHEMA"."UPSTREAM" SUSPEND',
+        'ALTER TASK IF EXISTS "DB"."SCHEMA"."EXTERNAL_TASK" RESUME',
+        'ALTER TASK IF EXISTS "DB"."SCHEMA"."UPSTREAM" RESUME',
+    ]
+    assert "not in this schema" not in capsys.readouterr().out
+
+
+def test_unknown_external_predecessor_is_warned_about(pipeline, capsys):
+    session, statements = make_session({"LOAD_ROOT": "suspended"})
+
+    TaskGraphDeployer(session, pipeline, lambda node: None).deploy()
+
+    assert not any(statement.startswith("ALTER") for statement in statements)
+    assert "EXTERNAL_TASK runs after NOT_IN_PROJECT" in capsys.readouterr().out
@@ -0,0 +1,64 @@
+import os
+from unittest import mock
+
+from snowdev import StageUploader
+
+
+def make_files(tmpdir):
+    static = tmpdir.mkdir("static")
+    packages = static.mkdir("packages")
+    for name in ("a.zip", "b.zip", "c.zip"):
+        packages.join(name).write(b"x" * 10, mode="wb")
+    static.join("logo.png").write(b"y" * 5, mode="wb")
+    static.join(".hidden").write(b"z", mode="wb")
+    return [
+        (os.path.join(root, file), "@DB.SCHEMA.STAGE/static/")
+        for root, _, files in os.walk(str(static))
+        for file in files
+    ]
+
+
+def test_directories_are_uploaded_with_one_wildcard_put(tmpdir):
+    session = mock.MagicMock()
+    files = make_files(tmpdir)
+
+    report = StageUploader(session, max_workers=2, parallel=8).upload(files)
+
+    patterns = sorted(call.args[0] for call in session.file.put.call_args_list)
+    static = str(tmpdir.join("static"))
+    assert patterns == sorted(
+        [
+            os.path.join(static, ".hidden"),
+            os.path.join(static, "logo.png"),
+            os.path.join(static, "packages", "*"),
+        ]
+    )
+    for call in session.file.put.call_args_list:
+        assert call.kwargs["parallel"] == 8
+        assert call.kwargs["overwrite"] is True
+        assert call.kwargs["auto_compress"] is False
+    assert report.ok
+    assert len(report.results) == 5
+    assert report.total_bytes == 36
+
+
+def test_failed_put_marks_every_covered_file(tmpdir, capsys):
+    session = mock.MagicMock()
+    files = make_files(tmpdir)
+
+    def put(pattern, *args, **kwargs):
+        if pattern.endswith("*"):
+            raise RuntimeError("access denied")
+
+    session.file.put.side_effect = put
+
+    report = StageUploader(session).upload(files)
+
+    assert not report.ok
+    assert sorted(os.path.basename(r.source) for r in report.failed) == [
+        "a.zip",
+        "b.zip",
+        "c.zip",
+    ]
+    report.print_summary()
+    assert "2 uploaded, 3 failed" in capsys.readouterr().out
@@ -0,0 +1,95 @@
+import pytest
+
+from snowdev.functions.versions import VersionIndex, VersionOrder, VersionSpec
+
+
+def test_pep440_ordering():
+    ordered = [
+        "1.0.dev1",
+        "1.0a1",
+        "1.0b2",
+        "1.0rc1",
+        "1.0",
+        "1.0.post1",
+        "1.0.1",
+        "1.1",
+        "2023.1b",
+        "2023.1",
+        "1!0.1",
+    ]
+    parsed = [VersionOrder(version) for version in ordered]
+    assert sorted(reversed(parsed)) == parsed
+
+
+def test_conda_versions_and_build_strings():
+    assert VersionOrder("1.1.1w") > VersionOrder("1.1.1v") > VersionOrder("1.1.1")
+    assert VersionOrder("1.0") == VersionOrder("1.0.0")
+    version = VersionOrder("1.2.3=py310_0")
+    assert version == VersionOrder("1.2.3")
+    assert version.build == "py310_0"
+
+
+def test_invalid_version():
+    with pytest.raises(ValueError):
+        VersionOrder("latest")
+
+
+@pytest.mark.parametrize(
+    "spec, expected",
+    [
+        (None, "1.5.3"),
+        ("*", "1.5.3"),
+        (">=2.0.0rc1", "2.0.0rc1"),
+        (">1.5.3", "2.0.0rc1"),
+        ("1.5.3", "1.5.3"),
+        ("==1.5.*", "1.5.3"),
+        ("=1.4", "1.4.10"),
+        (">=1.4,<2", "1.5.3"),
+        ("~=1.4.2", "1.4.10"),
+        ("^1.4", "1.5.3"),
+        ("!=2.0.0rc1", "1.5.3"),
+        (">=1.4 <1.5", "1.4.10"),
+        (">=1.4, <1.5 !=1.4.10", "1.4.2"),
+        ("<=1.4.2", "1.4.2"),
+        ("==3.0", None),
+        ("==1.5.3=py310_0", "1.5.3"),
+    ],
+)
+def test_latest_matching(spec, expected):
+    index = VersionIndex(
+        ["1.4.2", "2.0.0rc1", "1.0.0rc1", "1.5.3", "1.4.10", "1.5.3", "bogus"]
+    )
+    assert index.latest_matching(spec) == expected
+
+
+def test_version_index_is_sorted_and_deduplicated():
+    index = VersionIndex(["1.10", "1.9", "1.10.0", "1.2"])
+    assert index.versions() == ["1.2", "1.9", "1.10"]
+    assert index.latest() == "1.10"
+
+
+def test_spec_rejects_wildcard_with_ordering_operator():
+    with pytest.raises(ValueError):
+        VersionSpec(">=1.*")
+
+
+def test_whitespace_separates_clauses_but_not_builds():
+    index = VersionIndex(["1.5", "1.9", "2.5"])
+    assert index.latest_matching(">=1.2 <2") == "1.9"
+    assert VersionSpec("1.9 py310_0").match("1.9")
+    with pytest.raises(ValueError):
+        VersionOrder("1.2 <2")
+
+
+def test_pre_releases_only_when_named_or_nothing_else_matches():
+    index = VersionIndex(["1.5.3", "2.0.0rc1", "2.1.dev0"])
+    assert index.latest() == "1.5.3"
+    assert index.latest_matching(">=2.0.0rc1") == "2.1.dev0"
+    assert VersionIndex(["2.0.0rc1"]).latest() == "2.0.0rc1"
+
+
+def test_greater_than_excludes_post_and_local_releases():
+    assert not VersionSpec(">1.0").match("1.0.post1")
+    assert not VersionSpec(">1.0").match("1.0+local")
+    assert VersionSpec(">1.0").match("1.0.1")
+    assert VersionSpec(">1.0.post1").match("1.0.post2")
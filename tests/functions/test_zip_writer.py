@@ -0,0 +1,74 @@
+import hashlib
+import os
+import zipfile
+
+import pytest
+
+from snowdev.functions.zip_writer import ReproducibleZip
+
+
+def make_site_packages(tmpdir):
+    site = tmpdir.mkdir("site-packages")
+    pkg = site.mkdir("pkg")
+    pkg.join("__init__.py").write("VALUE = 1\n" * 500)
+    pkg.join("core.py").write("def f():\n    return 1\n")
+    pkg.mkdir("__pycache__").join("core.cpython-39.pyc").write("junk")
+    pkg.mkdir("tests").join("test_core.py").write("def test(): pass\n")
+    info = site.mkdir("pkg-1.0.dist-info")
+    info.join("METADATA").write("Name: pkg\n")
+    info.join("RECORD").write("pkg/__init__.py,,\n")
+    return site
+
+
+def digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def test_zip_is_reproducible_and_filtered(tmpdir):
+    site = make_site_packages(tmpdir)
+    first = str(tmpdir.join("first.zip"))
+    second = str(tmpdir.join("second.zip"))
+
+    report = ReproducibleZip().write(str(site), first)
+    os.utime(str(site.join("pkg", "core.py")), (1e9, 1e9))
+    ReproducibleZip().write(str(site), second)
+
+    assert digest(first) == digest(second)
+    with zipfile.ZipFile(first) as zipf:
+        assert zipf.namelist() == [
+            "pkg-1.0.dist-info/METADATA",
+            "pkg/__init__.py",
+            "pkg/core.py",
+        ]
+        assert {info.compress_type for info in zipf.infolist()} == {
+            zipfile.ZIP_DEFLATED
+        }
+        assert {info.date_time for info in zipf.infolist()} == {(1980, 1, 1, 0, 0, 0)}
+    assert report.files == 3
+    assert report.compressed_size < report.raw_size
+
+
+def test_level_and_source_date_epoch(tmpdir, monkeypatch):
+    site = make_site_packages(tmpdir)
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+    zip_path = str(tmpdir.join("out.zip"))
+
+    ReproducibleZip(level=9).write(str(site), zip_path)
+
+    with zipfile.ZipFile(zip_path) as zipf:
+        assert zipf.infolist()[0].date_time == (2023, 11, 14, 22, 13, 20)
+
+    with pytest.raises(ValueError):
+        ReproducibleZip(level=10)
+
+
+def test_level_applies_to_every_entry(tmpdir):
+    site = make_site_packages(tmpdir)
+    sizes = {}
+    for level in (0, 9):
+        zip_path = str(tmpdir.join(f"level-{level}.zip"))
+        sizes[level] = ReproducibleZip(level=level).write(str(site), zip_path)
+
+    assert sizes[9].compressed_size < sizes[0].compressed_size
+    assert sizes[0].compressed_size > sizes[0].raw_size